@@ -5,6 +5,7 @@ DEFAULT_PAGE_SIZE = 10
 class RequestKeys:
     PAGE = "page"
     SIZE = "size"
+    CURSOR = "cursor"
     PROJECT = "project"
     LOCATION = "location"
 
@@ -16,6 +17,7 @@ class FilePaths:
 class ResponseKeys:
     ASSETS = "assets"
     COUNT = "count"
+    NEXT_CURSOR = "next_cursor"
     IN_USE_ASSETS = "in_use_assets"
     ASSET = "asset"
     IN_USE_ASSET = "in_use_asset"
@@ -38,6 +40,7 @@ class ErrorMessages:
     INVALID_TYPE = "Invalid Type"
     INVALID_MODEL = "Invalid Model"
     ASSET_EXISTS = "Asset with the serial number already exists"
+    INVALID_CURSOR = "Invalid cursor"
 
 
 class PermissionKeys:
@@ -4,6 +4,7 @@ from rest_framework import serializers
 from assets.models import Inventory, InUseAsset, AssetBrand, AssetModels, AssetTypes
 from utils.utils import camel_to_snake
 from assets.constants import DEFAULT_PAGE_NUMBER, DEFAULT_PAGE_SIZE
+from helpers.pagination import CursorField
 
 
 class ListAssetRequestSerializer(serializers.Serializer):
@@ -13,6 +14,7 @@ class ListAssetRequestSerializer(serializers.Serializer):
     close_filter = serializers.ListField(child=serializers.CharField(), required=False)
     page = serializers.IntegerField(default=DEFAULT_PAGE_NUMBER)
     size = serializers.IntegerField(default=DEFAULT_PAGE_SIZE)
+    cursor = CursorField()
 
     def to_internal_value(self, data):
         data = super().to_internal_value(data)
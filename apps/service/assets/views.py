@@ -9,6 +9,7 @@ from assets.constants import (
     CLOSE_LIST,
     ACTIVE_LIST,
     PermissionKeys,
+    ErrorMessages,
 )
 from assets.serializers import (
     ListAssetRequestSerializer,
@@ -38,7 +39,8 @@ from assets.services import (
     AssetModelsService,
 )
 from authapp.permissions import APIPermission
-from helpers.pagination import paginate
+from helpers.exceptions import InvalidRequest
+from helpers.pagination import paginate, paginate_keyset
 
 
 class AssetAPIView(APIView):
@@ -56,14 +58,28 @@ class AssetAPIView(APIView):
 
         page = request_serializer.validated_data.pop(RequestKeys.PAGE)
         size = request_serializer.validated_data.pop(RequestKeys.SIZE)
+        keyset = RequestKeys.CURSOR in request_serializer.validated_data
+        cursor = request_serializer.validated_data.pop(RequestKeys.CURSOR, None)
 
         assets = service.list_assets(request_serializer.validated_data)
-        paginated_assets = paginate(assets, page, size)
+        if keyset:
+            # assets are sorted by serial number, their primary key, which is the tie breaker of every keyset
+            try:
+                paginated_assets, next_cursor = paginate_keyset(assets, [], cursor, size)
+            except ValueError:
+                raise InvalidRequest(ErrorMessages.INVALID_CURSOR)
+            # counted once on the first page, following pages are not slowed down by it
+            count = assets.count() if cursor is None else None
+        else:
+            paginated_assets = paginate(assets, page, size)
+            next_cursor = None
+            count = paginated_assets.paginator.count
 
         response_serializer = ListAssetResponseSerializer(paginated_assets, many=True)
         response = {
             ResponseKeys.ASSETS: response_serializer.data,
-            ResponseKeys.COUNT: assets.count(),
+            ResponseKeys.COUNT: count,
+            ResponseKeys.NEXT_CURSOR: next_cursor,
         }
         return Response(response, status=status.HTTP_200_OK)
 
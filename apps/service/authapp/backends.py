@@ -0,0 +1,18 @@
+from django.contrib.auth.backends import ModelBackend
+
+from authapp.cache import get_user_permission_names
+
+
+class CachedPermissionBackend(ModelBackend):
+    """
+    Model backend reading the permissions of users from the cache instead of querying them on every request.
+    """
+
+    def _get_permissions(self, user_obj, obj, from_name):
+        if not user_obj.is_active or user_obj.is_anonymous or obj is not None:
+            return set()
+        perm_cache_name = f'_{from_name}_perm_cache'
+        if not hasattr(user_obj, perm_cache_name):
+            for name, permissions in get_user_permission_names(user_obj).items():
+                setattr(user_obj, f'_{name}_perm_cache', permissions)
+        return getattr(user_obj, perm_cache_name)
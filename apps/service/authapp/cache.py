@@ -0,0 +1,82 @@
+import uuid
+
+from django.conf import settings
+from django.contrib.auth.models import Group, Permission
+from django.core.cache import cache
+
+PERMISSIONS_VERSION_KEY = 'permissions:version'
+PERMISSION_KEY = 'permissions:{version}:permission:{name}'
+ALL_PERMISSIONS_KEY = 'permissions:{version}:all'
+GROUP_PERMISSIONS_KEY = 'permissions:{version}:groups'
+USER_PERMISSIONS_KEY = 'permissions:{version}:user:{user_id}'
+
+
+def get_permissions_version():
+    """
+    Return the token identifying the current state of permissions, groups and their assignments.
+    """
+    version = cache.get(PERMISSIONS_VERSION_KEY)
+    if version is None:
+        cache.add(PERMISSIONS_VERSION_KEY, uuid.uuid4().hex, None)
+        version = cache.get(PERMISSIONS_VERSION_KEY)
+    return version
+
+
+def bump_permissions_version():
+    """
+    Invalidate all cached permissions.
+    """
+    cache.set(PERMISSIONS_VERSION_KEY, uuid.uuid4().hex, None)
+
+
+def get_names(permissions):
+    return {f'{app_label}.{codename}' for app_label, codename in
+            permissions.values_list('content_type__app_label', 'codename').order_by()}
+
+
+def get_permission(permission_name):
+    """
+    Return the permission with the given `app_label.codename` name, None if there is no such permission.
+    """
+    key = PERMISSION_KEY.format(version=get_permissions_version(), name=permission_name)
+    permission = cache.get(key)
+    if permission is None:
+        app_label, codename = permission_name.split('.')
+        permission = Permission.objects.filter(content_type__app_label=app_label, codename=codename).first()
+        if permission is not None:
+            cache.set(key, permission, settings.PERMISSION_CACHE_TIMEOUT)
+    return permission
+
+
+def get_user_permission_names(user):
+    """
+    Return the names of the permissions given to the user directly and through their groups, all permissions for
+    superusers.
+    """
+    version = get_permissions_version()
+    if user.is_superuser:
+        key = ALL_PERMISSIONS_KEY.format(version=version)
+        names = cache.get(key)
+        if names is None:
+            names = get_names(Permission.objects.all())
+            cache.set(key, names, settings.PERMISSION_CACHE_TIMEOUT)
+        return {'user': names, 'group': names}
+
+    user_key = USER_PERMISSIONS_KEY.format(version=version, user_id=user.id)
+    groups_key = GROUP_PERMISSIONS_KEY.format(version=version)
+    cached = cache.get_many([user_key, groups_key])
+
+    if user_key not in cached:
+        cached[user_key] = (get_names(user.user_permissions.all()), set(user.groups.values_list('id', flat=True)))
+        cache.set(user_key, cached[user_key], settings.PERMISSION_CACHE_TIMEOUT)
+    if groups_key not in cached:
+        # group id -> permission names, there are only a handful of groups
+        cached[groups_key] = {}
+        for group_id, app_label, codename in Group.permissions.through.objects.values_list(
+                'group_id', 'permission__content_type__app_label', 'permission__codename'):
+            cached[groups_key].setdefault(group_id, set()).add(f'{app_label}.{codename}')
+        cache.set(groups_key, cached[groups_key], settings.PERMISSION_CACHE_TIMEOUT)
+
+    user_names, group_ids = cached[user_key]
+    group_names = set().union(*(cached[groups_key].get(group_id, ()) for group_id in group_ids))
+    return {'user': user_names, 'group': group_names}
@@ -3,6 +3,8 @@ from django.core.exceptions import ImproperlyConfigured
 from rest_framework.exceptions import MethodNotAllowed
 from rest_framework.permissions import BasePermission
 
+from authapp.cache import bump_permissions_version
+
 
 def assign_permissions(group_permission_map):
     """
@@ -17,6 +19,7 @@ def assign_permissions(group_permission_map):
         for codename in permissions_map['codenames']:
             permission, _ = Permission.objects.get_or_create(content_type=content_type, codename=codename)
             group.permissions.add(permission)
+    bump_permissions_version()
 
 
 def revoke_permissions(group_permission_map):
@@ -31,6 +34,7 @@ def revoke_permissions(group_permission_map):
         codenames = permissions_map['codenames']
         permissions = Permission.objects.filter(content_type=content_type, codename__in=codenames)
         group.permissions.remove(*permissions)
+    bump_permissions_version()
 
 
 class APIPermission(BasePermission):
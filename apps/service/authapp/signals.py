@@ -0,0 +1,36 @@
+from django.contrib.auth.models import Group, Permission
+from django.core.management import call_command
+from django.db.models.signals import m2m_changed, post_save, post_delete, post_migrate
+from django.dispatch import receiver
+
+from authapp.cache import bump_permissions_version
+from user.models import User
+
+
+@receiver(m2m_changed, sender=User.groups.through)
+@receiver(m2m_changed, sender=User.user_permissions.through)
+@receiver(m2m_changed, sender=Group.permissions.through)
+def invalidate_permissions_assignment(sender, action, **kwargs):
+    """
+    Cached permissions of users are stale once permissions or groups are assigned or revoked.
+    """
+    if action in ('post_add', 'post_remove', 'post_clear'):
+        bump_permissions_version()
+
+
+@receiver(post_save, sender=Permission)
+@receiver(post_delete, sender=Permission)
+@receiver(post_delete, sender=Group)
+@receiver(post_migrate)
+def invalidate_permissions(sender, **kwargs):
+    """
+    Migrations and flushes (re)create permissions in bulk, without save signals.
+    """
+    bump_permissions_version()
+
+
+def create_cache_table(sender, using, **kwargs):
+    """
+    Migrations creating permissions invalidate cached ones, the database cache needs its table before them.
+    """
+    call_command('createcachetable', database=using, verbosity=0)
@@ -1,11 +1,14 @@
 import logging
 from unittest import mock
 
+from django.contrib.auth.models import Group
+from django.test import TestCase
 from django.urls import reverse
 from rest_framework import status
 from rest_framework.test import APITestCase
 
 from authapp.constants import ErrorMessages, PermissionKeys
+from authapp.permissions import assign_permissions, revoke_permissions
 from authapp.services import LoginService
 from user.models import User
 from utils.permissions import get_permission_object
@@ -99,3 +102,48 @@ class LoginTests(APITestCase):
         self.assertEqual(response.status_code, status.HTTP_200_OK)
         self.assertEqual(response.data['user']['id'], self.user.id)
         self.assertEqual(response.data['user']['picture'], 'link')
+
+
+class PermissionCacheTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(employee_id=1, email='user@company.com', first_name='Foo', last_name='Bar')
+        cls.group = Group.objects.create(name='Cache Group')
+        cls.user.groups.add(cls.group)
+
+    def get_user(self):
+        # a fresh instance, permissions are also cached on the user object
+        return User.objects.get(id=self.user.id)
+
+    def test_permissions_are_cached(self):
+        with self.assertNumQueries(1):
+            permission = get_permission_object(PermissionKeys.LOGIN_PERMISSION)
+        with self.assertNumQueries(0):
+            self.assertEqual(get_permission_object(PermissionKeys.LOGIN_PERMISSION), permission)
+
+        user = self.get_user()
+        self.assertFalse(user.has_perm(PermissionKeys.LOGIN_PERMISSION))
+        user = self.get_user()
+        with self.assertNumQueries(0):
+            self.assertFalse(user.has_perm(PermissionKeys.LOGIN_PERMISSION))
+
+    def test_permission_changes_invalidate_cache(self):
+        permission = get_permission_object(PermissionKeys.LOGIN_PERMISSION)
+        self.assertFalse(self.get_user().has_perm(PermissionKeys.LOGIN_PERMISSION))
+
+        self.user.user_permissions.add(permission)
+        self.assertTrue(self.get_user().has_perm(PermissionKeys.LOGIN_PERMISSION))
+        self.user.user_permissions.remove(permission)
+        self.assertFalse(self.get_user().has_perm(PermissionKeys.LOGIN_PERMISSION))
+
+        group_permission_map = {self.group.name: {'content_type': permission.content_type,
+                                                  'codenames': [permission.codename]}}
+        assign_permissions(group_permission_map)
+        self.assertTrue(self.get_user().has_perm(PermissionKeys.LOGIN_PERMISSION))
+        revoke_permissions(group_permission_map)
+        self.assertFalse(self.get_user().has_perm(PermissionKeys.LOGIN_PERMISSION))
+
+        self.group.permissions.add(permission)
+        self.user.groups.remove(self.group)
+        self.assertFalse(self.get_user().has_perm(PermissionKeys.LOGIN_PERMISSION))
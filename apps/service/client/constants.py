@@ -26,6 +26,7 @@ class RequestKeys:
     POCS = 'pocs'
     PAGE = 'page'
     SIZE = 'size'
+    CURSOR = 'cursor'
     SORT_BY = 'sort_by'
 
 
@@ -33,6 +34,7 @@ class ResponseKeys:
     CLIENT = 'client'
     CLIENTS = 'clients'
     COUNT = 'count'
+    NEXT_CURSOR = 'next_cursor'
     DROPDOWNS = 'dropdowns'
     STATUS = 'status'
     INDUSTRIES = 'industries'
@@ -43,3 +45,4 @@ class ErrorMessages:
     INVALID_CLIENT_ID = 'Invalid client ID.'
     DORMANT_PERMISSION_DENIED = 'You do not have permission to make the client dormant.'
     ALL_PROJECT_RELATED_TO_CLIENT_IS_NOT_CLOSED = 'All projects related to this client is not closed'
+    INVALID_CURSOR = 'Invalid cursor'
@@ -0,0 +1,20 @@
+# Generated by Django 4.1.3 on 2026-10-18 17:24
+
+import django.contrib.postgres.indexes
+from django.db import migrations
+import django.db.models.functions.text
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('user', '0018_trigram_indexes'),
+        ('client', '0004_client_comment_clientpoc_designation'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='client',
+            index=django.contrib.postgres.indexes.GinIndex(django.contrib.postgres.indexes.OpClass(django.db.models.functions.text.Upper('name'), name='gin_trgm_ops'), name='client_name_trgm'),
+        ),
+    ]
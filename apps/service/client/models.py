@@ -1,4 +1,6 @@
+from django.contrib.postgres.indexes import GinIndex, OpClass
 from django.db import models
+from django.db.models.functions import Upper
 
 from common.models import Industry
 from user.models import User
@@ -29,6 +31,7 @@ class Client(models.Model):
 
     class Meta:
         db_table = 'client'
+        indexes = [GinIndex(OpClass(Upper('name'), name='gin_trgm_ops'), name='client_name_trgm')]
         permissions = [('mark_client_dormant', 'Can mark client dormant'),
                        ('client_account_manager', 'Can be client account manager')]
 
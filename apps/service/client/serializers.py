@@ -4,6 +4,7 @@ from client.constants import DEFAULT_PAGE_NUMBER, DEFAULT_PAGE_SIZE
 from client.models import Client, ClientPOC
 from common.models import Industry
 from common.serializers import IndustrySerializer
+from helpers.pagination import CursorField
 from user.models import User
 from user.serializers import AccountManagerSerializer
 from utils.utils import camel_to_snake
@@ -53,6 +54,7 @@ class ListClientsRequestSerializer(serializers.Serializer):
     search = serializers.CharField(required=False)
     page = serializers.IntegerField(default=DEFAULT_PAGE_NUMBER)
     size = serializers.IntegerField(default=DEFAULT_PAGE_SIZE)
+    cursor = CursorField()
     sort_by = serializers.CharField(required=False)
 
     def to_internal_value(self, data):
@@ -235,6 +235,22 @@ class ListClientTests(BaseTestCase):
         self.assertEqual(len(response.data[ResponseKeys.CLIENTS]), 2)
         self.assertEqual(response.data[ResponseKeys.COUNT], 3)
 
+    def test_list_clients_keyset_pagination(self):
+        self.client.force_authenticate(user=self.user)
+        url = reverse('v1:client:client')
+        response = self.client.get(url, data={'cursor': '', 'size': 2, 'sort_by': 'start_date_desc'}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual([client['name'] for client in response.data[ResponseKeys.CLIENTS]], ['Junk 2', 'Test'])
+        self.assertEqual(response.data[ResponseKeys.COUNT], 3)
+
+        data = {'cursor': response.data[ResponseKeys.NEXT_CURSOR], 'size': 2, 'sort_by': 'start_date_desc'}
+        response = self.client.get(url, data=data, format='json')
+        self.assertEqual([client['name'] for client in response.data[ResponseKeys.CLIENTS]], ['Dummy'])
+        self.assertIsNone(response.data[ResponseKeys.NEXT_CURSOR])
+
+        response = self.client.get(url, data={'cursor': 'junk'}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
     def test_list_clients_filter(self):
         self.client.force_authenticate(user=self.user)
         url = reverse('v1:client:client')
@@ -4,17 +4,26 @@ from rest_framework.response import Response
 from rest_framework.views import APIView
 
 from authapp.permissions import APIPermission
-from client.constants import PermissionKeys, ResponseKeys, RequestKeys
+from client.constants import PermissionKeys, ResponseKeys, RequestKeys, ErrorMessages
 from client.serializers import CreateClientRequestSerializer, SetClientResponseSerializer, \
     ListClientsRequestSerializer, ListClientsResponseSerializer, RetrieveClientResponseSerializer, \
     EditClientRequestSerializer, ClientCreationDropdownsResponseSerializer
 from client.services import ClientService
-from helpers.pagination import paginate
+from helpers.exceptions import InvalidRequest
+from helpers.pagination import paginate, paginate_keyset, keyset_ordering
 
 
 class ClientAPIView(APIView):
     permission_classes = [APIPermission]
     permissions = PermissionKeys.CLIENT_PERMISSIONS
+    # (field, descending) sort keys of every sort_by, latest clients come first if none is given
+    SORT_KEYS = {
+        'name_asc': [('name', False)],
+        'name_desc': [('name', True)],
+        'start_date_asc': [('start_date', False)],
+        'start_date_desc': [('start_date', True)],
+    }
+    DEFAULT_SORT_KEYS = [('start_date', True)]
 
     @swagger_auto_schema(request_body=CreateClientRequestSerializer(),
                          responses={status.HTTP_201_CREATED: SetClientResponseSerializer()})
@@ -39,22 +48,29 @@ class ClientAPIView(APIView):
         service = ClientService()
         request_serializer = ListClientsRequestSerializer(data=request.GET)
         request_serializer.is_valid(raise_exception=True)
-        sort_by = request_serializer.data.get(RequestKeys.SORT_BY)
+        sort_by = request_serializer.validated_data.get(RequestKeys.SORT_BY)
         page = request_serializer.validated_data.pop(RequestKeys.PAGE)
         size = request_serializer.validated_data.pop(RequestKeys.SIZE)
+        keyset = RequestKeys.CURSOR in request_serializer.validated_data
+        cursor = request_serializer.validated_data.pop(RequestKeys.CURSOR, None)
         clients = service.list_clients(request_serializer.validated_data)
-        if sort_by == 'name_asc':
-            clients = clients.order_by('name')
-        if sort_by == 'name_desc':
-            clients = clients.order_by('-name')
-        if sort_by == 'start_date_asc':
-            clients = clients.order_by('start_date')
-        if sort_by == 'start_date_desc':
-            clients = clients.order_by('-start_date')
+        sort_keys = self.SORT_KEYS.get(sort_by, self.DEFAULT_SORT_KEYS)
+        clients = clients.order_by(*keyset_ordering(sort_keys))
 
-        paginated_clients = paginate(clients, page, size)
+        if keyset:
+            try:
+                paginated_clients, next_cursor = paginate_keyset(clients, sort_keys, cursor, size)
+            except ValueError:
+                raise InvalidRequest(ErrorMessages.INVALID_CURSOR)
+            # counted once on the first page, following pages are not slowed down by it
+            count = clients.count() if cursor is None else None
+        else:
+            paginated_clients = paginate(clients, page, size)
+            next_cursor = None
+            count = paginated_clients.paginator.count
         response_serializer = ListClientsResponseSerializer(paginated_clients, many=True)
-        response = {ResponseKeys.CLIENTS: response_serializer.data, ResponseKeys.COUNT: clients.count()}
+        response = {ResponseKeys.CLIENTS: response_serializer.data, ResponseKeys.COUNT: count,
+                    ResponseKeys.NEXT_CURSOR: next_cursor}
         return Response(response, status=status.HTTP_200_OK)
 
 
@@ -29,3 +29,12 @@ class ErrorMessages:
 
 class EnvironmentValues:
     ENABLED = 'enabled'
+
+
+class SlackOutboxValues:
+    BATCH_SIZE = 20
+    POLL_INTERVAL_SECONDS = 5
+    MAX_ATTEMPTS = 8
+    BACKOFF_SECONDS = 30
+    MAX_BACKOFF_SECONDS = 3600
+    RATE_LIMIT_STATUS_CODE = 429
@@ -0,0 +1,34 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+from common.constants import SlackOutboxValues
+from utils.slack_message import deliver_slack_messages
+
+
+class Command(BaseCommand):
+    help = 'Worker posting the queued Slack messages, retries failed messages with backoff'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=SlackOutboxValues.BATCH_SIZE)
+        parser.add_argument('--interval', type=float, default=SlackOutboxValues.POLL_INTERVAL_SECONDS,
+                            help='Seconds to wait when there is nothing to deliver')
+        parser.add_argument('--once', action='store_true',
+                            help='Deliver the messages that are due and exit instead of polling')
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        while True:
+            handled, retry_after = deliver_slack_messages(batch_size)
+            if retry_after is not None:
+                print(f'rate limited by Slack, waiting {retry_after} seconds')
+                if options['once']:
+                    return
+                time.sleep(retry_after)
+            elif handled < batch_size:
+                if options['once']:
+                    return
+                time.sleep(options['interval'])
+            # the worker is long running, drop connections that broke or outlived CONN_MAX_AGE
+            close_old_connections()
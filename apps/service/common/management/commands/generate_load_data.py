@@ -0,0 +1,366 @@
+import csv
+import io
+import random
+from datetime import timedelta
+
+from django.contrib.auth.hashers import make_password
+from django.contrib.contenttypes.models import ContentType
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.utils import timezone
+
+from assets.models import Inventory, InUseAsset
+from client.models import Client
+from common.management.commands.manage_skills import SKILLS
+from common.models import Skill
+from project.models import Project, ProjectRole, ProjectPosition, ProjectPositionSkills, ProjectAllocation, \
+    ProjectAllocationRequest, Notification
+from search.cache import bump_data_version
+from user.constants import LeaveStatusKeys, StatusKeys, FunctionValues, EmployeeTypeValues, GenderValues
+from user.management.commands.manage_roles import ROLES
+from user.models import User, Role, ProficiencyMapping, LeavePlans
+from user.services import UserAvailabilityService, UserUtilizationSummaryService
+
+CITIES = [('Bangalore', 'India'), ('Mumbai', 'India'), ('Pune', 'India'), ('Hyderabad', 'India'),
+          ('Singapore', 'Singapore'), ('London', 'United Kingdom'), ('Berlin', 'Germany'), ('Austin', 'USA')]
+FIRST_NAMES = ['Aarav', 'Aditi', 'Arjun', 'Diya', 'Ishaan', 'Kavya', 'Meera', 'Nikhil', 'Priya', 'Rahul', 'Riya',
+               'Rohan', 'Sana', 'Tara', 'Vikram', 'Zoya', 'Alex', 'Maria', 'John', 'Wei']
+LAST_NAMES = ['Sharma', 'Iyer', 'Reddy', 'Nair', 'Gupta', 'Menon', 'Das', 'Khan', 'Patel', 'Rao', 'Singh', 'Joshi',
+              'Smith', 'Garcia', 'Chen', 'Fischer']
+LEAVE_TYPES = ['Casual Leave', 'Sick Leave', 'Earned Leave']
+ASSET_BRANDS = ['Apple', 'Dell', 'Lenovo', 'HP']
+# statuses a project is in, weighted by how common they are
+PROJECT_STATUSES = [Project.Status.ACTIVE] * 5 + [Project.Status.SIGNED] * 2 + \
+    [Project.Status.HOT, Project.Status.WARM, Project.Status.COLD, Project.Status.CLOSED]
+UTILIZATIONS = [100] * 6 + [50] * 3 + [25]
+
+
+class Command(BaseCommand):
+    help = 'Generate a synthetic dataset of configurable size for performance testing, never run it in production'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=1000)
+        parser.add_argument('--clients', type=int, default=50)
+        parser.add_argument('--projects', type=int, default=200)
+        parser.add_argument('--skills-per-user', type=int, default=6)
+        parser.add_argument('--allocations-per-user', type=int, default=3,
+                            help='Maximum number of consecutive allocations of a user')
+        parser.add_argument('--open-positions', type=int, default=100)
+        parser.add_argument('--leaves-per-user', type=int, default=4)
+        parser.add_argument('--requests', type=int, default=500)
+        parser.add_argument('--notifications', type=int, default=5000)
+        parser.add_argument('--assets', type=int, default=1000)
+        parser.add_argument('--history-days', type=int, default=730,
+                            help='Number of days before today the generated timeline starts')
+        parser.add_argument('--prefix', default='load', help='Prefix of generated identifiers, keeps runs apart')
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument('--batch-size', type=int, default=5000)
+
+    def handle(self, *args, **options):
+        self.random = random.Random(options['seed'])
+        self.prefix = options['prefix']
+        self.batch_size = options['batch_size']
+        self.today = timezone.now().date()
+        self.timeline_start = self.today - timedelta(days=options['history_days'])
+
+        if User.objects.filter(email__startswith=f'{self.prefix}.').exists():
+            print(f'data with prefix {self.prefix} exists already, use another --prefix')
+            return
+
+        with transaction.atomic():
+            skills = self.create_skills()
+            roles = self.create_roles()
+            users = self.create_users(options['users'], roles)
+            self.create_proficiencies(users, skills, options['skills_per_user'])
+            clients = self.create_clients(options['clients'], users)
+            projects = self.create_projects(options['projects'], clients, users)
+            allocations = self.create_allocations(users, projects, skills, options['allocations_per_user'],
+                                                  options['open_positions'])
+            self.create_allocation_requests(options['requests'], users, allocations)
+            self.create_leaves(users, options['leaves_per_user'])
+            self.create_notifications(options['notifications'], users, allocations)
+            self.create_assets(options['assets'], users)
+
+        # rows loaded in bulk bypass the signals that keep derived data up to date
+        print('rebuilding user availability')
+        UserAvailabilityService().rebuild()
+        print('summarizing user utilization')
+        UserUtilizationSummaryService().rollover()
+        bump_data_version()
+        print('done')
+
+    def create_skills(self):
+        Skill.objects.bulk_create([Skill(name=name) for name in SKILLS], ignore_conflicts=True)
+        return list(Skill.objects.values_list('id', flat=True))
+
+    def create_roles(self):
+        Role.objects.bulk_create([Role(name=name) for name in ROLES], ignore_conflicts=True)
+        return list(Role.objects.values_list('id', flat=True))
+
+    def create_users(self, count, roles):
+        print(f'creating {count} users')
+        password = make_password(None)
+        users = []
+        for index in range(count):
+            # most of the people are early in their career
+            career_start_date = self.today - timedelta(days=int(self.random.triangular(90, 20 * 365, 2 * 365)))
+            date_of_joining = career_start_date + timedelta(
+                days=self.random.randint(0, (self.today - career_start_date).days))
+            is_active = self.random.random() > 0.05
+            last_working_day = None
+            if not is_active:
+                last_working_day = date_of_joining + timedelta(
+                    days=self.random.randint(0, (self.today - date_of_joining).days))
+            elif self.random.random() < 0.02:
+                last_working_day = self.today + timedelta(days=self.random.randint(1, 60))
+            city, country = self.random.choice(CITIES)
+            users.append(User(
+                employee_id=f'{self.prefix}-{index}', email=f'{self.prefix}.{index}@example.com',
+                first_name=self.random.choice(FIRST_NAMES), last_name=self.random.choice(LAST_NAMES),
+                password=password, role_id=self.random.choice(roles), career_start_date=career_start_date,
+                career_break_months=self.random.choice([0] * 9 + [6]), date_of_joining=date_of_joining,
+                last_working_day=last_working_day, work_location=city, location=city, country=country,
+                gender=self.random.choice([GenderValues.MALE, GenderValues.FEMALE]),
+                employee_type=self.random.choice([EmployeeTypeValues.PERMANENT] * 8 +
+                                                 [EmployeeTypeValues.ON_CONTRACT, EmployeeTypeValues.INTERN]),
+                function=self.random.choice([FunctionValues.DELIVERY] * 4 + [FunctionValues.SUPPORT]),
+                status=StatusKeys.ACTIVE if is_active else StatusKeys.CLOSED, is_active=is_active,
+                designation=f'L{self.random.randint(1, 8)}'
+            ))
+        return User.objects.bulk_create(users, batch_size=self.batch_size)
+
+    def create_proficiencies(self, users, skills, skills_per_user):
+        print('creating proficiencies')
+        self.copy(ProficiencyMapping, (
+            ProficiencyMapping(user_id=user.id, skill_id=skill_id, rating=self.random.randint(1, 5))
+            for user in users
+            for skill_id in self.random.sample(skills, min(len(skills), self.random.randint(1, skills_per_user)))
+        ))
+
+    def create_clients(self, count, users):
+        print(f'creating {count} clients')
+        clients = []
+        for index in range(count):
+            city, country = self.random.choice(CITIES)
+            clients.append(Client(
+                name=f'{self.prefix} client {index}', city=city, country=country,
+                start_date=self.random_date(self.timeline_start - timedelta(days=365), self.today),
+                account_manager=self.random.choice(users), created_by=self.random.choice(users)
+            ))
+        return Client.objects.bulk_create(clients, batch_size=self.batch_size)
+
+    def create_projects(self, count, clients, users):
+        print(f'creating {count} projects')
+        projects = []
+        for index in range(count):
+            client = self.random.choice(clients)
+            status = self.random.choice(PROJECT_STATUSES)
+            start_date = self.random_date(self.timeline_start, self.today + timedelta(days=90))
+            end_date = None
+            if status == Project.Status.CLOSED:
+                end_date = self.random_date(start_date, max(start_date, self.today))
+            elif self.random.random() < 0.5:
+                end_date = start_date + timedelta(days=self.random.randint(90, 730))
+            projects.append(Project(
+                name=f'{self.prefix} project {index}', status=status, client=client, city=client.city,
+                country=client.country, start_date=start_date, end_date=end_date,
+                engagement_type=self.random.choice(Project.Engagement.values),
+                delivery_mode=self.random.choice(Project.DeliveryMode.values),
+                account_manager=self.random.choice(users), created_by=self.random.choice(users)
+            ))
+        return Project.objects.bulk_create(projects, batch_size=self.batch_size)
+
+    def create_allocations(self, users, projects, skills, allocations_per_user, open_positions):
+        # every allocation fills a position of its own on a random project, allocations of a user follow each
+        # other with gaps in between (cafe time) and the last one may be open ended
+        print('creating positions and allocations')
+        periods = []
+        for user in users:
+            start_date = self.random_date(self.timeline_start, self.timeline_start + timedelta(days=180))
+            end_of_employment = user.last_working_day or self.today + timedelta(days=365)
+            for _ in range(self.random.randint(0, allocations_per_user)):
+                if start_date >= end_of_employment:
+                    break
+                end_date = min(start_date + timedelta(days=self.random.randint(30, 365)), end_of_employment)
+                if end_date > self.today and self.random.random() < 0.3:
+                    end_date = None
+                periods.append((user, user.role_id, start_date, end_date))
+                if end_date is None:
+                    break
+                start_date = end_date + timedelta(days=self.random.randint(1, 60))
+        roles = [user.role_id for user in users]
+        for _ in range(open_positions):
+            start_date = self.random_date(self.today, self.today + timedelta(days=90))
+            periods.append((None, self.random.choice(roles), start_date,
+                            start_date + timedelta(days=self.random.randint(30, 365))))
+
+        # the projects are new, every role is staffed on a few random ones
+        project_roles = {(self.random.choice(projects).id, role_id) for _, role_id, _, _ in periods}
+        project_roles = ProjectRole.objects.bulk_create(
+            [ProjectRole(project_id=project_id, role_id=role_id) for project_id, role_id in sorted(project_roles)],
+            batch_size=self.batch_size)
+        role_project_roles = {}
+        for project_role in project_roles:
+            role_project_roles.setdefault(project_role.role_id, []).append(project_role.id)
+
+        positions = []
+        for _, role_id, start_date, end_date in periods:
+            experience_range_start = self.random.randint(0, 10)
+            positions.append(ProjectPosition(
+                project_role_id=self.random.choice(role_project_roles[role_id]),
+                utilization=self.random.choice(UTILIZATIONS),
+                experience_range_start=experience_range_start,
+                experience_range_end=experience_range_start + self.random.randint(1, 5),
+                is_billable=self.random.random() < 0.9, start_date=start_date, end_date=end_date
+            ))
+        positions = ProjectPosition.objects.bulk_create(positions, batch_size=self.batch_size)
+        self.copy(ProjectPositionSkills, (
+            ProjectPositionSkills(position_id=position.id, skill_id=skill_id, priority=priority)
+            for position in positions
+            for priority, skill_id in enumerate(self.random.sample(skills, self.random.randint(1, 3)), start=1)
+        ))
+
+        allocations = [
+            ProjectAllocation(user_id=user.id, position_id=position.id, utilization=position.utilization,
+                              start_date=position.start_date, end_date=position.end_date,
+                              kt_period=self.random.choice([0] * 4 + [7, 14]),
+                              tentative=self.random.random() < 0.05)
+            for (user, _, _, _), position in zip(periods, positions) if user is not None
+        ]
+        allocations = ProjectAllocation.objects.bulk_create(allocations, batch_size=self.batch_size)
+        self.open_positions = [position for (user, _, _, _), position in zip(periods, positions) if user is None]
+        print(f'created {len(positions)} positions and {len(allocations)} allocations')
+        return allocations
+
+    def create_allocation_requests(self, count, users, allocations):
+        print(f'creating {count} allocation requests')
+        active_users = [user for user in users if user.is_active]
+        if not active_users or not (self.open_positions or allocations):
+            return
+        requests = []
+        for _ in range(count):
+            # requests for open positions and change requests of existing allocations
+            allocation = None
+            if self.open_positions and (not allocations or self.random.random() < 0.7):
+                position = self.random.choice(self.open_positions)
+                user_id, position_id, utilization = self.random.choice(active_users).id, position.id, \
+                    position.utilization
+                start_date, end_date = position.start_date, position.end_date
+            else:
+                allocation = self.random.choice(allocations)
+                user_id, position_id, utilization = allocation.user_id, allocation.position_id, \
+                    allocation.utilization
+                start_date = max(allocation.start_date, self.today)
+                end_date = start_date + timedelta(days=self.random.randint(30, 180))
+            requests.append(ProjectAllocationRequest(
+                allocation_id=allocation.id if allocation else None, user_id=user_id, position_id=position_id,
+                utilization=utilization, start_date=start_date, end_date=end_date,
+                status=self.random.choice([ProjectAllocationRequest.Status.PENDING] * 2 +
+                                          [ProjectAllocationRequest.Status.APPROVED,
+                                           ProjectAllocationRequest.Status.DENIED]),
+                requested_by_id=self.random.choice(active_users).id, handler_id=self.random.choice(active_users).id
+            ))
+        self.copy(ProjectAllocationRequest, requests)
+
+    def create_leaves(self, users, leaves_per_user):
+        print('creating leave plans')
+
+        def leaves():
+            for user in users:
+                for index in range(self.random.randint(0, leaves_per_user)):
+                    from_date = self.random_date(self.timeline_start, self.today + timedelta(days=120))
+                    duration = self.random.choice([1] * 5 + [2, 3, 5, 10])
+                    yield LeavePlans(
+                        record_id=f'{self.prefix}-{user.id}-{index}', user_id=user.id,
+                        leave_type=self.random.choice(LEAVE_TYPES), from_date=from_date,
+                        to_date=from_date + timedelta(days=duration - 1), duration=str(duration),
+                        approval_status=self.random.choice([LeaveStatusKeys.APPROVED] * 8 +
+                                                           [LeaveStatusKeys.CANCELLED, LeaveStatusKeys.REJECTED])
+                    )
+        self.copy(LeavePlans, leaves())
+
+    def create_notifications(self, count, users, allocations):
+        print(f'creating {count} notifications')
+        if not allocations:
+            return
+        content_type = ContentType.objects.get_for_model(ProjectAllocation)
+        now = timezone.now()
+
+        def notifications():
+            for _ in range(count):
+                allocation = self.random.choice(allocations)
+                created_time = now - timedelta(minutes=self.random.randint(0, 90 * 24 * 60))
+                yield Notification(
+                    notification_type=self.random.choice(Notification.NotificationType.values),
+                    sender_id=self.random.choice(users).id, receiver_id=self.random.choice(users).id,
+                    unseen=created_time > now - timedelta(days=7) and self.random.random() < 0.5,
+                    object_id=allocation.id, content_type_id=content_type.id,
+                    json_data={'user_id': allocation.user_id, 'position_id': allocation.position_id},
+                    created_time=created_time, modified_time=created_time
+                )
+        self.copy(Notification, notifications())
+
+    def create_assets(self, count, users):
+        print(f'creating {count} assets')
+        inventory = []
+        for index in range(count):
+            date_of_purchase = timezone.make_aware(timezone.datetime.combine(
+                self.random_date(self.timeline_start, self.today), timezone.datetime.min.time()))
+            inventory.append(Inventory(
+                serial_num=f'{self.prefix}-{index}', brand=self.random.choice(ASSET_BRANDS), ownership='Owned',
+                screensize=self.random.choice(['13', '14', '15', '16']), type='Laptop',
+                model=f'Model {self.random.randint(1, 20)}', year=str(date_of_purchase.year),
+                ram=self.random.choice([8, 16, 32]), date_of_purchase=date_of_purchase,
+                amount=self.random.randint(50000, 250000)
+            ))
+        self.copy(Inventory, inventory)
+
+        # most of the assets are handed out to someone, the rest stays in the inventory
+        self.copy(InUseAsset, (
+            InUseAsset(
+                change_id=f'{asset.serial_num}-0', inventory_id=asset.serial_num,
+                user_id=user.id if user else None,
+                date_of_change=asset.date_of_purchase + timedelta(days=self.random.randint(1, 30)),
+                location=user.work_location if user else None,
+                active=InUseAsset.Actives.ASSI if user else InUseAsset.Actives.INV
+            )
+            for asset in inventory
+            for user in [self.random.choice(users) if self.random.random() < 0.8 else None]
+        ))
+
+    def random_date(self, start_date, end_date):
+        return start_date + timedelta(days=self.random.randint(0, max((end_date - start_date).days, 0)))
+
+    def get_value(self, instance, field):
+        # timestamps given explicitly are kept to spread the generated rows over time
+        if getattr(field, 'auto_now_add', False) or getattr(field, 'auto_now', False):
+            return getattr(instance, field.attname) or field.pre_save(instance, True)
+        return field.pre_save(instance, True)
+
+    def copy(self, model, objects):
+        """
+        Load unsaved model instances with COPY, columns are prepared the same way as for an insert.
+        """
+        fields = [field for field in model._meta.concrete_fields if not field.db_returning]
+        columns = ', '.join(connection.ops.quote_name(field.column) for field in fields)
+        query = f'COPY {connection.ops.quote_name(model._meta.db_table)} ({columns}) ' \
+                f"FROM STDIN WITH (FORMAT csv, NULL '\\N')"
+
+        def flush(buffer):
+            buffer.seek(0)
+            with connection.cursor() as cursor:
+                cursor.cursor.copy_expert(query, buffer)
+
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        rows = 0
+        for instance in objects:
+            values = [field.get_db_prep_save(self.get_value(instance, field), connection) for field in fields]
+            writer.writerow(['\\N' if value is None else value for value in values])
+            rows += 1
+            if rows % self.batch_size == 0:
+                flush(buffer)
+                buffer = io.StringIO()
+                writer = csv.writer(buffer)
+        flush(buffer)
+        return rows
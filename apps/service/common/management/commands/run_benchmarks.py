@@ -0,0 +1,217 @@
+import datetime
+import json
+import statistics
+import subprocess
+import time
+import tracemalloc
+from collections import OrderedDict
+
+from django.db import connection
+from django.db.models import Count, QuerySet
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+from rest_framework.test import APIRequestFactory, force_authenticate
+
+from dashboard.services import DashboardService
+from project.constants import SerializerKeys
+from project.models import Project, ProjectPosition, ProjectAllocation
+from project.serializers import RetrieveProjectTimelineResponseSerializer
+from project.services import ProjectTimelineService
+from report.serializers import ReportCafeResponseSerializer, ReportPotentialCafeResponseSerializer, \
+    ReportLocationResponseSerializer, ReportLastWorkingDayResponseSerializer, ReportClientResponseSerializer, \
+    ReportAnniversaryResponseSerializer
+from report.services import ReportService
+from search.constants import DEFAULT_POSITION_DAYS
+from search.scoring import ScoredTalents
+from search.services import SearchTalentService
+from user.models import User, LeavePlans
+from user.services import list_cafe_users
+from user.views import UserAPIView
+
+
+class QueryRecorder:
+    """
+    Execute wrapper counting the queries of a case and the time spent in the database.
+    """
+
+    def __init__(self):
+        self.queries = 0
+        self.duration = 0
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.duration += time.perf_counter() - start
+            self.queries += 1
+
+
+class Command(BaseCommand):
+    help = 'Time the heaviest service entry points against the current database, run it on a generate_load_data ' \
+           'dataset and compare the JSON results across commits'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--output', default='benchmark-results.json')
+        parser.add_argument('--repeat', type=int, default=3, help='Number of timed runs per case')
+        parser.add_argument('--case', action='append', dest='cases',
+                            help='Only run cases starting with the given name, can be repeated')
+        parser.add_argument('--compare', help='Result file of an earlier run to compare with')
+
+    def handle(self, *args, **options):
+        cases = self.get_cases()
+        if options['cases']:
+            cases = OrderedDict((name, case) for name, case in cases.items()
+                                if any(name.startswith(prefix) for prefix in options['cases']))
+            if not cases:
+                raise CommandError('No benchmark case matches the given names')
+
+        # read before running in case the baseline is overwritten with the new results
+        baseline = None
+        if options['compare']:
+            with open(options['compare']) as baseline_file:
+                baseline = json.load(baseline_file)['cases']
+
+        results = OrderedDict()
+        for name, case in cases.items():
+            results[name] = self.run_case(case, options['repeat'])
+            print(f"{name}: {results[name]['wall_ms']} ms, {results[name]['db_ms']} ms in db, "
+                  f"{results[name]['queries']} queries, {results[name]['peak_memory_kb']} KB peak")
+
+        report = {'meta': self.get_meta(), 'cases': results}
+        with open(options['output'], 'w') as output:
+            json.dump(report, output, indent=2)
+        print(f"results written to {options['output']}")
+
+        if baseline is not None:
+            print(f"compared with {options['compare']}")
+            self.compare(baseline, results)
+
+    def run_case(self, case, repeat):
+        # the first run warms up caches and measures peak memory, tracing would distort the timed runs
+        tracemalloc.start()
+        recorder = QueryRecorder()
+        with connection.execute_wrapper(recorder):
+            self.evaluate(case())
+        _, peak_memory = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+
+        wall_times, db_times = [], []
+        for _ in range(repeat):
+            recorder = QueryRecorder()
+            start = time.perf_counter()
+            with connection.execute_wrapper(recorder):
+                self.evaluate(case())
+            wall_times.append(time.perf_counter() - start)
+            db_times.append(recorder.duration)
+
+        return {'wall_ms': round(statistics.median(wall_times) * 1000, 2),
+                'db_ms': round(statistics.median(db_times) * 1000, 2),
+                'queries': recorder.queries,
+                'peak_memory_kb': round(peak_memory / 1024)}
+
+    def evaluate(self, result):
+        # querysets are lazy, fetch them the way a response would
+        if isinstance(result, QuerySet):
+            return list(result)
+        if isinstance(result, (list, tuple)):
+            return [self.evaluate(item) for item in result]
+        if isinstance(result, dict):
+            return {key: self.evaluate(value) for key, value in result.items()}
+        return result
+
+    def compare(self, baseline, results):
+        for name, result in results.items():
+            if name not in baseline:
+                continue
+            before = baseline[name]
+            change = (result['wall_ms'] - before['wall_ms']) / before['wall_ms'] * 100 if before['wall_ms'] else 0
+            print(f"{name}: {before['wall_ms']} -> {result['wall_ms']} ms ({change:+.1f}%), "
+                  f"{before['queries']} -> {result['queries']} queries")
+
+    def get_meta(self):
+        try:
+            commit = subprocess.run(['git', 'rev-parse', 'HEAD'], capture_output=True, text=True,
+                                    check=True).stdout.strip()
+        except (OSError, subprocess.CalledProcessError):
+            commit = None
+        return {'commit': commit, 'time': timezone.now().isoformat(),
+                'dataset': {'users': User.objects.count(), 'projects': Project.objects.count(),
+                            'positions': ProjectPosition.objects.count(),
+                            'allocations': ProjectAllocation.objects.count(),
+                            'leave_plans': LeavePlans.objects.count()}}
+
+    def get_cases(self):
+        today = timezone.now().date()
+        month_start = today.replace(day=1)
+        month_end = (month_start + datetime.timedelta(days=32)).replace(day=1) - datetime.timedelta(days=1)
+        locations = list(User.objects.exclude(location=None).values_list('location', flat=True).distinct()[:3])
+        dashboard = DashboardService()
+        report = ReportService()
+
+        cases = OrderedDict()
+        cases['search.score_talents'] = self.search_talents
+        cases['user.list_cafe_users'] = list_cafe_users
+        cases['dashboard.employees_detail'] = lambda: dashboard.dashboard_employees_metrics(
+            dashboard.dashboard_employees_detail())
+        cases['dashboard.allocated_employee'] = dashboard.dashboard_allocated_employee
+        cases['dashboard.skill_experience'] = dashboard.dashboard_skill_experience
+        cases['dashboard.skill'] = dashboard.dashboard_skill
+        cases['dashboard.skill_cafe'] = lambda: dashboard.dashboard_skill('cafe')
+        cases['dashboard.project_allocation'] = dashboard.dashboard_project_allocation
+        cases['dashboard.anniversaries'] = lambda: dashboard.dashboard_anniversaries(today.month, today.year)
+        cases['dashboard.lwd'] = lambda: dashboard.dashboard_lwd(today.month, today.year)
+        cases['dashboard.client_allocation'] = dashboard.dashboard_client_allocation
+        cases['dashboard.project_open_position'] = dashboard.dashboard_project_open_position
+        cases['dashboard.industries'] = dashboard.dashboard_industries
+        cases['dashboard.employee_industries_count'] = dashboard.dashboard_employee_industries_count
+        cases['report.cafe_users'] = lambda: ReportCafeResponseSerializer(
+            report.report_cafe_users(month_start, month_end), many=True).data
+        cases['report.potential_cafe_users'] = lambda: ReportPotentialCafeResponseSerializer(
+            report.report_potential_cafe_users(), many=True).data
+        cases['report.location_users'] = lambda: ReportLocationResponseSerializer(
+            report.report_location_users(locations), many=True).data
+        cases['report.last_working_day_users'] = lambda: ReportLastWorkingDayResponseSerializer(
+            report.report_last_working_day_users(month_start, month_end), many=True).data
+        cases['report.client_users'] = lambda: ReportClientResponseSerializer(
+            report.report_client_users(today - datetime.timedelta(days=365), today), many=True).data
+        cases['report.anniversary_users'] = lambda: ReportAnniversaryResponseSerializer(
+            report.report_anniversary_users(), many=True).data
+        cases['project.timeline'] = self.project_timeline
+        cases['user.list_users'] = lambda: self.list_users({})
+        cases['user.list_users_by_availability'] = lambda: self.list_users(
+            {'sort_by': 'availability_desc', 'availability': 50})
+        return cases
+
+    def search_talents(self):
+        # the position asking for the most skills is the most expensive one to score
+        position = ProjectPosition.objects.annotate(skill_count=Count('skills')).filter(skill_count__gt=0) \
+            .select_related('project_role').order_by('-skill_count', 'id').first()
+        if position is None:
+            return None
+        service = SearchTalentService()
+        skill_ids = list(position.skills.values_list('id', flat=True))
+        end_date = position.end_date or position.start_date + datetime.timedelta(days=DEFAULT_POSITION_DAYS - 1)
+        talents = service.query_talents(position.project_role.role_id, skill_ids, None, None)
+        talents = service.score_talents(talents, position.start_date, end_date, position.utilization, skill_ids,
+                                        position.experience_range_start, position.experience_range_end)
+        # same as the ranking of talent search
+        if isinstance(talents, ScoredTalents):
+            return talents.user_ids
+        return list(talents.values_list('id', 'score'))
+
+    def project_timeline(self):
+        project = Project.objects.annotate(position_count=Count('roles__positions')) \
+            .order_by('-position_count', 'id').first()
+        if project is None:
+            return None
+        project = ProjectTimelineService().retrieve_project_timeline(project.id)
+        return RetrieveProjectTimelineResponseSerializer(project, context={
+            SerializerKeys.SEARCH: None, SerializerKeys.PROJECT_ID: project.id,
+            SerializerKeys.RESPONSE_DATE_START: None, SerializerKeys.RESPONSE_DATE_END: None}).data
+
+    def list_users(self, data):
+        # an unsaved superuser passes the permission checks without touching the database
+        request = APIRequestFactory().post('/', data, format='json')
+        force_authenticate(request, user=User(is_superuser=True, is_active=True))
+        return UserAPIView.as_view()(request).data
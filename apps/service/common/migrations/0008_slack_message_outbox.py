@@ -0,0 +1,44 @@
+# Generated by Django 4.1.3 on 2026-10-18 18:02
+
+from django.db import migrations, models
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('common', '0007_alter_slackmessagelogs_delivered'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='slackmessagelogs',
+            name='attempts',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='slackmessagelogs',
+            name='delivered_time',
+            field=models.DateTimeField(null=True),
+        ),
+        migrations.AddField(
+            model_name='slackmessagelogs',
+            name='last_error',
+            field=models.TextField(null=True),
+        ),
+        # added without a default first so that messages which failed before the outbox existed are not resent
+        migrations.AddField(
+            model_name='slackmessagelogs',
+            name='next_attempt_time',
+            field=models.DateTimeField(null=True),
+        ),
+        migrations.AlterField(
+            model_name='slackmessagelogs',
+            name='next_attempt_time',
+            field=models.DateTimeField(default=django.utils.timezone.now, null=True),
+        ),
+        migrations.AddIndex(
+            model_name='slackmessagelogs',
+            index=models.Index(condition=models.Q(('delivered', False)), fields=['next_attempt_time'], name='slack_message_logs_pending'),
+        ),
+    ]
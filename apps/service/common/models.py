@@ -1,4 +1,5 @@
 from django.db import models
+from django.utils import timezone
 
 
 class Industry(models.Model):
@@ -16,9 +17,21 @@ class Skill(models.Model):
 
 
 class SlackMessageLogs(models.Model):
+    """
+    Outbox of Slack messages.
+
+    Messages are saved in the transaction of the change they announce and posted by the `deliver_slack_messages`
+    worker. Undelivered messages are retried at `next_attempt_time`, a null value means delivery was given up.
+    """
     message = models.TextField()
     created_time = models.DateTimeField(auto_now_add=True)
     delivered = models.BooleanField(default=False)
+    delivered_time = models.DateTimeField(null=True)
+    attempts = models.IntegerField(default=0)
+    next_attempt_time = models.DateTimeField(null=True, default=timezone.now)
+    last_error = models.TextField(null=True)
 
     class Meta:
         db_table = 'slack_message_logs'
+        indexes = [models.Index(fields=['next_attempt_time'], name='slack_message_logs_pending',
+                                condition=models.Q(delivered=False))]
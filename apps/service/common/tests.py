@@ -1,5 +1,11 @@
+import json
 import logging
+import os
+import tempfile
 
+from django.core.management import call_command
+from django.db import transaction
+from django.utils import timezone
 from django.urls import reverse
 from rest_framework import status
 from rest_framework.test import APITestCase
@@ -7,8 +13,15 @@ from django.test import override_settings, TestCase
 
 from unittest.mock import patch
 
-from user.models import User
+from slack_sdk import WebClient
+
+from assets.models import InUseAsset
+from project.models import ProjectAllocation, ProjectAllocationRequest, Notification
+from user.models import User, LeavePlans, ProficiencyMapping, UserAvailability
 from common.constants import ResponseKeys
+from common.models import SlackMessageLogs
+from utils.slack_message import send_slack_message, deliver_slack_messages
+from utils.slack_stub import SlackStubServer
 
 
 class BaseTestCase(APITestCase):
@@ -74,3 +87,84 @@ class HealthCheckTestCase(TestCase):
         }
 
         self.assertJSONEqual(response.content, expected_data)
+
+
+class GenerateLoadDataTestCase(TestCase):
+
+    def test_generate_load_data(self):
+        call_command('generate_load_data', users=20, clients=2, projects=5, open_positions=3, requests=5,
+                     notifications=10, assets=4, batch_size=7)
+
+        self.assertEqual(User.objects.filter(email__startswith='load.').count(), 20)
+        self.assertTrue(ProficiencyMapping.objects.exists())
+        self.assertTrue(LeavePlans.objects.exists())
+        self.assertEqual(ProjectAllocationRequest.objects.count(), 5)
+        self.assertEqual(Notification.objects.count(), 10)
+        self.assertEqual(InUseAsset.objects.count(), 4)
+        # derived availability is rebuilt for the loaded allocations
+        self.assertEqual(UserAvailability.objects.filter(user__allocation__isnull=False).exists(),
+                         ProjectAllocation.objects.filter(tentative=False).exists())
+
+
+class RunBenchmarksTestCase(TestCase):
+
+    def test_run_benchmarks(self):
+        call_command('generate_load_data', users=20, clients=2, projects=5, open_positions=3, requests=5,
+                     notifications=10, assets=4)
+        with tempfile.TemporaryDirectory() as directory:
+            output = os.path.join(directory, 'results.json')
+            call_command('run_benchmarks', repeat=1, output=output)
+            call_command('run_benchmarks', repeat=1, output=output, cases=['dashboard.skill'], compare=output)
+            with open(output) as results:
+                results = json.load(results)
+
+        self.assertEqual(results['meta']['dataset']['users'], 20)
+        self.assertEqual(set(results['cases']),
+                         {'dashboard.skill', 'dashboard.skill_cafe', 'dashboard.skill_experience'})
+        for result in results['cases'].values():
+            self.assertEqual(set(result), {'wall_ms', 'db_ms', 'queries', 'peak_memory_kb'})
+
+
+class SlackOutboxTestCase(TestCase):
+
+    def setUp(self):
+        self.slack = SlackStubServer().start()
+        self.addCleanup(self.slack.stop)
+        patcher = patch('utils.slack_message.slack_client', WebClient(base_url=self.slack.url, retry_handlers=[]))
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_send_slack_message_is_queued(self):
+        send_slack_message('created')
+        with self.assertRaises(ValueError):
+            with transaction.atomic():
+                send_slack_message('rolled back')
+                raise ValueError
+
+        self.assertEqual(list(SlackMessageLogs.objects.values_list('message', flat=True)), ['created'])
+        self.assertEqual(self.slack.messages, [])
+
+        call_command('deliver_slack_messages', once=True)
+
+        self.assertEqual([message['text'] for message in self.slack.messages], ['created'])
+        self.assertTrue(SlackMessageLogs.objects.get().delivered)
+
+    def test_deliver_slack_messages_retries(self):
+        send_slack_message('failing')
+        send_slack_message('rate limited')
+        self.slack.responses += [(200, {'ok': False, 'error': 'internal_error'}, {}),
+                                 (429, {'ok': False, 'error': 'ratelimited'}, {'Retry-After': '30'})]
+
+        self.assertEqual(deliver_slack_messages(), (1, 30))
+        failing = SlackMessageLogs.objects.get(message='failing')
+        self.assertEqual((failing.delivered, failing.attempts, failing.last_error), (False, 1, 'internal_error'))
+        self.assertGreater(failing.next_attempt_time, timezone.now())
+        rate_limited = SlackMessageLogs.objects.get(message='rate limited')
+        self.assertEqual(rate_limited.attempts, 0)
+        self.assertGreater(rate_limited.next_attempt_time, timezone.now() + timezone.timedelta(seconds=25))
+
+        # nothing is due until the backoff is over
+        self.assertEqual(deliver_slack_messages(), (0, None))
+        SlackMessageLogs.objects.update(next_attempt_time=timezone.now())
+        self.assertEqual(deliver_slack_messages(), (2, None))
+        self.assertEqual(SlackMessageLogs.objects.filter(delivered=True).count(), 2)
@@ -1,18 +1,15 @@
 import datetime
 from collections import OrderedDict
 
-from django.db.models import Q, Count, Value, F, Sum, Subquery, OuterRef
-from django.db.models.functions import Concat, Coalesce
+from django.db.models import Q, Count, Value, F
+from django.db.models.functions import Concat
 from rest_framework import serializers
 
 from client.models import Client
 from common.models import Industry
 from dashboard.constant import ErrorMessages, RequestKeys, SerializerKeys
 from project.models import ProjectAllocation, ProjectRole, ProjectPosition
-from user.constants import StatusKeys, FunctionKeys, CurrentStatusKeys, EmployeeTypeValues, GenderValues, \
-    FunctionValues, ValueConstants
 from user.models import User, ProficiencyMapping
-from user.services import list_cafe_users
 from utils.utils import camel_to_snake
 
 
@@ -40,193 +37,56 @@ class DashboardEmployeesDetailsRequestSerializer(serializers.Serializer):
         return {camel_to_snake(attr): value for attr, value in data.items()}
 
 
-class DashboardEmployeesDetailsResponseSerializer(serializers.ModelSerializer):
-    total_people_count = serializers.SerializerMethodField()
-    employees_count = serializers.SerializerMethodField()
-    contractor_count = serializers.SerializerMethodField()
-    intern_count = serializers.SerializerMethodField()
-    female_count = serializers.SerializerMethodField()
-    male_count = serializers.SerializerMethodField()
-    support_people = serializers.SerializerMethodField()
-    delivery_people = serializers.SerializerMethodField()
-    allocated_people = serializers.SerializerMethodField()
-    cafe_people = serializers.SerializerMethodField()
-    potential_cafe_people = serializers.SerializerMethodField()
+def percent_change(count, last_month_count):
+    if last_month_count == 0:
+        return 0
+    return ((count - last_month_count) / last_month_count) * 100
+
+
+class DashboardEmployeesDetailsResponseSerializer(serializers.Serializer):
+    """
+    Serializes the counts of DashboardService.dashboard_employees_metrics, changes are in percent of last month.
+    """
+    total_people_count = serializers.IntegerField()
     changes_in_total_people = serializers.SerializerMethodField()
+    employees_count = serializers.IntegerField()
     changes_in_employees_count = serializers.SerializerMethodField()
+    contractor_count = serializers.IntegerField()
     changes_in_contractor_count = serializers.SerializerMethodField()
+    intern_count = serializers.IntegerField()
     changes_in_intern_count = serializers.SerializerMethodField()
+    male_count = serializers.IntegerField()
+    female_count = serializers.IntegerField()
+    support_people = serializers.IntegerField()
+    delivery_people = serializers.IntegerField()
+    allocated_people = serializers.IntegerField()
     changes_in_allocated_people = serializers.SerializerMethodField()
+    cafe_people = serializers.IntegerField()
     changes_in_cafe_people = serializers.SerializerMethodField()
+    potential_cafe_people = serializers.IntegerField()
     changes_in_potential_cafe_people = serializers.SerializerMethodField()
 
-    def get_total_people_count(self, instance):
-        value = len(instance.filter())
-        return value
-
-    def get_employees_count(self, instance):
-        return len(instance.filter(employee_type=EmployeeTypeValues.PERMANENT))
-
-    def get_contractor_count(self, instance):
-        return len(instance.filter(employee_type=EmployeeTypeValues.ON_CONTRACT))
-
-    def get_intern_count(self, instance):
-        return len(instance.filter(employee_type=EmployeeTypeValues.INTERN))
-
-    def get_male_count(self, instance):
-        return len(instance.filter(gender=GenderValues.MALE))
-
-    def get_female_count(self, instance):
-        return len(instance.filter(gender=GenderValues.FEMALE))
-
-    def get_support_people(self, instance):
-        return len(instance.filter(function=FunctionValues.SUPPORT))
-
-    def get_delivery_people(self, instance):
-        return len(instance.filter(function=FunctionValues.DELIVERY))
-
-    def get_allocated_people(self, instance):
-        current_date = datetime.date.today()
-        billable_user_ids = ProjectAllocation.objects.filter(position__is_billable=True,
-                                                             start_date__lte=current_date,
-                                                             end_date__gte=current_date) \
-            .values('user_id')
-        included_status = [CurrentStatusKeys.FULLY_ALLOCATED,
-                           CurrentStatusKeys.SERVING_NP, CurrentStatusKeys.CAFE]
-        users = instance.filter(id__in=billable_user_ids, current_status__in=included_status, status=StatusKeys.ACTIVE,
-                                function=FunctionKeys.DELIVERY).count()
-        return users
-
-    def get_cafe_people(self, instance):
-        return instance.filter(current_status=CurrentStatusKeys.CAFE).count()
-
-    def get_potential_cafe_people(self, instance):
-        users = list_cafe_users().values('id')
-        return instance.filter(id__in=users, current_status=CurrentStatusKeys.FULLY_ALLOCATED).count()
-
     def get_changes_in_total_people(self, instance):
-        current_date = datetime.date.today()
-        last_day_of_last_month = current_date.replace(
-            day=1) - datetime.timedelta(days=1)
-        last_month_count = len(
-            instance.filter(Q(date_of_joining__lte=last_day_of_last_month)))
-        total_count = len(instance.filter())
-
-        if last_month_count == 0:
-            return 0
-
-        return ((total_count - last_month_count) / last_month_count) * 100
+        return percent_change(instance['total_people_count'], instance['last_month_people_count'])
 
     def get_changes_in_employees_count(self, instance):
-        current_date = datetime.date.today()
-        last_day_of_last_month = current_date.replace(
-            day=1) - datetime.timedelta(days=1)
-        last_month_count = len(instance.filter(Q(employee_type=EmployeeTypeValues.PERMANENT),
-                                               Q(date_of_joining__lte=last_day_of_last_month)))
-        total_count = len(instance.filter(
-            Q(employee_type=EmployeeTypeValues.PERMANENT)))
-
-        if last_month_count == 0:
-            return 0
-
-        return ((total_count - last_month_count) / last_month_count) * 100
+        return percent_change(instance['employees_count'], instance['last_month_employees_count'])
 
     def get_changes_in_contractor_count(self, instance):
-        current_date = datetime.date.today()
-        last_day_of_last_month = current_date.replace(
-            day=1) - datetime.timedelta(days=1)
-        last_month_count = len(instance.filter(Q(employee_type=EmployeeTypeValues.ON_CONTRACT),
-                                               Q(date_of_joining__lte=last_day_of_last_month)))
-        total_count = len(instance.filter(
-            Q(employee_type=EmployeeTypeValues.ON_CONTRACT)))
-
-        if last_month_count == 0:
-            return 0
-        return ((total_count - last_month_count) / last_month_count) * 100
+        return percent_change(instance['contractor_count'], instance['last_month_contractor_count'])
 
     def get_changes_in_intern_count(self, instance):
-        current_date = datetime.date.today()
-        last_day_of_last_month = current_date.replace(
-            day=1) - datetime.timedelta(days=1)
-        last_month_count = len(instance.filter(Q(employee_type=EmployeeTypeValues.INTERN),
-                                               Q(date_of_joining__lte=last_day_of_last_month)))
-        total_count = len(instance.filter(
-            Q(employee_type=EmployeeTypeValues.INTERN)))
-
-        if last_month_count == 0:
-            return 0
-        return ((total_count - last_month_count) / last_month_count) * 100
+        return percent_change(instance['intern_count'], instance['last_month_intern_count'])
 
     def get_changes_in_allocated_people(self, instance):
-        current_date = datetime.date.today()
-        last_day_of_last_month = current_date.replace(
-            day=1) - datetime.timedelta(days=1)
-        total_allocated_users = ProjectAllocation.objects.filter(user__in=instance, position__is_billable=True,
-                                                                 start_date__lte=current_date,
-                                                                 end_date__gte=current_date).values(
-                                                                     'user_id').distinct().count()
-        last_month_count = ProjectAllocation.objects.filter(user__in=instance, position__is_billable=True,
-                                                            start_date__lte=last_day_of_last_month,
-                                                            end_date__gte=last_day_of_last_month).values(
-                                                                'user_id').distinct().count()
-
-        if last_month_count == 0:
-            return 0
-
-        return ((total_allocated_users - last_month_count) / last_month_count) * 100
+        # every user on a billable allocation, not only the allocated delivery people
+        return percent_change(instance['billable_people'], instance['last_month_allocated_people'])
 
     def get_changes_in_cafe_people(self, instance):
-        current_date = datetime.date.today()
-        last_day_of_last_month = current_date.replace(
-            day=1) - datetime.timedelta(days=1)
-        total_cafe_people = instance.filter(current_status='Cafe').count()
-        last_month_cafe_users = list_cafe_users(
-            start_date=last_day_of_last_month, end_date=last_day_of_last_month).values('id')
-        last_month_cafe_count = instance.filter(
-            id__in=last_month_cafe_users).count()
-
-        if last_month_cafe_count == 0:
-            return 0
-
-        return ((total_cafe_people - last_month_cafe_count) / last_month_cafe_count) * 100
+        return percent_change(instance['cafe_people'], instance['last_month_cafe_people'])
 
     def get_changes_in_potential_cafe_people(self, instance):
-        current_date = datetime.date.today()
-        last_day_of_last_month = current_date.replace(
-            day=1) - datetime.timedelta(days=1)
-        current_potential_cafe_users = list_cafe_users().values('id')
-        current_potential_cafe_count = instance.filter(
-            id__in=current_potential_cafe_users, current_status=CurrentStatusKeys.FULLY_ALLOCATED).count()
-
-        subquery = Subquery(
-            ProjectAllocation.objects.filter(
-                user_id=OuterRef('id'),
-                start_date__lte=last_day_of_last_month,
-                end_date__gte=last_day_of_last_month
-            ).values('user_id').annotate(
-                total_utilization=Coalesce(Sum('utilization'), Value(0))
-            ).values('total_utilization'))
-
-        previous_potential_cafe_users = list_cafe_users(
-            start_date=last_day_of_last_month, end_date=last_day_of_last_month + datetime.timedelta(
-                days=30)).annotate(
-            total_utilization=subquery).filter(total_utilization__gte=ValueConstants.MAXIMUM_CAFE_UTILIZATION)
-
-        previous_potential_cafe_count = instance.filter(
-            id__in=previous_potential_cafe_users).count()
-
-        if previous_potential_cafe_count == 0:
-            return 0
-
-        return ((current_potential_cafe_count - previous_potential_cafe_count) / previous_potential_cafe_count) * 100
-
-    class Meta:
-        model = User
-        fields = ('total_people_count', 'changes_in_total_people', 'employees_count', 'changes_in_employees_count',
-                  'contractor_count', 'changes_in_contractor_count', 'intern_count', 'changes_in_intern_count',
-                  'male_count', 'female_count',
-                  'support_people', 'delivery_people', 'allocated_people', 'changes_in_allocated_people', 'cafe_people',
-                  'changes_in_cafe_people', 'potential_cafe_people', 'changes_in_potential_cafe_people')
+        return percent_change(instance['potential_cafe_people'], instance['last_month_potential_cafe_people'])
 
 
 class DashboardCurrentAllocationRequestSerializer(serializers.Serializer):
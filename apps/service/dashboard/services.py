@@ -1,7 +1,7 @@
 import datetime
 
 from django.contrib.postgres.aggregates import ArrayAgg
-from django.db.models import Count, When, CharField, Case, Q, DateField
+from django.db.models import Count, When, CharField, Case, Q, DateField, Sum, Subquery, OuterRef
 from django.db.models import F, IntegerField, ExpressionWrapper, BooleanField, Value
 from django.db.models.expressions import RawSQL
 from django.db.models.functions import Extract, Floor, Coalesce, Concat, Cast
@@ -11,8 +11,10 @@ from common.models import Industry
 from dashboard.models import AddYearInterval
 from project.models import ProjectAllocation, Client, ProjectRole
 from user.models import User, ProficiencyMapping
-from user.services import list_cafe_users
-from user.constants import CurrentStatusKeys
+from user.services import list_cafe_users, UserUtilizationSnapshotService
+from user.constants import CurrentStatusKeys, StatusKeys, FunctionKeys, FunctionValues, EmployeeTypeValues, \
+    GenderValues, ValueConstants
+from utils.utilization import covered_days, ALLOCATION_PERIOD, POSITION_PERIOD, VALID_ALLOCATION_PERIOD
 
 
 class DashboardService:
@@ -21,6 +23,64 @@ class DashboardService:
         user = User.objects.filter(Q(status='Active'))
         return user
 
+    def dashboard_employees_metrics(self, users):
+        """
+        Method to count the given users for the headline metrics of the dashboard, now and as of the last day of the
+        previous month. All counts come from one conditional aggregation, the allocation and cafe based ones test
+        membership in subqueries of the same statement.
+        """
+        current_date = datetime.date.today()
+        last_day_of_last_month = current_date.replace(day=1) - datetime.timedelta(days=1)
+        joined_last_month = Q(date_of_joining__lte=last_day_of_last_month)
+
+        # running allocations by the same rule as the utilization facts of last month, open ended ones included
+        billable_user_ids = ProjectAllocation.objects.filter(
+            Q(end_date__gte=current_date) | Q(end_date__isnull=True), position__is_billable=True,
+            start_date__lte=current_date).values('user_id')
+        allocated_statuses = [CurrentStatusKeys.FULLY_ALLOCATED, CurrentStatusKeys.SERVING_NP, CurrentStatusKeys.CAFE]
+        potential_cafe = Q(id__in=list_cafe_users().values('id'), current_status=CurrentStatusKeys.FULLY_ALLOCATED)
+
+        last_month_snapshots = UserUtilizationSnapshotService().day_facts(last_day_of_last_month)
+        last_month_allocated_ids = last_month_snapshots.filter(billable_utilization__gt=0).values('user_id')
+        last_month_cafe_ids = last_month_snapshots.annotate(
+            utilization=F('billable_utilization') + F('non_billable_utilization')).filter(
+            utilization__lt=ValueConstants.MAXIMUM_CAFE_UTILIZATION).values('user_id')
+        last_month_utilization = Subquery(
+            ProjectAllocation.objects.filter(
+                user_id=OuterRef('id'),
+                start_date__lte=last_day_of_last_month,
+                end_date__gte=last_day_of_last_month
+            ).values('user_id').annotate(
+                total_utilization=Coalesce(Sum('utilization'), Value(0))
+            ).values('total_utilization'))
+        last_month_potential_cafe_ids = list_cafe_users(
+            start_date=last_day_of_last_month, end_date=last_day_of_last_month + datetime.timedelta(days=30)) \
+            .annotate(total_utilization=last_month_utilization) \
+            .filter(total_utilization__gte=ValueConstants.MAXIMUM_CAFE_UTILIZATION).values('id')
+
+        employee_types = {'employees': EmployeeTypeValues.PERMANENT, 'contractor': EmployeeTypeValues.ON_CONTRACT,
+                          'intern': EmployeeTypeValues.INTERN}
+        counts = {
+            'total_people_count': Count('id'),
+            'last_month_people_count': Count('id', filter=joined_last_month),
+            'female_count': Count('id', filter=Q(gender=GenderValues.FEMALE)),
+            'male_count': Count('id', filter=Q(gender=GenderValues.MALE)),
+            'support_people': Count('id', filter=Q(function=FunctionValues.SUPPORT)),
+            'delivery_people': Count('id', filter=Q(function=FunctionValues.DELIVERY)),
+            'allocated_people': Count('id', filter=Q(id__in=billable_user_ids, current_status__in=allocated_statuses,
+                                                     status=StatusKeys.ACTIVE, function=FunctionKeys.DELIVERY)),
+            'billable_people': Count('id', filter=Q(id__in=billable_user_ids)),
+            'last_month_allocated_people': Count('id', filter=Q(id__in=last_month_allocated_ids)),
+            'cafe_people': Count('id', filter=Q(current_status=CurrentStatusKeys.CAFE)),
+            'last_month_cafe_people': Count('id', filter=Q(id__in=last_month_cafe_ids)),
+            'potential_cafe_people': Count('id', filter=potential_cafe),
+            'last_month_potential_cafe_people': Count('id', filter=Q(id__in=last_month_potential_cafe_ids)),
+        }
+        for name, employee_type in employee_types.items():
+            counts[f'{name}_count'] = Count('id', filter=Q(employee_type=employee_type))
+            counts[f'last_month_{name}_count'] = Count('id', filter=Q(employee_type=employee_type) & joined_last_month)
+        return users.aggregate(**counts)
+
     def dashboard_allocated_employee(self):
         users = User.objects.filter(
             status='Active', career_start_date__isnull=False).exclude(current_status='Cafe')
@@ -193,39 +253,23 @@ class DashboardService:
         if not sort_asc:
             order_by = "-"
 
-        query = """
-                 with
-                 day_wise_position_allocation as (
-                    select
-                        position_id,
-                        generate_series(start_date, end_date, '1 day')::date as day,
-                        coalesce(sum(utilization), 0) as total_util
-                    from project_allocation
-                    group by position_id, day
-                ),
-                day_wise_project_position as (
-                    select
-                        id,
-                        generate_series(start_date, end_date, '1 day')::date as day,
-                        coalesce(sum(utilization), 0) as total_util
-                    from project_position
-                    where start_date <= current_date and end_date >= current_date
-                    group by id, day
-                ),
-                day_wise_utilization_diff as (
-                    select
-                        pos.id,
-                        pos.day as day,
-                        pos.total_util - coalesce(alloc.total_util, 0) as diff
-                    from day_wise_project_position pos
-                    left join day_wise_position_allocation alloc on pos.id=alloc.position_id and pos.day=alloc.day
-                )
-                select array_agg(distinct(util_diff.id))
-                    from day_wise_utilization_diff util_diff
-                    join project_position pos on pos.id = util_diff.id
-                    where util_diff.diff > 0 and pos.project_role_id = project_role.id
-                    group by project_role.id
-            """
+        # a position active today is open if its allocations fall short of the position utilization
+        # on any day of the position i.e. the position is not covered throughout its period
+        windows = f"""
+            select id as key, {POSITION_PERIOD} as period, utilization as threshold
+            from project_position
+            where project_role_id = project_role.id and start_date <= current_date and end_date >= current_date
+        """
+        intervals = f"""
+            select position_id as key, {ALLOCATION_PERIOD} as period, utilization, 0 as leaves
+            from project_allocation
+            where {VALID_ALLOCATION_PERIOD} and position_id in (select key from windows)
+        """
+        query = f"""
+            select array_agg(key order by key)
+            from ({covered_days(intervals, windows)}) d
+            where covered_days < window_days
+        """
 
         project_roles = ProjectRole.objects.annotate(open_positions=RawSQL(query, params=[])
                                                      ).filter(open_positions__isnull=False).distinct()
@@ -2,10 +2,13 @@ import logging
 import datetime
 
 from user.constants import PermissionKeys, FunctionKeys
-from user.models import User, Role, ProficiencyMapping, Skill
+from user.models import User, Role, ProficiencyMapping, Skill, UserUtilizationSnapshot
 from client.models import Client
 from project.models import Project, ProjectRole, ProjectPosition, ProjectAllocation
 from dashboard.constant import ResponseKeys
+from dashboard.serializers import DashboardEmployeesDetailsResponseSerializer
+from dashboard.services import DashboardService
+from user.services import UserUtilizationSnapshotService, list_cafe_users
 from rest_framework.test import APITestCase
 from rest_framework import status
 
@@ -115,6 +118,61 @@ class ReportAPIViewTest(BaseTestCase):
                 self.assertEqual(potential_cafe_count, 1)
                 self.assertEqual(delivery_count, 2)
 
+    def test_employee_metrics_query_count(self):
+        service = DashboardService()
+        last_day_of_last_month = datetime.date.today().replace(day=1) - datetime.timedelta(days=1)
+        ProjectAllocation.objects.create(user=self.user, position=self.position, utilization=60,
+                                         start_date=last_day_of_last_month, end_date=last_day_of_last_month)
+        # the check for last month's facts and one aggregation for every metric
+        with self.assertNumQueries(2):
+            computed_metrics = service.dashboard_employees_metrics(service.dashboard_employees_detail())
+        # requests only read, without the snapshot of the job the facts are computed
+        self.assertFalse(UserUtilizationSnapshot.objects.exists())
+
+        UserUtilizationSnapshotService().snapshot(last_day_of_last_month)
+        with self.assertNumQueries(2):
+            metrics = service.dashboard_employees_metrics(service.dashboard_employees_detail())
+        self.assertEqual(metrics, computed_metrics)
+        self.assertEqual(metrics['last_month_allocated_people'], 1)
+        self.assertEqual(metrics['last_month_cafe_people'], 1)
+        self.assertEqual(metrics['total_people_count'], 2)
+        self.assertEqual(metrics['allocated_people'], 1)
+        self.assertEqual(metrics['billable_people'], 1)
+        self.assertEqual(metrics['cafe_people'], 1)
+        self.assertEqual(metrics['potential_cafe_people'], 1)
+
+    def test_employee_metrics_open_ended_allocation(self):
+        service = DashboardService()
+        last_day_of_last_month = datetime.date.today().replace(day=1) - datetime.timedelta(days=1)
+        ProjectAllocation.objects.all().delete()
+        ProjectAllocation.objects.create(user=self.user, position=self.position, utilization=60,
+                                         start_date=last_day_of_last_month - datetime.timedelta(days=30), end_date=None)
+
+        # running both now and last month, the allocated people did not change
+        for snapshot in (False, True):
+            if snapshot:
+                UserUtilizationSnapshotService().snapshot(last_day_of_last_month)
+            metrics = service.dashboard_employees_metrics(service.dashboard_employees_detail())
+            self.assertEqual((metrics['billable_people'], metrics['last_month_allocated_people']), (1, 1))
+            self.assertEqual(DashboardEmployeesDetailsResponseSerializer(metrics).data['changes_in_allocated_people'],
+                             0)
+
+    def test_open_ended_allocation_covers_position_and_user(self):
+        service = DashboardService()
+        ProjectAllocation.objects.all().delete()
+        allocation = ProjectAllocation.objects.create(user=self.user, position=self.position, utilization=60,
+                                                      start_date=self.position.start_date, end_date=None)
+
+        # an allocation without an end date covers the position through its end and the user through any period
+        self.assertEqual(list(service.dashboard_project_open_position(project_id=self.project.id)), [])
+        self.assertNotIn(self.user, list_cafe_users())
+
+        allocation.end_date = datetime.date.today() + datetime.timedelta(days=10)
+        allocation.save()
+        open_positions = service.dashboard_project_open_position(project_id=self.project.id)
+        self.assertEqual([role.open_positions for role in open_positions], [[self.position.id]])
+        self.assertIn(self.user, list_cafe_users())
+
     def test_current_allocation_api_view(self):
         self.client.force_authenticate(user=self.user)
         test_cases = [
@@ -44,7 +44,8 @@ class DashboardEmployeesDetailsAPIView(APIView):
         role_id = req_serializer.validated_data.get(RequestKeys.ROLE_ID)
 
         users = service.dashboard_employees_detail()
-        emp_response_serializer = DashboardEmployeesDetailsResponseSerializer(users)
+        emp_response_serializer = DashboardEmployeesDetailsResponseSerializer(
+            service.dashboard_employees_metrics(users))
         skills = service.dashboard_skill('cafe', skills_sort_asc)
         open_positions_roles = service.dashboard_project_open_position(project_id, role_id, open_positions_sort_asc)
         open_positions_response = DashboardOpenPositionsProjectRoleResponseSerializer(open_positions_roles, many=True,
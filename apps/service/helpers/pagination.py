@@ -1,10 +1,125 @@
+import json
+from base64 import urlsafe_b64decode, urlsafe_b64encode
+
+from django.core.exceptions import ValidationError
 from django.core.paginator import Paginator
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db.models import Q
+from rest_framework import serializers
 
 
-def paginate(objects, page, size):
+def paginate(objects, page, size, count=None):
     """
     Method to paginate objects as per given page and size.
+
+    When the total count is known (e.g. from a cheaper unannotated query) it can be passed to avoid a COUNT over
+    the given objects, only the requested page is fetched.
     """
     paginator = Paginator(objects, size)
+    if count is not None:
+        paginator.count = count
     page = paginator.get_page(page)
     return page
+
+
+def encode_cursor(*values):
+    """
+    Method to encode the sort key of the last object of a page as an opaque cursor for keyset pagination.
+    """
+    return urlsafe_b64encode(json.dumps(values, cls=DjangoJSONEncoder).encode()).decode()
+
+
+def decode_cursor(cursor):
+    """
+    Method to decode a cursor of `encode_cursor` into the list of its values, raises ValueError if it is malformed.
+    """
+    try:
+        values = json.loads(urlsafe_b64decode(cursor.encode()))
+    except (TypeError, ValueError):
+        raise ValueError('Invalid cursor')
+    if not isinstance(values, list):
+        raise ValueError('Invalid cursor')
+    return values
+
+
+class CursorField(serializers.CharField):
+    """
+    Serializer field of a keyset pagination cursor, validated into the list of its values. A blank or null cursor
+    asks for the first page.
+    """
+    default_error_messages = {'invalid_cursor': 'Invalid cursor'}
+
+    def __init__(self, **kwargs):
+        kwargs.setdefault('required', False)
+        kwargs.setdefault('allow_blank', True)
+        kwargs.setdefault('allow_null', True)
+        super().__init__(**kwargs)
+
+    def run_validation(self, data=serializers.empty):
+        cursor = super().run_validation(data)
+        if not cursor:
+            return None
+        try:
+            return decode_cursor(cursor)
+        except ValueError:
+            self.fail('invalid_cursor')
+
+
+def keyset_ordering(keys):
+    """
+    Method to return the `order_by` arguments of the given (field, descending) sort keys, the primary key is added
+    as tie breaker so that the order is total and keyset pages neither skip nor repeat objects.
+    """
+    return [f'-{field}' if descending else field for field, descending in keys] + ['pk']
+
+
+def keyset_filter(keys, values):
+    """
+    Method to build the filter matching the objects sorted after the given sort key values of `keyset_ordering`.
+
+    Nulls are placed the way Postgres sorts them by default, last in ascending and first in descending order.
+    """
+    keys = list(keys) + [('pk', False)]
+    after = Q(pk__in=[])
+    equal = Q()
+    for (field, descending), value in zip(keys, values):
+        if value is None:
+            # ascending only nulls follow a null, descending every value does
+            step = Q(**{f'{field}__isnull': False}) if descending else Q(pk__in=[])
+            same = Q(**{f'{field}__isnull': True})
+        else:
+            step = Q(**{f'{field}__lt' if descending else f'{field}__gt': value})
+            if not descending:
+                step |= Q(**{f'{field}__isnull': True})
+            same = Q(**{field: value})
+        after |= equal & step
+        equal &= same
+    return after
+
+
+def paginate_keyset(objects, keys, cursor, size):
+    """
+    Method to paginate objects by seeking past the last object of the previous page instead of counting and
+    skipping rows, so deep pages cost as much as the first one.
+
+    `keys` are the (field, descending) pairs the objects are sorted by and `cursor` the decoded cursor of the
+    previous page, None for the first one. Returns the page and the cursor of the next page, None on the last page.
+    Raises ValueError if the cursor does not match the sort keys.
+    """
+    objects = objects.order_by(*keyset_ordering(keys))
+    if cursor is not None:
+        if len(cursor) != len(keys) + 1:
+            raise ValueError('Invalid cursor')
+        try:
+            objects = objects.filter(keyset_filter(keys, cursor))
+        except (TypeError, ValidationError):
+            # values of the wrong type for their field, e.g. a cursor of another sort order
+            raise ValueError('Invalid cursor')
+
+    # one more object tells whether there is a next page without counting
+    page = list(objects[:size + 1])
+    if len(page) <= size:
+        return page, None
+    page = page[:size]
+    last = page[-1]
+    return page, encode_cursor(*[getattr(last, field) for field, _ in keys], last.pk)
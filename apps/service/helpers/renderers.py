@@ -0,0 +1,10 @@
+from djangorestframework_camel_case.render import CamelCaseJSONRenderer
+
+
+class EventStreamRenderer(CamelCaseJSONRenderer):
+    """
+    Lets views streaming server-sent events pass content negotiation, the events are written by the view and
+    only error responses are rendered (as JSON).
+    """
+    media_type = 'text/event-stream'
+    format = 'event-stream'
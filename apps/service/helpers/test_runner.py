@@ -0,0 +1,36 @@
+import unittest
+
+from django.core.cache import cache
+from django.test.runner import DiscoverRunner
+from django.test.utils import override_settings
+
+
+class CacheClearingTestResult(unittest.TextTestResult):
+
+    def startTest(self, test):
+        # cached permissions and search rankings would outlive the rolled back data of the previous test
+        cache.clear()
+        super().startTest(test)
+
+
+class TestRunner(DiscoverRunner):
+    """
+    Test runner starting every test with an empty cache.
+
+    Tests run in one process, so they use a process local cache with the default timeouts. Reads of a shared
+    database cache would add to the queries the tests count.
+    """
+
+    def setup_test_environment(self, **kwargs):
+        super().setup_test_environment(**kwargs)
+        self.cache_settings = override_settings(
+            CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}},
+            SEARCH_CACHE_TIMEOUT=60, PERMISSION_CACHE_TIMEOUT=3600)
+        self.cache_settings.enable()
+
+    def teardown_test_environment(self, **kwargs):
+        self.cache_settings.disable()
+        super().teardown_test_environment(**kwargs)
+
+    def get_resultclass(self):
+        return super().get_resultclass() or CacheClearingTestResult
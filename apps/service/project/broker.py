@@ -0,0 +1,118 @@
+import json
+import os
+import queue
+import select
+import threading
+from collections import defaultdict
+
+import psycopg2
+from django.conf import settings
+from django.db import connections
+
+from project.constants import NotificationStreamValues
+from utils.log import log_exception
+
+
+class NotificationBroker:
+    """
+    Fans notifications out to the streams of their receivers as they are committed.
+
+    A trigger on the notification table publishes every insert with NOTIFY. One listener thread per process keeps a
+    dedicated connection on LISTEN, so waiting streams cost neither queries nor connections.
+    """
+
+    def __init__(self, channel=NotificationStreamValues.CHANNEL):
+        self.channel = channel
+        self.lock = threading.Lock()
+        self.subscribers = defaultdict(set)
+        self.listening = threading.Event()
+        self.stopping = threading.Event()
+        # wakes the listener up from select() when it is stopped, created with the thread so that it is not shared
+        # by the processes forked from the one importing the broker
+        self.wakeup_read = self.wakeup_write = None
+        self.thread = None
+        self.streams = 0
+
+    def subscribe(self, user_id):
+        """
+        Return a queue receiving the ids of the notifications committed for the user from now on.
+        """
+        subscriber = queue.SimpleQueue()
+        with self.lock:
+            self.subscribers[user_id].add(subscriber)
+            if self.thread is None or not self.thread.is_alive():
+                self.stopping.clear()
+                if self.wakeup_read is None:
+                    self.wakeup_read, self.wakeup_write = os.pipe()
+                self.thread = threading.Thread(target=self.listen, name='notification-broker', daemon=True)
+                self.thread.start()
+        return subscriber
+
+    def open_stream(self):
+        """
+        Take one of the NOTIFICATION_MAX_STREAMS streams of the process, returns False when all are taken.
+        """
+        with self.lock:
+            if self.streams >= settings.NOTIFICATION_MAX_STREAMS:
+                return False
+            self.streams += 1
+            return True
+
+    def close_stream(self):
+        with self.lock:
+            self.streams -= 1
+
+    def unsubscribe(self, user_id, subscriber):
+        with self.lock:
+            self.subscribers[user_id].discard(subscriber)
+            if not self.subscribers[user_id]:
+                del self.subscribers[user_id]
+
+    def stop(self):
+        """
+        Stop the listener thread and close its connection, it is started again by the next subscription.
+        """
+        with self.lock:
+            thread, self.thread = self.thread, None
+        if thread is not None:
+            self.stopping.set()
+            os.write(self.wakeup_write, b'\0')
+            thread.join()
+            os.read(self.wakeup_read, 1)
+
+    def publish(self, payload):
+        notification = json.loads(payload)
+        with self.lock:
+            subscribers = list(self.subscribers.get(notification['receiver_id'], ()))
+        for subscriber in subscribers:
+            subscriber.put(notification['id'])
+
+    def listen(self):
+        while not self.stopping.is_set():
+            try:
+                self.listen_once()
+            except (psycopg2.Error, OSError) as e:
+                log_exception(e)
+                self.stopping.wait(NotificationStreamValues.RECONNECT_SECONDS)
+            finally:
+                self.listening.clear()
+
+    def listen_once(self):
+        listener = psycopg2.connect(**connections['default'].get_connection_params())
+        try:
+            listener.set_session(autocommit=True)
+            with listener.cursor() as cursor:
+                cursor.execute(f'LISTEN {self.channel}')
+            self.listening.set()
+            while True:
+                ready, _, _ = select.select([listener, self.wakeup_read], [], [])
+                if self.wakeup_read in ready:
+                    return
+                listener.poll()
+                while listener.notifies:
+                    self.publish(listener.notifies.pop(0).payload)
+        finally:
+            listener.close()
+
+
+notification_broker = NotificationBroker()
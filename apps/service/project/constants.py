@@ -1,5 +1,9 @@
 DEFAULT_PAGE_NUMBER = 1
 DEFAULT_PAGE_SIZE = 6
+# closed projects listed per Slack message of the nightly digest
+CLOSED_PROJECTS_PER_DIGEST = 50
+NOTIFICATION_PAGE_SIZE = 50
+MAX_NOTIFICATION_PAGE_SIZE = 200
 
 
 class PermissionKeys:
@@ -72,10 +76,12 @@ class RequestKeys:
     TENTATIVE = 'tentative'
     RESPONSE_DATE_START = 'response_date_start'
     RESPONSE_DATE_END = 'response_date_end'
+    AS_OF = 'as_of'
     KT_PERIOD = 'kt_period'
     ALLOCATION = 'allocation'
     UNSEEN = 'unseen'
     IS_BILLABLE = 'is_billable'
+    CURSOR = 'cursor'
 
 
 class ResponseKeys:
@@ -98,6 +104,7 @@ class ResponseKeys:
     CODE = 'code'
     ACCOUNT_MANAGERS = 'account_managers'
     NOTIFICATIONS = 'notifications'
+    NEXT_CURSOR = 'next_cursor'
 
 
 class SerializerKeys:
@@ -134,6 +141,18 @@ class ErrorMessages:
     INVALID_PROJECT_ALLOCATION_ID = 'Invalid project allocation ID'
     INVALID_NOTIFICATION_REQUEST = 'Invalid notification request'
     INVALID_NOTIFICATION_ID = 'Invalid notification ID'
+    INVALID_CURSOR = 'Invalid cursor'
     USER_WILL_NOT_BE_AVAILABLE_TILL_GIVEN_DATE = 'User will not be available till given date'
     USERS_ALLOCATED_TO_THIS_POSITION = 'Users allocated to this position'
     NO_AM_ASSIGNED = "No Account Manager assigned."
+
+
+class NotificationStreamValues:
+    CHANNEL = 'notification'
+    KEEP_ALIVE_SECONDS = 15
+    # streams end after a while and the event source reconnects, so that workers recycle their threads
+    MAX_DURATION_SECONDS = 60
+    # reconnection delays the event source is told, the longer one when the worker serves all the streams it can
+    RETRY_SECONDS = 3
+    BUSY_RETRY_SECONDS = 30
+    RECONNECT_SECONDS = 5
@@ -1,28 +1,51 @@
 import datetime
 
 from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.utils import timezone
+
 from utils.slack_message import send_slack_message
 from project.models import Project
-from project.constants import ErrorMessages
+from project.constants import ErrorMessages, CLOSED_PROJECTS_PER_DIGEST
 
 
 class Command(BaseCommand):
+    # closes the ended projects in one statement and returns what the digest needs
+    query = """
+        with closed as (
+            update project set status = %s, modified_time = %s
+            where end_date < %s and status != %s
+            returning name, client_id, account_manager_id
+        )
+        select closed.name, client.name, trim(users.first_name || ' ' || users.last_name)
+        from closed
+        join client on client.id = closed.client_id
+        left join users on users.id = closed.account_manager_id
+        order by client.name, closed.name
+    """
+
     def __init__(self):
         super().__init__()
 
     def handle(self, *args, **options):
         print("Updating Project Status....")
-        self.update_status()
-        print("Updated Project Status")
+        closed = self.update_status()
+        print(f"Updated Project Status, {closed} projects closed")
 
     def update_status(self):
         today = datetime.date.today()
-        projects = Project.objects.filter(end_date__lt=today)
-
-        for project in projects:
-            project.status = 'CLOSED'
-            account_manager_name = project.account_manager.full_name if project.account_manager \
-                else ErrorMessages.NO_AM_ASSIGNED
-            send_slack_message(f"Project: *{project.name}* was closed on _{datetime.date.today()}_\
-                               \nClient: *{project.client.name}* \nAM: *{account_manager_name}*")
-            project.save()
+        with transaction.atomic():
+            with connection.cursor() as cursor:
+                cursor.execute(self.query, [Project.Status.CLOSED, timezone.now(), today, Project.Status.CLOSED])
+                projects = cursor.fetchall()
+            # the digest is queued in the same transaction, it is only sent if the projects were closed
+            for start in range(0, len(projects), CLOSED_PROJECTS_PER_DIGEST):
+                send_slack_message(self.get_digest(projects[start:start + CLOSED_PROJECTS_PER_DIGEST], today))
+        return len(projects)
+
+    def get_digest(self, projects, today):
+        lines = [f"Projects closed on _{today}_:"]
+        for project_name, client_name, account_manager_name in projects:
+            lines.append(f"• *{project_name}* \nClient: *{client_name}* \n"
+                         f"AM: *{account_manager_name or ErrorMessages.NO_AM_ASSIGNED}*")
+        return "\n".join(lines)
@@ -0,0 +1,14 @@
+from django.db import models
+
+
+class ProjectAllocationHistoryManager(models.Manager):
+    def record(self, allocations, added_by=None):
+        """
+        Method to record the current values of given allocations as their new versions.
+        """
+        return self.bulk_create([self.model(
+            allocation_id=allocation.id, user_id=allocation.user_id, position_id=allocation.position_id,
+            kt_period=allocation.kt_period, tentative=allocation.tentative, start_date=allocation.start_date,
+            end_date=allocation.end_date, utilization=allocation.utilization, added_by=added_by,
+            created_time=allocation.created_time, modified_time=allocation.modified_time
+        ) for allocation in allocations])
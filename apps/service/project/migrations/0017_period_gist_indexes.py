@@ -0,0 +1,23 @@
+# Generated by Django 4.1.3 on 2026-10-18 17:13
+
+import django.contrib.postgres.indexes
+from django.db import migrations, models
+import utils.utilization
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('project', '0016_projectpositionhistory_is_billable'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='projectallocation',
+            index=django.contrib.postgres.indexes.GistIndex(utils.utilization.DateRange('start_date', 'end_date'), condition=models.Q(('end_date__isnull', True), ('end_date__gte', models.F('start_date')), _connector='OR'), name='project_allocation_period'),
+        ),
+        migrations.AddIndex(
+            model_name='projectposition',
+            index=django.contrib.postgres.indexes.GistIndex(utils.utilization.DateRange('start_date', 'end_date'), condition=models.Q(('end_date__isnull', True), ('end_date__gte', models.F('start_date')), _connector='OR'), name='project_position_period'),
+        ),
+    ]
@@ -0,0 +1,21 @@
+# Generated by Django 4.1.3 on 2026-10-18 17:48
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('project', '0018_trigram_indexes'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='notification',
+            index=models.Index(fields=['receiver', 'unseen', 'created_time'], name='notification_receiver_unseen'),
+        ),
+        migrations.AddIndex(
+            model_name='notification',
+            index=models.Index(fields=['sender', 'created_time'], name='notification_sender_created'),
+        ),
+    ]
@@ -0,0 +1,31 @@
+from django.db import migrations
+
+# publishes committed notifications to the listeners of project.broker
+CREATE_TRIGGER = """
+create function notification_notify() returns trigger as $$
+begin
+    perform pg_notify('notification',
+                      json_build_object('id', new.id, 'receiver_id', new.receiver_id)::text);
+    return null;
+end;
+$$ language plpgsql;
+
+create trigger notification_notify after insert on notification
+for each row execute function notification_notify();
+"""
+
+DROP_TRIGGER = """
+drop trigger notification_notify on notification;
+drop function notification_notify();
+"""
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('project', '0019_notification_indexes'),
+    ]
+
+    operations = [
+        migrations.RunSQL(CREATE_TRIGGER, DROP_TRIGGER),
+    ]
@@ -0,0 +1,82 @@
+# Generated by Django 4.1.3 on 2026-10-18 18:05
+
+from django.db import migrations, models
+import django.utils.timezone
+
+# versions recorded so far became current when their row was modified and stay current until the next version
+BACKFILL = """
+update {table} h set valid_from = h.modified_time;
+update {table} h set valid_to = v.valid_to
+from (
+    select id, lead(valid_from) over (partition by {key} order by valid_from, id) as valid_to from {table}
+) v
+where v.id = h.id;
+"""
+
+# the insert of a version ends the current version of the same position or allocation
+CREATE_TRIGGER = """
+create function {table}_close_version() returns trigger as $$
+begin
+    update {table} set valid_to = new.valid_from where {key} = new.{key} and valid_to is null;
+    return new;
+end;
+$$ language plpgsql;
+
+create trigger {table}_close_version before insert on {table}
+for each row execute function {table}_close_version();
+"""
+
+DROP_TRIGGER = """
+drop trigger {table}_close_version on {table};
+drop function {table}_close_version();
+"""
+
+HISTORY_TABLES = {'project_position_history': 'position_id', 'project_allocation_history': 'allocation_id'}
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('project', '0021_project_version'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='projectallocationhistory',
+            name='valid_from',
+            field=models.DateTimeField(default=django.utils.timezone.now),
+        ),
+        migrations.AddField(
+            model_name='projectallocationhistory',
+            name='valid_to',
+            field=models.DateTimeField(null=True),
+        ),
+        migrations.AddField(
+            model_name='projectpositionhistory',
+            name='valid_from',
+            field=models.DateTimeField(default=django.utils.timezone.now),
+        ),
+        migrations.AddField(
+            model_name='projectpositionhistory',
+            name='valid_to',
+            field=models.DateTimeField(null=True),
+        ),
+        migrations.AddIndex(
+            model_name='projectallocationhistory',
+            index=models.Index(fields=['position', 'valid_from'], name='allocation_history_position'),
+        ),
+        migrations.AddIndex(
+            model_name='projectallocationhistory',
+            index=models.Index(fields=['user', 'valid_from'], name='allocation_history_user'),
+        ),
+        migrations.AddIndex(
+            model_name='projectpositionhistory',
+            index=models.Index(fields=['position', 'valid_from'], name='position_history_valid_from'),
+        ),
+    ] + [
+        migrations.RunSQL(BACKFILL.format(table=table, key=key), migrations.RunSQL.noop)
+        for table, key in HISTORY_TABLES.items()
+    ] + [
+        migrations.RunSQL(CREATE_TRIGGER.format(table=table, key=key), DROP_TRIGGER.format(table=table))
+        for table, key in HISTORY_TABLES.items()
+    ]
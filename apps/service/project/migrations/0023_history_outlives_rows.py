@@ -0,0 +1,56 @@
+# Generated by Django 4.1.3 on 2026-10-18 18:42
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+# the delete of a position or allocation ends its current version, the versions themselves are kept
+CREATE_TRIGGER = """
+create function {source}_close_history() returns trigger as $$
+begin
+    update {table} set valid_to = now() where {key} = old.id and valid_to is null;
+    return old;
+end;
+$$ language plpgsql;
+
+create trigger {source}_close_history after delete on {source}
+for each row execute function {source}_close_history();
+"""
+
+DROP_TRIGGER = """
+drop trigger {source}_close_history on {source};
+drop function {source}_close_history();
+"""
+
+HISTORY_TABLES = {
+    'project_position': ('project_position_history', 'position_id'),
+    'project_allocation': ('project_allocation_history', 'allocation_id'),
+}
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('project', '0022_history_validity'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='projectallocationhistory',
+            name='allocation',
+            field=models.ForeignKey(db_constraint=False, on_delete=django.db.models.deletion.DO_NOTHING, to='project.projectallocation'),
+        ),
+        migrations.AlterField(
+            model_name='projectallocationhistory',
+            name='position',
+            field=models.ForeignKey(db_constraint=False, on_delete=django.db.models.deletion.DO_NOTHING, related_name='allocation_history', to='project.projectposition'),
+        ),
+        migrations.AlterField(
+            model_name='projectpositionhistory',
+            name='position',
+            field=models.ForeignKey(db_constraint=False, on_delete=django.db.models.deletion.DO_NOTHING, to='project.projectposition'),
+        ),
+    ] + [
+        migrations.RunSQL(CREATE_TRIGGER.format(source=source, table=table, key=key),
+                          DROP_TRIGGER.format(source=source))
+        for source, (table, key) in HISTORY_TABLES.items()
+    ]
@@ -1,11 +1,17 @@
+from django.contrib.postgres.indexes import GinIndex, GistIndex, OpClass
 from django.db import models
+from django.db.models import Q, F
+from django.db.models.functions import Upper
 from django.contrib.contenttypes.models import ContentType
 from django.contrib.contenttypes.fields import GenericForeignKey
 from django.contrib.contenttypes.fields import GenericRelation
+from django.utils import timezone
 
 from client.models import Client
 from common.models import Skill
+from project.managers import ProjectAllocationHistoryManager
 from user.models import User, Role
+from utils.utilization import DateRange
 
 
 class Project(models.Model):
@@ -43,11 +49,14 @@ class Project(models.Model):
     modified_time = models.DateTimeField(auto_now=True)
     account_manager = models.ForeignKey(User, related_name='projects_managed', on_delete=models.SET_NULL, null=True)
     comment = models.CharField(max_length=250, null=True)
+    # bumped when rows of the project without a modified time change, see project.signals
+    version = models.PositiveIntegerField(default=0)
 
     objects = models.Manager()
 
     class Meta:
         db_table = 'project'
+        indexes = [GinIndex(OpClass(Upper('name'), name='gin_trgm_ops'), name='project_name_trgm')]
         permissions = [('set_privileged_project_status', 'Can set privileged project status')]
 
 
@@ -89,6 +98,8 @@ class Notification(models.Model):
 
     class Meta:
         db_table = 'notification'
+        indexes = [models.Index(fields=['receiver', 'unseen', 'created_time'], name='notification_receiver_unseen'),
+                   models.Index(fields=['sender', 'created_time'], name='notification_sender_created')]
         permissions = [('admin_notification', 'Can be admin notified')]
 
 
@@ -119,10 +130,13 @@ class ProjectPosition(models.Model):
 
     class Meta:
         db_table = 'project_position'
+        indexes = [GistIndex(DateRange('start_date', 'end_date'), name='project_position_period',
+                             condition=Q(end_date__isnull=True) | Q(end_date__gte=F('start_date')))]
 
 
 class ProjectPositionHistory(models.Model):
-    position = models.ForeignKey(ProjectPosition, on_delete=models.CASCADE)
+    # versions outlive the position, the delete of the position sets valid_to of its current version
+    position = models.ForeignKey(ProjectPosition, on_delete=models.DO_NOTHING, db_constraint=False)
     utilization = models.IntegerField()
     is_billable = models.BooleanField(default=True)
     start_date = models.DateField()
@@ -130,11 +144,16 @@ class ProjectPositionHistory(models.Model):
     added_by = models.ForeignKey(User, on_delete=models.SET_NULL, null=True)
     created_time = models.DateTimeField()
     modified_time = models.DateTimeField()
+    # the version is the current one from valid_from until valid_to, the insert of the next version of the same
+    # position sets valid_to (see migrations 0022 and 0023)
+    valid_from = models.DateTimeField(default=timezone.now)
+    valid_to = models.DateTimeField(null=True)
 
     objects = models.Manager()
 
     class Meta:
         db_table = 'project_position_history'
+        indexes = [models.Index(fields=['position', 'valid_from'], name='position_history_valid_from')]
 
 
 class ProjectPositionSkills(models.Model):
@@ -164,12 +183,16 @@ class ProjectAllocation(models.Model):
 
     class Meta:
         db_table = 'project_allocation'
+        indexes = [GistIndex(DateRange('start_date', 'end_date'), name='project_allocation_period',
+                             condition=Q(end_date__isnull=True) | Q(end_date__gte=F('start_date')))]
 
 
 class ProjectAllocationHistory(models.Model):
-    allocation = models.ForeignKey(ProjectAllocation, on_delete=models.CASCADE)
+    # as for positions, versions outlive the allocation and its position
+    allocation = models.ForeignKey(ProjectAllocation, on_delete=models.DO_NOTHING, db_constraint=False)
     user = models.ForeignKey(User, related_name='allocation_history', on_delete=models.CASCADE)
-    position = models.ForeignKey(ProjectPosition, related_name='allocation_history', on_delete=models.CASCADE)
+    position = models.ForeignKey(ProjectPosition, related_name='allocation_history', on_delete=models.DO_NOTHING,
+                                 db_constraint=False)
     utilization = models.IntegerField()
     start_date = models.DateField()
     end_date = models.DateField(null=True)
@@ -178,11 +201,16 @@ class ProjectAllocationHistory(models.Model):
     added_by = models.ForeignKey(User, on_delete=models.SET_NULL, null=True)
     created_time = models.DateTimeField()
     modified_time = models.DateTimeField()
+    # same validity interval as the position history
+    valid_from = models.DateTimeField(default=timezone.now)
+    valid_to = models.DateTimeField(null=True)
 
-    objects = models.Manager()
+    objects = ProjectAllocationHistoryManager()
 
     class Meta:
         db_table = 'project_allocation_history'
+        indexes = [models.Index(fields=['position', 'valid_from'], name='allocation_history_position'),
+                   models.Index(fields=['user', 'valid_from'], name='allocation_history_user')]
 
 
 class ProjectAllocationRequest(models.Model):
@@ -1,19 +1,18 @@
 from rest_framework import serializers
 
-from django.db.models import Value, Case, When
-from django.db.models.functions import Concat
-from django.db.models import Q, Sum
+from django.utils.dateparse import parse_datetime
 
 import datetime
 
 from client.models import Client
 from common.models import Skill
 from common.serializers import SkillSerializer
+from helpers.pagination import CursorField, decode_cursor
 from project.constants import ResponseKeys, DEFAULT_PAGE_NUMBER, DEFAULT_PAGE_SIZE, RequestKeys, ErrorMessages, \
-    SerializerKeys
+    SerializerKeys, NOTIFICATION_PAGE_SIZE, MAX_NOTIFICATION_PAGE_SIZE
 from project.models import ProjectPOC, Project, ProjectPosition, ProjectRole, ProjectAllocation, \
     ProjectAllocationRequest, Notification
-from user.models import Role, User, ProficiencyMapping, LeavePlans
+from user.models import Role, User
 from user.serializers import RoleSerializer, AccountManagerSerializer, ProficiencySerializer, LeavesSerializer, \
     SenderSerializer, ReceiverSerializer
 from utils.utils import camel_to_snake
@@ -60,6 +59,7 @@ class ListProjectsRequestSerializer(serializers.Serializer):
     search = serializers.CharField(required=False)
     page = serializers.IntegerField(default=DEFAULT_PAGE_NUMBER)
     size = serializers.IntegerField(default=DEFAULT_PAGE_SIZE)
+    cursor = CursorField()
 
     def to_internal_value(self, data):
         data = super().to_internal_value(data)
@@ -261,68 +261,12 @@ class AllocationRequestedUserSerializer(serializers.ModelSerializer):
 
 
 class ProjectUserSerializer(serializers.ModelSerializer):
-    projects = serializers.SerializerMethodField()
-    skills = serializers.SerializerMethodField()
+    projects = ProjectAllocationSerializer(source='timeline_projects', many=True)
+    skills = ProficiencySerializer(source='timeline_skills', many=True)
     role = RoleSerializer()
-    leave_plans = serializers.SerializerMethodField()
-    requests = serializers.SerializerMethodField()
-    is_over_utilized = serializers.SerializerMethodField()
-
-    def get_projects(self, instance):
-        response_date_start = self.context.get(SerializerKeys.RESPONSE_DATE_START)
-        response_date_end = self.context.get(SerializerKeys.RESPONSE_DATE_END)
-        search = self.context.get(SerializerKeys.SEARCH)
-        project_id = self.context.get(SerializerKeys.PROJECT_ID)
-        allocations = ProjectAllocation.objects.filter(user=instance)
-
-        if response_date_start:
-            allocations = allocations.filter(Q(end_date__gte=response_date_start) | Q(end_date__isnull=True))
-        if response_date_end:
-            allocations = allocations.filter(start_date__lte=response_date_end)
-
-        return ProjectAllocationSerializer(allocations, many=True,
-                                           context={SerializerKeys.SEARCH: search,
-                                                    SerializerKeys.PROJECT_ID: project_id,
-                                                    SerializerKeys.RESPONSE_DATE_START: response_date_start,
-                                                    SerializerKeys.RESPONSE_DATE_END: response_date_end}).data
-
-    def get_skills(self, instance):
-        proficiency_mapping = ProficiencyMapping.objects.filter(user=instance).order_by('-rating').exclude(rating=0)
-        return ProficiencySerializer(proficiency_mapping, many=True).data
-
-    def get_leave_plans(self, instance):
-        response_date_start = self.context.get(SerializerKeys.RESPONSE_DATE_START)
-        response_date_end = self.context.get(SerializerKeys.RESPONSE_DATE_END)
-        leaves = LeavePlans.objects.filter(user=instance).exclude(approval_status__in=['Cancelled', 'Rejected'])
-        if response_date_start:
-            leaves = leaves.filter(to_date__gte=response_date_start)
-        if response_date_end:
-            leaves = leaves.filter(from_date__lte=response_date_end)
-
-        return LeavesSerializer(leaves, many=True).data
-
-    def get_requests(self, instance):
-        project_id = self.context.get(SerializerKeys.PROJECT_ID)
-        project_allocation_request = ProjectAllocationRequest.objects.filter(
-            Q(status=ProjectAllocationRequest.Status.PENDING),
-            Q(user=instance),
-            Q(position__project_role__project=project_id))
-        return AllocationRequestedUserSerializer(project_allocation_request, many=True).data
-
-    def get_is_over_utilized(self, instance):
-        response_date_start = self.context.get(SerializerKeys.RESPONSE_DATE_START)
-        response_date_end = self.context.get(SerializerKeys.RESPONSE_DATE_END)
-        allocations = ProjectAllocation.objects.filter(user=instance,
-                                                       start_date__lte=datetime.date.today(),
-                                                       end_date__gte=datetime.date.today())
-        if response_date_start:
-            allocations = allocations.filter(Q(end_date__gte=response_date_start) | Q(end_date__isnull=True))
-        if response_date_end:
-            allocations = allocations.filter(start_date__lte=response_date_end)
-        utilization = allocations.aggregate(Sum(SerializerKeys.UTILIZATION))[SerializerKeys.UTILIZATION_SUM]
-        if utilization:
-            return utilization > 100
-        return False
+    leave_plans = LeavesSerializer(source='timeline_leave_plans', many=True)
+    requests = AllocationRequestedUserSerializer(source='timeline_requests', many=True)
+    is_over_utilized = serializers.BooleanField()
 
     class Meta:
         model = User
@@ -332,27 +276,8 @@ class ProjectUserSerializer(serializers.ModelSerializer):
 
 
 class ProjectPositionSerializer(serializers.ModelSerializer):
-    users = serializers.SerializerMethodField()
-    skills = SkillSerializer(many=True)
-
-    def get_users(self, instance):
-        search = self.context.get(SerializerKeys.SEARCH)
-        project_id = self.context.get(SerializerKeys.PROJECT_ID)
-        response_date_start = self.context.get(SerializerKeys.RESPONSE_DATE_START)
-        response_date_end = self.context.get(SerializerKeys.RESPONSE_DATE_END)
-        filter_users = self.context.get(SerializerKeys.FILTER_USERS)
-        users = instance.allocation.values(SerializerKeys.USER)
-        requested_users = instance.allocation_requests.values(SerializerKeys.USER)
-        users = users.union(requested_users)
-        users = User.objects.filter(id__in=users)
-        if search and filter_users:
-            users = users.annotate(
-                user_name=Concat('first_name', Value(' '), 'last_name')).filter(
-                Q(user_name__icontains=search))
-        return ProjectUserSerializer(users, many=True,
-                                     context={SerializerKeys.SEARCH: search, SerializerKeys.PROJECT_ID: project_id,
-                                              SerializerKeys.RESPONSE_DATE_START: response_date_start,
-                                              SerializerKeys.RESPONSE_DATE_END: response_date_end}).data
+    users = ProjectUserSerializer(source='timeline_users', many=True)
+    skills = SkillSerializer(source='timeline_skills', many=True)
 
     class Meta:
         model = ProjectPosition
@@ -364,36 +289,9 @@ class ProjectPositionSerializer(serializers.ModelSerializer):
 class ProjectRoleSerializer(serializers.ModelSerializer):
     project_role_id = serializers.IntegerField(source='id')
     role_name = serializers.CharField(source='role.name')
-    positions = serializers.SerializerMethodField()
-    total_positions = serializers.SerializerMethodField()
-    open_positions = serializers.SerializerMethodField()
-
-    def get_positions(self, instance):
-        search = self.context.get(SerializerKeys.SEARCH)
-        project_id = self.context.get(SerializerKeys.PROJECT_ID)
-        response_date_start = self.context.get(SerializerKeys.RESPONSE_DATE_START)
-        response_date_end = self.context.get(SerializerKeys.RESPONSE_DATE_END)
-        filter_users = getattr(instance, SerializerKeys.FILTER_USERS, '1')
-        positions = instance.positions.all().order_by('id')
-
-        if search and instance.filter_users:
-            positions = positions.annotate(
-                user_name=Concat('allocation__user__first_name', Value(' '), 'allocation__user__last_name'),
-                request_user=Concat('allocation_requests__user__first_name', Value(' '),
-                                    'allocation_requests__user__last_name')).filter(
-                Q(user_name__icontains=search) | Q(request_user__icontains=search))
-            positions = positions.distinct('id')
-        return ProjectPositionSerializer(positions, many=True,
-                                         context={SerializerKeys.SEARCH: search, SerializerKeys.PROJECT_ID: project_id,
-                                                  SerializerKeys.RESPONSE_DATE_START: response_date_start,
-                                                  SerializerKeys.RESPONSE_DATE_END: response_date_end,
-                                                  SerializerKeys.FILTER_USERS: filter_users}).data
-
-    def get_total_positions(self, instance):
-        return instance.positions.count()
-
-    def get_open_positions(self, instance):
-        return instance.positions.filter(allocation__user__isnull=True).count()
+    positions = ProjectPositionSerializer(source='timeline_positions', many=True)
+    total_positions = serializers.IntegerField()
+    open_positions = serializers.IntegerField()
 
     class Meta:
         model = ProjectRole
@@ -401,41 +299,13 @@ class ProjectRoleSerializer(serializers.ModelSerializer):
 
 
 class RetrieveProjectTimelineResponseSerializer(serializers.ModelSerializer):
-    roles = serializers.SerializerMethodField()
-    total_positions = serializers.SerializerMethodField()
-    open_positions = serializers.SerializerMethodField()
-
-    def get_roles(self, instance):
-        search = self.context.get(SerializerKeys.SEARCH)
-        project_id = self.context.get(SerializerKeys.PROJECT_ID)
-
-        response_date_start = self.context.get(SerializerKeys.RESPONSE_DATE_START)
-        response_date_end = self.context.get(SerializerKeys.RESPONSE_DATE_END)
-        project_roles = instance.roles.exclude(positions__isnull=True)
-
-        if search:
-            project_roles = project_roles.annotate(
-                user_name=Concat('positions__allocation__user__first_name', Value(' '),
-                                 'positions__allocation__user__last_name'
-                                 ), request_user=Concat('positions__allocation_requests__user__first_name', Value(' '),
-                                                        'positions__allocation_requests__user__last_name'))
-            project_roles = project_roles.annotate(
-                filter_users=Case(When(role__name__icontains=search, then=0), default=Value(1)))
-
-            project_roles = project_roles.filter(
-                Q(role__name__icontains=search) | Q(user_name__icontains=search) | Q(request_user__icontains=search))
-            project_roles = project_roles.distinct('id')
-        return ProjectRoleSerializer(project_roles, many=True,
-                                     context={SerializerKeys.SEARCH: search, SerializerKeys.PROJECT_ID: project_id,
-                                              SerializerKeys.RESPONSE_DATE_START: response_date_start,
-                                              SerializerKeys.RESPONSE_DATE_END: response_date_end}).data
-
-    def get_total_positions(self, instance):
-        return instance.roles.exclude(positions__isnull=True).values(SerializerKeys.POSITIONS).count()
-
-    def get_open_positions(self, instance):
-        allocated_user = instance.roles.filter(Q(positions__isnull=False) & Q(positions__allocation__user__isnull=True))
-        return allocated_user.count()
+    """
+    Serializes a project loaded by ProjectTimelineService.retrieve_project_timeline, the nested serializers read the
+    roles, positions and users it attached instead of querying them.
+    """
+    roles = ProjectRoleSerializer(source='timeline_roles', many=True)
+    total_positions = serializers.IntegerField()
+    open_positions = serializers.IntegerField()
 
     class Meta:
         model = Project
@@ -446,6 +316,7 @@ class RetrieveProjectTimelineRequestSerializer(serializers.Serializer):
     search = serializers.CharField(required=False)
     responseDateStart = serializers.DateField(required=False)
     responseDateEnd = serializers.DateField(required=False)
+    asOf = serializers.DateField(required=False)
 
     def to_internal_value(self, data):
         data = super().to_internal_value(data)
@@ -456,6 +327,21 @@ class PatchProjectAllocationRequestSerializer(serializers.Serializer):
     status = serializers.ChoiceField(ProjectAllocationRequest.Status.choices, required=False)
 
 
+class ListNotificationsRequestSerializer(serializers.Serializer):
+    cursor = serializers.CharField(required=False)
+    size = serializers.IntegerField(default=NOTIFICATION_PAGE_SIZE, min_value=1, max_value=MAX_NOTIFICATION_PAGE_SIZE)
+
+    def validate_cursor(self, cursor):
+        try:
+            created_time, notification_id = decode_cursor(cursor)
+            created_time = parse_datetime(created_time)
+        except (TypeError, ValueError):
+            raise serializers.ValidationError(ErrorMessages.INVALID_CURSOR)
+        if created_time is None or not isinstance(notification_id, int):
+            raise serializers.ValidationError(ErrorMessages.INVALID_CURSOR)
+        return created_time, notification_id
+
+
 class NotificationRequestSerializer(serializers.ModelSerializer):
     notification_type = serializers.CharField(source='get_notification_type_display')
     sender = SenderSerializer()
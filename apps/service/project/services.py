@@ -1,21 +1,28 @@
 import datetime
+import queue
+import time
+from collections import defaultdict
 
 from django.contrib.contenttypes.models import ContentType
-from django.db import transaction
-from django.db.models import Q
+from django.db import connection, transaction
+from django.db.models import Q, OuterRef, Subquery
+from django.db.models.functions import Greatest
 from django.utils import timezone
 from rest_framework.exceptions import PermissionDenied
 
 from client.models import Client
 from common.models import Skill
 from helpers.exceptions import InvalidRequest
-from project.constants import RequestKeys, PermissionKeys, ErrorMessages, ResponseKeys
+from helpers.pagination import encode_cursor
+from project.broker import notification_broker
+from project.constants import RequestKeys, PermissionKeys, ErrorMessages, ResponseKeys, NOTIFICATION_PAGE_SIZE, \
+    NotificationStreamValues
 from project.filters import ProjectFilter
 from project.models import Project, ProjectPOC, ProjectPosition, ProjectPositionSkills, ProjectRole, \
     ProjectPositionHistory, ProjectAllocation, ProjectAllocationRequest, ProjectAllocationHistory, Notification
-from user.constants import StatusKeys
-from user.models import Role, User
-from user.services import update_user_status
+from user.constants import StatusKeys, LeaveStatusKeys
+from user.models import Role, User, ProficiencyMapping, LeavePlans
+from user.services import recompute_user_status, UserUtilizationSummaryService
 from utils.slack_message import send_slack_message
 
 
@@ -159,6 +166,22 @@ class ProjectService:
             raise InvalidRequest(ErrorMessages.INVALID_PROJECT_ID)
         return project
 
+    def get_project_fingerprint(self, project_id):
+        """
+        Method to return the version of a project and the last modified time of the project, its client, positions,
+        allocations and allocation requests in a single query, None if there is no such project.
+        """
+        def last_modified(model, project_field):
+            return Subquery(model.objects.filter(**{project_field: OuterRef('id')})
+                            .order_by('-modified_time').values('modified_time')[:1])
+
+        return Project.objects.filter(id=project_id).annotate(last_modified=Greatest(
+            'modified_time', 'client__modified_time',
+            last_modified(ProjectPosition, 'project_role__project'),
+            last_modified(ProjectAllocation, 'position__project_role__project'),
+            last_modified(ProjectAllocationRequest, 'position__project_role__project'))) \
+            .values_list('version', 'last_modified').first()
+
 
 class ProjectAllocationService:
     def get_project_position_dropdowns(self, data):
@@ -261,11 +284,16 @@ class ProjectAllocationService:
                 raise InvalidRequest(
                     ErrorMessages.POSITION_DATE_IS_BEYOND_PROJECT_END_DATE)
 
+        is_billable_changed = position.is_billable != data[RequestKeys.IS_BILLABLE]
         position.is_billable = data[RequestKeys.IS_BILLABLE]
         position.utilization = data[RequestKeys.UTILIZATION]
         position.start_date = data[RequestKeys.START_DATE]
         position.end_date = end_date
         position.save()
+        if is_billable_changed:
+            # billable utilization of the summaries comes from the position
+            UserUtilizationSummaryService().refresh_users(
+                ProjectAllocation.objects.filter(position=position).values_list('user_id', flat=True))
         ProjectPositionSkills.objects.filter(position_id=position_id).delete()
         if skills:
             position_skills = [ProjectPositionSkills(skill=skill, position=position, priority=priority + 1)
@@ -297,15 +325,11 @@ class ProjectAllocationService:
         project_role = ProjectRole.objects.filter(id=project_role_id)
         if not project_role:
             raise InvalidRequest(ErrorMessages.INVALID_PROJECT_ROLE_ID)
-        project_allocations = ProjectAllocation.objects.filter(
-            position__project_role__in=project_role)
-
-        for allocation in project_allocations:
-            user = allocation.user
-            utilization = allocation.utilization
-            update_user_status(user, utilization)
+        user_ids = list(ProjectAllocation.objects.filter(
+            position__project_role__in=project_role).values_list('user_id', flat=True))
 
         project_role.delete()
+        recompute_user_status(user_ids)
 
     def create_project_allocation_validation(self, data):
         position = data.get(RequestKeys.POSITION)
@@ -370,7 +394,7 @@ class ProjectAllocationService:
 
         allocation = ProjectAllocation.objects.create(**data)
 
-        update_user_status(user)
+        recompute_user_status([user.id])
 
         # record history
         ProjectAllocationHistory.objects.create(
@@ -483,6 +507,7 @@ class ProjectAllocationService:
         if utilization != allocation.utilization:
             allocation = self.handle_update_new_allocation(
                 position, allocation, utilization, end_date)
+            ProjectAllocationHistory.objects.record([allocation], request_user)
             new_allocation = ProjectAllocation.objects.create(**data, start_date=datetime.date.today(),
                                                               position=allocation.position,
                                                               kt_period=0)
@@ -498,7 +523,7 @@ class ProjectAllocationService:
             self.post_allocation_update(
                 project, allocation, utilization, end_date, request_user)
 
-        update_user_status(user)
+        recompute_user_status([user.id])
 
     def delete_project_allocation(self, allocation_id, request_user):
         project_allocation = ProjectAllocation.objects.filter(
@@ -517,10 +542,8 @@ class ProjectAllocationService:
                                         receiver=account_manager,
                                         json_data=other_data)
 
-        user = project_allocation.user
-        utilization = project_allocation.utilization
-        update_user_status(user, utilization)
         project_allocation.delete()
+        recompute_user_status([project_allocation.user_id])
 
     @transaction.atomic
     def create_project_allocation_request(self, data, request_user):
@@ -651,6 +674,7 @@ class ProjectAllocationService:
                 # if allocation and manage talent utilization doing on same day then previous allocation start
                 # date can't be > end date
                 self.update_allocation_for_new_utilization(allocation_request)
+                ProjectAllocationHistory.objects.record([allocation_request.allocation], request_user)
 
                 self.handle_user_last_date_allocation(allocation_request)
 
@@ -661,7 +685,7 @@ class ProjectAllocationService:
                                                               end_date=allocation_request.end_date,
                                                               kt_period=0,
                                                               tentative=allocation_request.tentative)
-                update_user_status(allocation.user)
+                recompute_user_status([allocation.user_id])
                 ProjectAllocationHistory.objects.create(allocation=allocation, user=allocation.user,
                                                         position=allocation.position,
                                                         kt_period=allocation.kt_period,
@@ -697,7 +721,8 @@ class ProjectAllocationService:
             else:
                 allocation_request.allocation.end_date = allocation_request.end_date
                 allocation_request.allocation.save()
-                update_user_status(allocation_request.user)
+                ProjectAllocationHistory.objects.record([allocation_request.allocation], request_user)
+                recompute_user_status([allocation_request.user_id])
                 request_notification = Notification.objects.filter(
                     object_id=allocation_request.id).first()
 
@@ -736,7 +761,7 @@ class ProjectAllocationService:
                                                           kt_period=allocation_request.kt_period,
                                                           tentative=allocation_request.tentative)
 
-            update_user_status(allocation.user)
+            recompute_user_status([allocation.user_id])
             ProjectAllocationHistory.objects.create(allocation=allocation, user=allocation.user,
                                                     position=allocation.position,
                                                     kt_period=allocation.kt_period, tentative=allocation.tentative,
@@ -823,24 +848,242 @@ class ProjectAllocationService:
 
 
 class ProjectTimelineService:
-    def retrieve_project_timeline(self, project_id):
+    def retrieve_project_timeline(self, project_id, search=None, response_date_start=None, response_date_end=None,
+                                  as_of=None):
+        """
+        Method to load the timeline of a project for RetrieveProjectTimelineResponseSerializer. Roles, positions and
+        their users are loaded in bulk and attached to the project, so the number of queries does not depend on the
+        size of the project. With `as_of` positions and allocations are the versions recorded at the end of that
+        day and allocation requests are left out.
+        """
         project = Project.objects.filter(id=project_id).first()
         if not project:
             raise InvalidRequest(ErrorMessages.INVALID_PROJECT_ID)
+
+        roles = ProjectRole.objects.filter(project=project).select_related('role').order_by('id')
+        position_skills = ProjectPositionSkills.objects.filter(position__project_role__project=project) \
+            .select_related('skill').order_by('skill_id')
+        if as_of:
+            history_service = ProjectHistoryService()
+            positions = [history_service.as_position(version) for version in history_service.position_versions(
+                as_of).filter(position__project_role__project=project).select_related('position').order_by(
+                'position_id')]
+            allocations = history_service.allocation_versions(as_of).filter(position__project_role__project=project)
+            allocation_requests = ProjectAllocationRequest.objects.none()
+        else:
+            positions = ProjectPosition.objects.filter(project_role__project=project).order_by('id')
+            allocations = ProjectAllocation.objects.filter(position__project_role__project=project)
+            allocation_requests = ProjectAllocationRequest.objects.filter(position__project_role__project=project) \
+                .select_related('position__project_role__project').order_by('id')
+        allocations = allocations.values_list('position_id', 'user_id')
+
+        skills = defaultdict(list)
+        for position_skill in position_skills:
+            skills[position_skill.position_id].append(position_skill.skill)
+        # users allocated or requested to a position, whatever the status of the request
+        position_user_ids = defaultdict(set)
+        allocated_position_ids = set()
+        for position_id, user_id in allocations:
+            position_user_ids[position_id].add(user_id)
+            allocated_position_ids.add(position_id)
+        pending_requests = defaultdict(list)
+        for allocation_request in allocation_requests:
+            position_user_ids[allocation_request.position_id].add(allocation_request.user_id)
+            if allocation_request.status == ProjectAllocationRequest.Status.PENDING:
+                pending_requests[allocation_request.user_id].append(allocation_request)
+
+        users = self.get_timeline_users(set().union(*position_user_ids.values()), pending_requests,
+                                        response_date_start, response_date_end, as_of)
+
+        def matches(user):
+            return search.upper() in f'{user.first_name} {user.last_name}'.upper()
+
+        role_positions = defaultdict(list)
+        for position in positions:
+            position.timeline_skills = skills[position.id]
+            position.timeline_users = [users[user_id] for user_id in sorted(position_user_ids[position.id])]
+            role_positions[position.project_role_id].append(position)
+
+        project.timeline_roles = []
+        for role in roles:
+            positions = role_positions[role.id]
+            if not positions:
+                continue
+            role.total_positions = len(positions)
+            role.open_positions = len([position for position in positions if position.id not in allocated_position_ids])
+            # a search matching the role name shows all its positions, otherwise only the ones of matching users
+            if search and search.upper() not in role.role.name.upper():
+                positions = [position for position in positions if any(map(matches, position.timeline_users))]
+                for position in positions:
+                    position.timeline_users = list(filter(matches, position.timeline_users))
+                if not positions:
+                    continue
+            role.timeline_positions = positions
+            project.timeline_roles.append(role)
+
+        project.total_positions = sum(len(positions) for positions in role_positions.values())
+        project.open_positions = project.total_positions - len(allocated_position_ids)
         return project
 
+    def get_timeline_users(self, user_ids, pending_requests, response_date_start, response_date_end, as_of=None):
+        """
+        Method to load the users of a timeline with their allocations, skills and leaves within the response dates.
+        """
+        users = User.objects.filter(id__in=user_ids).select_related('role').in_bulk()
+        if as_of:
+            allocations = ProjectHistoryService().allocation_versions(as_of).order_by('allocation_id')
+        else:
+            allocations = ProjectAllocation.objects.order_by('id')
+        allocations = allocations.filter(user_id__in=user_ids).select_related('position__project_role__project')
+        leaves = LeavePlans.objects.filter(user_id__in=user_ids) \
+            .exclude(approval_status__in=[LeaveStatusKeys.CANCELLED, LeaveStatusKeys.REJECTED]).order_by('id')
+        proficiencies = ProficiencyMapping.objects.filter(user_id__in=user_ids).exclude(rating=0) \
+            .select_related('skill').order_by('user_id', '-rating', 'id')
+        if response_date_start:
+            allocations = allocations.filter(Q(end_date__gte=response_date_start) | Q(end_date__isnull=True))
+            leaves = leaves.filter(to_date__gte=response_date_start)
+        if response_date_end:
+            allocations = allocations.filter(start_date__lte=response_date_end)
+            leaves = leaves.filter(from_date__lte=response_date_end)
+
+        for user in users.values():
+            user.timeline_projects = []
+            user.timeline_skills = []
+            user.timeline_leave_plans = []
+            user.timeline_requests = pending_requests[user.id]
+
+        if as_of:
+            allocations = map(ProjectHistoryService().as_allocation, allocations)
+        today = as_of or datetime.date.today()
+        utilization = defaultdict(int)
+        for allocation in allocations:
+            users[allocation.user_id].timeline_projects.append(allocation)
+            if allocation.end_date and allocation.start_date <= today <= allocation.end_date:
+                utilization[allocation.user_id] += allocation.utilization
+        for proficiency in proficiencies:
+            users[proficiency.user_id].timeline_skills.append(proficiency)
+        for leave in leaves:
+            users[leave.user_id].timeline_leave_plans.append(leave)
+        for user in users.values():
+            user.is_over_utilized = utilization[user.id] > 100
+        return users
+
+
+class ProjectHistoryService:
+    def as_of_time(self, as_of):
+        """
+        Method to get the instant the state of a day is read at, the end of the day in the current timezone.
+        """
+        return timezone.make_aware(datetime.datetime.combine(as_of + datetime.timedelta(days=1), datetime.time.min))
+
+    def valid_at(self, as_of):
+        # a version is valid in [valid_from, valid_to), the state of the day is the one right before its end
+        as_of_time = self.as_of_time(as_of)
+        return Q(valid_from__lt=as_of_time) & (Q(valid_to__gte=as_of_time) | Q(valid_to__isnull=True))
+
+    def position_versions(self, as_of):
+        """
+        Method to get the versions of positions that were current at the end of the day.
+        """
+        return ProjectPositionHistory.objects.filter(self.valid_at(as_of))
+
+    def allocation_versions(self, as_of):
+        """
+        Method to get the versions of allocations that were current at the end of the day.
+        """
+        return ProjectAllocationHistory.objects.filter(self.valid_at(as_of))
+
+    def as_position(self, version):
+        """
+        Method to get the position of a version with the values of the version, the position is not saved.
+        """
+        position = version.position
+        position.utilization = version.utilization
+        position.is_billable = version.is_billable
+        position.start_date = version.start_date
+        position.end_date = version.end_date
+        return position
+
+    def as_allocation(self, version):
+        """
+        Method to get the allocation of a version with the values of the version, the allocation is not saved.
+        """
+        return ProjectAllocation(id=version.allocation_id, user_id=version.user_id, position=version.position,
+                                 utilization=version.utilization, start_date=version.start_date,
+                                 end_date=version.end_date, kt_period=version.kt_period, tentative=version.tentative,
+                                 created_time=version.created_time, modified_time=version.modified_time)
+
 
 class NotificationService:
-    def get_notification(self, request_user):
-        notification = []
-        account_manager = User.objects.filter_by_permission(PermissionKeys.ACCOUNT_MANAGER_PERMISSION) \
-            .order_by('first_name', 'last_name')
-        admins = User.objects.filter_by_permission(PermissionKeys.ADMIN_NOTIFICATION_PERMISSION) \
-            .order_by('first_name', 'last_name')
-        if request_user in account_manager or request_user in admins:
-            notification = Notification.objects.filter(
-                Q(sender=request_user) | Q(receiver=request_user)).order_by('-created_time')
-        return notification
+    def is_notified(self, request_user):
+        """
+        Method to check if the user is an account manager or admin, only they get notifications.
+        """
+        return any(User.objects.filter_by_permission(permission).filter(id=request_user.id).exists()
+                   for permission in (PermissionKeys.ACCOUNT_MANAGER_PERMISSION,
+                                      PermissionKeys.ADMIN_NOTIFICATION_PERMISSION))
+
+    def get_notification(self, request_user, cursor=None, size=NOTIFICATION_PAGE_SIZE):
+        """
+        Method to get a page of the notifications sent or received by the user, newest first. The page starts after
+        the `(created_time, id)` cursor and is returned with the cursor of the next page, None on the last page.
+        """
+        if not self.is_notified(request_user):
+            return [], None
+
+        notifications = Notification.objects.filter(Q(sender=request_user) | Q(receiver=request_user)) \
+            .select_related('sender', 'receiver').order_by('-created_time', '-id')
+        if cursor:
+            created_time, notification_id = cursor
+            notifications = notifications.filter(
+                Q(created_time__lt=created_time) | Q(created_time=created_time, id__lt=notification_id))
+
+        # one extra row tells if there is a next page without counting
+        notifications = list(notifications[:size + 1])
+        if len(notifications) <= size:
+            return notifications, None
+        notifications = notifications[:size]
+        return notifications, encode_cursor(notifications[-1].created_time.isoformat(), notifications[-1].id)
+
+    def get_unseen_count(self, request_user):
+        """
+        Method to count the unseen notifications received by the user.
+        """
+        if not self.is_notified(request_user):
+            return 0
+        return Notification.objects.filter(receiver=request_user, unseen=True).count()
+
+    def stream_notifications(self, request_user, last_notification_id=None):
+        """
+        Generator of the notifications received by the user as they are committed, it yields an empty list when
+        nothing arrived within the keep-alive interval. Notifications after `last_notification_id` are yielded first
+        so that a reconnecting stream misses nothing.
+        """
+        notifications = Notification.objects.filter(receiver=request_user).select_related('sender', 'receiver') \
+            .order_by('id')
+        subscriber = notification_broker.subscribe(request_user.id)
+        try:
+            replayed_ids = set()
+            if last_notification_id is not None:
+                replayed = list(notifications.filter(id__gt=last_notification_id))
+                replayed_ids = {notification.id for notification in replayed}
+                yield replayed
+
+            deadline = time.monotonic() + NotificationStreamValues.MAX_DURATION_SECONDS
+            while time.monotonic() < deadline:
+                # the connection is not held while waiting, only the broker listens
+                if not connection.in_atomic_block:
+                    connection.close()
+                try:
+                    notification_ids = [subscriber.get(timeout=NotificationStreamValues.KEEP_ALIVE_SECONDS)]
+                except queue.Empty:
+                    yield []
+                    continue
+                while not subscriber.empty():
+                    notification_ids.append(subscriber.get())
+                yield list(notifications.filter(id__in=set(notification_ids) - replayed_ids))
+        finally:
+            notification_broker.unsubscribe(request_user.id, subscriber)
 
     def read_notification(self, notification_id):
         """
@@ -0,0 +1,40 @@
+from django.db.models import F
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+
+from project.models import Project, ProjectPOC, ProjectRole, ProjectPosition, ProjectPositionSkills, \
+    ProjectAllocation, ProjectAllocationRequest
+
+
+def bump_project_version(projects):
+    projects.update(version=F('version') + 1)
+
+
+@receiver(post_save, sender=ProjectRole)
+@receiver(post_delete, sender=ProjectRole)
+@receiver(post_save, sender=ProjectPOC)
+@receiver(post_delete, sender=ProjectPOC)
+def invalidate_project(sender, instance, **kwargs):
+    """
+    Roles and POCs have no modified time, any change of them changes the fingerprint of their project.
+    """
+    bump_project_version(Project.objects.filter(id=instance.project_id))
+
+
+@receiver(post_delete, sender=ProjectPosition)
+def invalidate_position_project(sender, instance, **kwargs):
+    """
+    Deleted rows leave no modified time behind, their deletion changes the fingerprint of their project.
+    """
+    bump_project_version(Project.objects.filter(roles=instance.project_role_id))
+
+
+@receiver(post_save, sender=ProjectPositionSkills)
+@receiver(post_delete, sender=ProjectPositionSkills)
+@receiver(post_delete, sender=ProjectAllocation)
+@receiver(post_delete, sender=ProjectAllocationRequest)
+def invalidate_position_row_project(sender, instance, **kwargs):
+    """
+    Deleted rows and position skills leave no modified time behind, they change the fingerprint of their project.
+    """
+    bump_project_version(Project.objects.filter(roles__positions=instance.position_id))
@@ -6,15 +6,22 @@ from datetime import date, timedelta
 from django.urls import reverse
 from django.contrib.contenttypes.models import ContentType
 from rest_framework import status
-from rest_framework.test import APITestCase
+from rest_framework.test import APITestCase, APITransactionTestCase
 from django.core.management import call_command
+from django.db import connection
+from django.test import override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
 
+from authapp.cache import get_user_permission_names
 from client.models import Client
-from common.models import Skill
+from common.models import Skill, SlackMessageLogs
+from project.broker import notification_broker
 from project.constants import ResponseKeys, PermissionKeys, ErrorMessages
 from project.models import Project, ProjectPosition, ProjectPositionSkills, ProjectRole, ProjectAllocation, \
-    ProjectAllocationRequest, Notification
-from user.models import User, Role
+    ProjectAllocationRequest, Notification, ProjectPositionHistory, ProjectAllocationHistory
+from user.models import User, Role, ProficiencyMapping
+from user.services import UserService
 from utils.permissions import get_permission_object
 
 
@@ -945,6 +952,116 @@ class ProjectTimelineTest(BaseTestCase):
         self.assertEqual(
             response.data[ResponseKeys.PROJECT]['total_positions'], 3)
 
+    def test_timeline_query_count(self):
+        self.client.force_authenticate(user=self.user)
+        url = reverse('v1:project:project-timeline', kwargs={'project_id': self.project.id})
+        get_user_permission_names(self.user)
+        with CaptureQueriesContext(connection) as queries:
+            self.client.get(url, format='json')
+
+        project_role = ProjectRole.objects.filter(project=self.project).first()
+        skill = Skill.objects.create(name='Timeline skill')
+        for index in range(3):
+            position = ProjectPosition.objects.create(
+                project_role=project_role, utilization=50, experience_range_start=2, experience_range_end=4,
+                start_date='2023-01-01', end_date='2023-02-01')
+            ProjectPositionSkills.objects.create(position=position, skill=skill, priority=1)
+            user = User.objects.create_user(employee_id=100 + index, email=f'timeline{index}@company.io',
+                                            first_name='Time', last_name=f'Line{index}')
+            ProficiencyMapping.objects.create(user=user, skill=skill, rating=3)
+            ProjectAllocation.objects.create(user=user, position=position, utilization=50,
+                                             start_date='2023-01-01', end_date='2023-01-31')
+
+        # the timeline is loaded in bulk, more positions and users do not add queries
+        with self.assertNumQueries(len(queries)):
+            response = self.client.get(url, format='json')
+        self.assertEqual(response.data[ResponseKeys.PROJECT]['total_positions'], 6)
+
+    def test_timeline_as_of(self):
+        self.client.force_authenticate(user=self.user)
+        url = reverse('v1:project:project-timeline', kwargs={'project_id': self.project.id})
+        position = ProjectPosition.objects.filter(project_role__project=self.project).order_by('id').first()
+        allocation = ProjectAllocation.objects.get(position=position)
+
+        def record(day, utilization):
+            valid_from = timezone.make_aware(datetime.datetime(2023, 4, day, 12))
+            ProjectPositionHistory.objects.create(
+                position=position, utilization=utilization, start_date=position.start_date,
+                end_date=position.end_date, created_time=valid_from, modified_time=valid_from, valid_from=valid_from)
+            ProjectAllocationHistory.objects.create(
+                allocation=allocation, user=allocation.user, position=position, utilization=utilization - 10,
+                start_date=allocation.start_date, end_date=allocation.end_date, created_time=valid_from,
+                modified_time=valid_from, valid_from=valid_from)
+
+        record(10, 30)
+        record(20, 50)
+        # the next version closes the previous one
+        self.assertEqual(ProjectPositionHistory.objects.get(utilization=30).valid_to,
+                         ProjectPositionHistory.objects.get(utilization=50).valid_from)
+
+        def staffing(as_of):
+            response = self.client.get(url, {'asOf': as_of}, format='json')
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            return [(position['id'], position['utilization'],
+                     [(user['id'], [project['utilization'] for project in user['projects']])
+                      for user in position['users']])
+                    for role in response.data[ResponseKeys.PROJECT][ResponseKeys.ROLES]
+                    for position in role[ResponseKeys.POSITIONS]]
+
+        self.assertEqual(staffing('2023-04-09'), [])
+        self.assertEqual(staffing('2023-04-10'), [(position.id, 30, [(allocation.user_id, [20])])])
+        self.assertEqual(staffing('2023-04-25'), [(position.id, 50, [(allocation.user_id, [40])])])
+
+        # deletes keep the versions and end the current one
+        allocation.delete()
+        self.assertFalse(ProjectAllocationHistory.objects.filter(allocation_id=allocation.id, valid_to=None).exists())
+        self.assertEqual(staffing('2023-04-25'), [(position.id, 50, [(allocation.user_id, [40])])])
+
+    def test_history_of_last_working_day(self):
+        allocation = ProjectAllocation.objects.filter(position__project_role__project=self.project).first()
+        last_working_day = allocation.start_date
+        UserService().patch_user(allocation.user_id, {'lwd': last_working_day}, self.user)
+
+        # the bulk update of allocation end dates records their versions
+        version = ProjectAllocationHistory.objects.get(allocation_id=allocation.id, valid_to=None)
+        self.assertEqual(version.end_date, last_working_day)
+        self.assertEqual(version.added_by, self.user)
+
+    def test_timeline_not_modified(self):
+        self.client.force_authenticate(user=self.user)
+        url = reverse('v1:project:project-timeline', kwargs={'project_id': self.project.id})
+        response = self.client.get(url, format='json')
+        etag = response['ETag']
+        self.assertEqual(response['Cache-Control'], 'private, no-cache')
+
+        response = self.client.get(url, format='json', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+
+        # deletions leave no modified time behind, the project version changes instead
+        ProjectAllocation.objects.filter(position__project_role__project=self.project).first().delete()
+        response = self.client.get(url, format='json', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertNotEqual(response['ETag'], etag)
+
+        etag = response['ETag']
+        ProjectPosition.objects.filter(project_role__project=self.project).first().save()
+        response = self.client.get(url, format='json', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+        # the designation of users is rendered in their names
+        etag = response['ETag']
+        user = ProjectAllocation.objects.filter(position__project_role__project=self.project).first().user
+        user.designation = 'SDE L2'
+        user.save(update_fields=['designation'])
+        response = self.client.get(url, format='json', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+        # revalidation goes by the ETag only, a modified time misses deletes
+        self.assertNotIn('Last-Modified', response)
+        ProjectAllocation.objects.filter(position__project_role__project=self.project).first().delete()
+        response = self.client.get(url, format='json', HTTP_IF_MODIFIED_SINCE='Fri, 01 Jan 2100 00:00:00 GMT')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
 
 class EditProjectDetails(BaseTestCase):
     @classmethod
@@ -1911,6 +2028,116 @@ class GetNotificationTest(BaseTestCase):
 
         self.assertEqual(response.status_code, status.HTTP_200_OK)
         self.assertEqual(response.data[ResponseKeys.NOTIFICATIONS], [])
+        self.assertIsNone(response.data[ResponseKeys.NEXT_CURSOR])
+
+    def test_notification_pages(self):
+        self.user.user_permissions.add(get_permission_object(PermissionKeys.ACCOUNT_MANAGER_PERMISSION))
+        receiver = self.notification.receiver
+        for _ in range(4):
+            Notification.objects.create(notification_type=Notification.NotificationType.DELETE_ALLOCATION,
+                                        sender=receiver, receiver=self.user)
+        expected_ids = list(Notification.objects.order_by('-created_time', '-id').values_list('id', flat=True))
+        self.client.force_authenticate(user=self.user)
+        url = reverse('v1:project:notification')
+
+        ids, cursor = [], None
+        for _ in range(3):
+            params = {'size': 2, 'cursor': cursor} if cursor else {'size': 2}
+            response = self.client.get(url, params)
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            ids += [notification['id'] for notification in response.data[ResponseKeys.NOTIFICATIONS]]
+            cursor = response.data[ResponseKeys.NEXT_CURSOR]
+        self.assertEqual(ids, expected_ids)
+        self.assertIsNone(cursor)
+
+        response = self.client.get(url, {'cursor': 'invalid'})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_notification_unseen_count(self):
+        self.client.force_authenticate(user=self.user)
+        url = reverse('v1:project:notification-unseen-count')
+        self.assertEqual(self.client.get(url).data[ResponseKeys.COUNT], 0)
+
+        self.user.user_permissions.add(get_permission_object(PermissionKeys.ADMIN_NOTIFICATION_PERMISSION))
+        receiver = self.notification.receiver
+        for unseen in (True, True, False):
+            Notification.objects.create(notification_type=Notification.NotificationType.DELETE_ALLOCATION,
+                                        sender=receiver, receiver=self.user, unseen=unseen)
+        response = self.client.get(url)
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data[ResponseKeys.COUNT], 2)
+
+
+class NotificationStreamTest(APITransactionTestCase):
+    # notifications are published on commit, test cases wrapped in a transaction would never see them
+
+    def setUp(self):
+        self.user = User.objects.create_user(
+            employee_id=1, email='user@company.io', first_name='Foo', last_name='Bar')
+        self.user.user_permissions.add(
+            get_permission_object(PermissionKeys.NOTIFICATION_PERMISSIONS[PermissionKeys.GET][0]),
+            get_permission_object(PermissionKeys.ACCOUNT_MANAGER_PERMISSION))
+        self.sender = User.objects.create_user(
+            employee_id=2, email='user2@company.io', first_name='Foo2', last_name='Bar2')
+        # the listener connection has to be closed before the test database is dropped
+        self.addCleanup(notification_broker.stop)
+
+    def create_notification(self):
+        return Notification.objects.create(notification_type=Notification.NotificationType.DELETE_ALLOCATION,
+                                           sender=self.sender, receiver=self.user)
+
+    def test_broker_publishes_committed_notifications(self):
+        subscriber = notification_broker.subscribe(self.user.id)
+        self.addCleanup(notification_broker.unsubscribe, self.user.id, subscriber)
+        self.assertTrue(notification_broker.listening.wait(5))
+
+        Notification.objects.create(notification_type=Notification.NotificationType.DELETE_ALLOCATION,
+                                    sender=self.user, receiver=self.sender)
+        notification = self.create_notification()
+
+        self.assertEqual(subscriber.get(timeout=5), notification.id)
+        self.assertTrue(subscriber.empty())
+
+    def test_stream_notifications(self):
+        missed = self.create_notification()
+        self.client.force_authenticate(user=self.user)
+        response = self.client.get(reverse('v1:project:notification-stream'), HTTP_LAST_EVENT_ID=str(missed.id - 1))
+        self.addCleanup(response.close)
+        events = iter(response.streaming_content)
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response['Content-Type'], 'text/event-stream')
+        self.assertEqual(next(events).decode(), 'retry: 3000\n\n')
+        self.assertTrue(next(events).decode().startswith(f'id: {missed.id}\nevent: notification\ndata: {{'))
+
+        self.assertTrue(notification_broker.listening.wait(5))
+        created = self.create_notification()
+        self.assertTrue(next(events).decode().startswith(f'id: {created.id}\n'))
+
+    @override_settings(NOTIFICATION_MAX_STREAMS=1)
+    def test_stream_limit(self):
+        self.client.force_authenticate(user=self.user)
+        response = self.client.get(reverse('v1:project:notification-stream'))
+        self.addCleanup(response.close)
+        self.assertEqual(next(iter(response.streaming_content)).decode(), 'retry: 3000\n\n')
+
+        # the worker serves as many streams as it may, the next one is sent back to retry later
+        busy = self.client.get(reverse('v1:project:notification-stream'))
+        self.assertEqual(b''.join(busy.streaming_content).decode(), 'retry: 30000\n\n')
+
+        response.close()
+        response = self.client.get(reverse('v1:project:notification-stream'))
+        self.addCleanup(response.close)
+        self.assertEqual(next(iter(response.streaming_content)).decode(), 'retry: 3000\n\n')
+
+    def test_stream_not_notified_user(self):
+        self.client.force_authenticate(user=self.sender)
+        self.sender.user_permissions.add(
+            get_permission_object(PermissionKeys.NOTIFICATION_PERMISSIONS[PermissionKeys.GET][0]))
+        response = self.client.get(reverse('v1:project:notification-stream'))
+
+        self.assertEqual(response.status_code, status.HTTP_204_NO_CONTENT)
 
 
 class ReadNotificationTest(BaseTestCase):
@@ -2268,3 +2495,20 @@ class UpdateProjectStatusCommand(BaseTestCase):
 
         self.assertEqual(project1.status, 'CLOSED')
         self.assertEqual(project2.status, 'ACTIVE')
+
+    @patch('project.management.commands.update_project_status.datetime')
+    def test_update_project_status_digest(self, datetime_mock):
+        Project.objects.create(name="Closed Project", client_id=self.project1.client_id, status="CLOSED",
+                               start_date='2023-01-01', end_date='2023-02-05')
+        datetime_mock.date.today.return_value = date(2024, 5, 6)
+
+        # savepoint, update, digest and release whatever the number of closed projects
+        with self.assertNumQueries(4):
+            call_command('update_project_status')
+
+        message = SlackMessageLogs.objects.get().message
+        self.assertIn('*Past Project*', message)
+        self.assertIn('*Future Project*', message)
+        self.assertIn(f'AM: *{self.user.full_name}*', message)
+        self.assertNotIn('Closed Project', message)
+        self.assertEqual(Project.objects.filter(status='CLOSED').count(), 3)
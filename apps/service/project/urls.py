@@ -4,7 +4,8 @@ from project.views import ProjectAPIView, ProjectCreationDropdownsAPIView, Proje
     ProjectPositionDropdownsAPIView, ProjectPositionAPIView, ProjectPositionDetailAPIView, \
     ProjectAllocationAPIView, RetrieveProjectTimelineAPIView, ProjectAllocationRequestAPIView, \
     ProjectAllocationRequestDetailAPIView, NotificationAPIView, ProjectAllocationDetailAPIView, \
-    NotificationDetailAPIView, ProjectRoleAPIView, NotificationMarkReadAPIView
+    NotificationDetailAPIView, ProjectRoleAPIView, NotificationMarkReadAPIView, NotificationUnseenCountAPIView, \
+    NotificationStreamAPIView
 
 urlpatterns = [
     path('', ProjectAPIView.as_view(), name='project'),
@@ -43,6 +44,8 @@ urlpatterns = [
     path('notification/<int:notification_id>/read_notification/', NotificationDetailAPIView.as_view(),
          name='notification-detail'),
     path('notification/mark-all-read/', NotificationMarkReadAPIView.as_view(),
-         name='notification-mark-all-read')
+         name='notification-mark-all-read'),
+    path('notification/stream/', NotificationStreamAPIView.as_view(), name='notification-stream'),
+    path('notification/unseen-count/', NotificationUnseenCountAPIView.as_view(), name='notification-unseen-count')
 
 ]
@@ -1,11 +1,22 @@
+import datetime
+import hashlib
+
+from django.http import StreamingHttpResponse
+from django.utils.decorators import method_decorator
+from django.views.decorators.cache import cache_control
+from django.views.decorators.http import condition
 from drf_yasg.utils import swagger_auto_schema
 from rest_framework import status
 from rest_framework.response import Response
 from rest_framework.views import APIView
 
 from authapp.permissions import APIPermission
-from helpers.pagination import paginate
-from project.constants import PermissionKeys, ResponseKeys, RequestKeys, SerializerKeys
+from helpers.exceptions import InvalidRequest
+from helpers.pagination import paginate, paginate_keyset
+from helpers.renderers import EventStreamRenderer
+from project.broker import notification_broker
+from project.constants import PermissionKeys, ResponseKeys, RequestKeys, SerializerKeys, ErrorMessages, \
+    NotificationStreamValues
 from project.serializers import CreateProjectRequestSerializer, SetProjectResponseSerializer, \
     ProjectCreationDropdownsResponseSerializer, ListProjectsRequestSerializer, ListProjectsResponseSerializer, \
     PatchProjectRequestSerializer, ProjectPositionDropdownsResponseSerializer, \
@@ -13,14 +24,41 @@ from project.serializers import CreateProjectRequestSerializer, SetProjectRespon
     RetrieveProjectResponseSerializer, EditProjectPositionSerializer, CreateProjectAllocationRequestSerializer, \
     RetrieveProjectTimelineResponseSerializer, RetrieveProjectTimelineRequestSerializer, EditProjectRequestSerializer, \
     CreateAllocationRequestSerializer, EditProjectAllocationSerializer, EditProjectAllocationRequestSerializer, \
-    PatchProjectAllocationRequestSerializer, NotificationRequestSerializer, \
+    PatchProjectAllocationRequestSerializer, NotificationRequestSerializer, ListNotificationsRequestSerializer, \
     CreateProjectPositionRequestSerializerResponse
 from project.services import ProjectService, ProjectAllocationService, ProjectTimelineService, NotificationService
+from search.cache import get_data_version
+
+
+def get_project_fingerprint(request, project_id):
+    """
+    Load the fingerprint of the requested project once per request.
+    """
+    if not hasattr(request, 'project_fingerprint'):
+        request.project_fingerprint = ProjectService().get_project_fingerprint(project_id)
+    return request.project_fingerprint
+
+
+def project_etag(name):
+    """
+    Return the ETag function of a project endpoint, the ETag changes with the project fingerprint, the users,
+    allocations, leaves and skills tracked by the search data version and the day (utilization depends on it).
+    """
+    def etag(request, project_id):
+        fingerprint = get_project_fingerprint(request, project_id)
+        if fingerprint is None:
+            return None
+        version, last_modified = fingerprint
+        key = f'{name}:{project_id}:{version}:{last_modified.isoformat()}:{get_data_version()}:{datetime.date.today()}'
+        return hashlib.md5(key.encode()).hexdigest()
+    return etag
 
 
 class ProjectAPIView(APIView):
     permission_classes = [APIPermission]
     permissions = PermissionKeys.PROJECT_PERMISSIONS
+    # (field, descending) sort keys of the listed projects, the latest ones come first
+    SORT_KEYS = [('start_date', True)]
 
     @swagger_auto_schema(request_body=CreateProjectRequestSerializer(),
                          responses={status.HTTP_201_CREATED: SetProjectResponseSerializer()})
@@ -49,14 +87,26 @@ class ProjectAPIView(APIView):
 
         page = request_serializer.validated_data.pop(RequestKeys.PAGE)
         size = request_serializer.validated_data.pop(RequestKeys.SIZE)
+        keyset = RequestKeys.CURSOR in request_serializer.validated_data
+        cursor = request_serializer.validated_data.pop(RequestKeys.CURSOR, None)
 
         projects = service.list_projects(request_serializer.validated_data)
-        paginated_projects = paginate(projects, page, size)
+        if keyset:
+            try:
+                paginated_projects, next_cursor = paginate_keyset(projects, self.SORT_KEYS, cursor, size)
+            except ValueError:
+                raise InvalidRequest(ErrorMessages.INVALID_CURSOR)
+            # counted once on the first page, following pages are not slowed down by it
+            count = projects.count() if cursor is None else None
+        else:
+            paginated_projects = paginate(projects, page, size)
+            next_cursor = None
+            count = paginated_projects.paginator.count
 
         response_serializer = ListProjectsResponseSerializer(
             paginated_projects, many=True)
         response = {ResponseKeys.PROJECTS: response_serializer.data,
-                    ResponseKeys.COUNT: projects.count()}
+                    ResponseKeys.COUNT: count, ResponseKeys.NEXT_CURSOR: next_cursor}
         return Response(response, status=status.HTTP_200_OK)
 
 
@@ -79,6 +129,10 @@ class ProjectDetailAPIView(APIView):
         response = {ResponseKeys.PROJECT: response_serializer.data}
         return Response(response, status=status.HTTP_200_OK)
 
+    # clients revalidate every time and unchanged projects are answered with 304 Not Modified without serializing.
+    # there is no Last-Modified, deletes, the data version and the day change the response but no modified time
+    @method_decorator(cache_control(private=True, no_cache=True))
+    @method_decorator(condition(etag_func=project_etag('detail')))
     @swagger_auto_schema(responses={status.HTTP_200_OK: RetrieveProjectResponseSerializer()})
     def get(self, request, project_id):
         """
@@ -292,6 +346,8 @@ class RetrieveProjectTimelineAPIView(APIView):
     permission_classes = [APIPermission]
     permissions = PermissionKeys.PROJECT_PERMISSIONS
 
+    @method_decorator(cache_control(private=True, no_cache=True))
+    @method_decorator(condition(etag_func=project_etag('timeline')))
     @swagger_auto_schema(query_serializer=RetrieveProjectTimelineRequestSerializer(),
                          responses={status.HTTP_200_OK: RetrieveProjectTimelineResponseSerializer()})
     def get(self, request, project_id):
@@ -304,11 +360,13 @@ class RetrieveProjectTimelineAPIView(APIView):
         request_serializer.is_valid(raise_exception=True)
         search = request_serializer.validated_data.pop(
             RequestKeys.SEARCH, None)
-        project = service.retrieve_project_timeline(project_id)
         response_date_start = request_serializer.validated_data.get(
             RequestKeys.RESPONSE_DATE_START)
         response_date_end = request_serializer.validated_data.get(
             RequestKeys.RESPONSE_DATE_END)
+        as_of = request_serializer.validated_data.get(RequestKeys.AS_OF)
+        project = service.retrieve_project_timeline(project_id, search, response_date_start, response_date_end,
+                                                    as_of)
         response_serializer = RetrieveProjectTimelineResponseSerializer(project, context={
             SerializerKeys.SEARCH: search,
             SerializerKeys.PROJECT_ID: project_id,
@@ -322,13 +380,74 @@ class NotificationAPIView(APIView):
     permission_classes = [APIPermission]
     permissions = PermissionKeys.NOTIFICATION_PERMISSIONS
 
-    @swagger_auto_schema(responses={status.HTTP_200_OK: NotificationRequestSerializer()})
+    @swagger_auto_schema(query_serializer=ListNotificationsRequestSerializer(),
+                         responses={status.HTTP_200_OK: NotificationRequestSerializer(many=True)})
     def get(self, request):
         service = NotificationService()
-        notification = service.get_notification(request.user)
+        request_serializer = ListNotificationsRequestSerializer(data=request.GET)
+        request_serializer.is_valid(raise_exception=True)
+        notification, next_cursor = service.get_notification(
+            request.user, request_serializer.validated_data.get(RequestKeys.CURSOR),
+            request_serializer.validated_data[RequestKeys.SIZE])
         response_serializer = NotificationRequestSerializer(
             notification, many=True)
-        response = {ResponseKeys.NOTIFICATIONS: response_serializer.data}
+        response = {ResponseKeys.NOTIFICATIONS: response_serializer.data, ResponseKeys.NEXT_CURSOR: next_cursor}
+        return Response(response, status=status.HTTP_200_OK)
+
+
+class NotificationStreamAPIView(APIView):
+    permission_classes = [APIPermission]
+    permissions = PermissionKeys.NOTIFICATION_PERMISSIONS
+    renderer_classes = [EventStreamRenderer]
+
+    def get(self, request):
+        """
+        API streaming the notifications received by the user as server-sent events. A reconnecting client sends the
+        `Last-Event-ID` header to get the notifications it missed. Streams end after a minute and the client is told
+        when to reconnect, a worker serving NOTIFICATION_MAX_STREAMS streams already ends new ones right away.
+        """
+        service = NotificationService()
+        if not service.is_notified(request.user):
+            # tells the event source not to reconnect
+            return Response(status=status.HTTP_204_NO_CONTENT)
+
+        last_event_id = request.headers.get('Last-Event-ID')
+        last_notification_id = int(last_event_id) if last_event_id and last_event_id.isdigit() else None
+        stream = service.stream_notifications(request.user, last_notification_id)
+        response = StreamingHttpResponse(self.get_events(stream), content_type='text/event-stream')
+        response['Cache-Control'] = 'no-cache'
+        # keeps proxies from buffering the events
+        response['X-Accel-Buffering'] = 'no'
+        return response
+
+    def get_events(self, stream):
+        # streams hold a thread of the worker, past its share the event source is sent back to retry later
+        if not notification_broker.open_stream():
+            yield f'retry: {NotificationStreamValues.BUSY_RETRY_SECONDS * 1000}\n\n'
+            return
+        try:
+            yield f'retry: {NotificationStreamValues.RETRY_SECONDS * 1000}\n\n'
+            renderer = EventStreamRenderer()
+            for notifications in stream:
+                if not notifications:
+                    yield ': keep-alive\n\n'
+                for notification in notifications:
+                    data = renderer.render(NotificationRequestSerializer(notification).data).decode()
+                    yield f'id: {notification.id}\nevent: notification\ndata: {data}\n\n'
+        finally:
+            notification_broker.close_stream()
+
+
+class NotificationUnseenCountAPIView(APIView):
+    permission_classes = [APIPermission]
+    permissions = PermissionKeys.NOTIFICATION_PERMISSIONS
+
+    def get(self, request):
+        """
+        API to count the unseen notifications of the user, cheap enough to be polled.
+        """
+        service = NotificationService()
+        response = {ResponseKeys.COUNT: service.get_unseen_count(request.user)}
         return Response(response, status=status.HTTP_200_OK)
 
 
@@ -0,0 +1,34 @@
+import hashlib
+import json
+import uuid
+
+from django.core.cache import cache
+
+DATA_VERSION_KEY = 'search:data_version'
+RANKING_KEY = 'search:ranking:{version}:{criteria}'
+
+
+def get_data_version():
+    """
+    Return the token identifying the current state of the data talent search depends on.
+    """
+    version = cache.get(DATA_VERSION_KEY)
+    if version is None:
+        cache.add(DATA_VERSION_KEY, uuid.uuid4().hex, None)
+        version = cache.get(DATA_VERSION_KEY)
+    return version
+
+
+def bump_data_version():
+    """
+    Invalidate all cached search rankings.
+    """
+    cache.set(DATA_VERSION_KEY, uuid.uuid4().hex, None)
+
+
+def get_ranking_key(criteria):
+    """
+    Return the cache key of the talent ordering for given search criteria at the current data version.
+    """
+    criteria = json.dumps(criteria, sort_keys=True, default=str)
+    return RANKING_KEY.format(version=get_data_version(), criteria=hashlib.sha1(criteria.encode()).hexdigest())
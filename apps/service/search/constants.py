@@ -1,5 +1,12 @@
 DEFAULT_PAGE_NUMBER = 1
 DEFAULT_PAGE_SIZE = 10
+UNIVERSAL_SEARCH_LIMIT = 10
+DEFAULT_POSITION_DAYS = 90
+# user fields talent search reads, saves limited to other fields leave rankings valid
+SCORED_USER_FIELDS = frozenset({'is_active', 'role', 'role_id', 'first_name', 'last_name', 'work_location',
+                                'career_start_date', 'career_break_months', 'last_working_day', 'status'})
+# the data version also tags the ETags of project responses, which render these user fields besides
+VERSIONED_USER_FIELDS = SCORED_USER_FIELDS | {'designation'}
 
 
 class PermissionKeys:
@@ -15,6 +22,7 @@ class PermissionKeys:
 class RequestKeys:
     PAGE = 'page'
     SIZE = 'size'
+    CURSOR = 'cursor'
     POSITION = 'position'
     SEARCH = 'search'
     RELATED_SUGGESTIONS = 'related_suggestions'
@@ -45,6 +53,7 @@ class ResponseKeys:
     CRITERIA = 'criteria'
     TALENTS = 'talents'
     COUNT = 'count'
+    NEXT_CURSOR = 'next_cursor'
     PROJECT = 'project'
     PROJECTS = 'projects'
     DROPDOWNS = 'dropdowns'
@@ -77,6 +86,23 @@ class SerializerKeys:
     POSITIONS = 'positions'
     UTILIZATION_SUM = 'utilization__sum'
     UTILIZATION = 'utilization'
+    TALENT_DETAILS = 'talent_details'
+    PROFICIENCY = 'proficiency'
+    ALLOCATIONS = 'allocations'
+    LEAVES = 'leaves'
+    REQUESTS = 'requests'
+    POSITION = 'position'
+    TALENT = 'talent'
+
+
+class ErrorMessages:
+    EITHER_PROJECT_OR_POSITIONS_IS_REQUIRED = 'Either project or positions is required'
+    INVALID_CURSOR = 'Invalid cursor'
+
+
+class ScoringBackends:
+    SQL = 'sql'
+    IN_MEMORY = 'in_memory'
 
 
 class Weights:
@@ -0,0 +1,202 @@
+import threading
+from bisect import bisect_right
+from datetime import timedelta
+
+from django.conf import settings
+from django.utils import timezone
+
+from helpers.pagination import encode_cursor
+from search.constants import ScoringBackends
+from user.models import User, ProficiencyMapping
+
+try:
+    import numpy as np
+except ImportError:  # optional dependency, talents are scored in SQL without it
+    np = None
+
+
+def is_in_memory_scoring_enabled():
+    """
+    Return whether talents are scored with the in memory skill matrix.
+    """
+    return np is not None and settings.TALENT_SCORING_BACKEND == ScoringBackends.IN_MEMORY
+
+
+class TalentMatrix:
+    """
+    Users x skills rating matrix and per user experience vectors kept in process memory.
+
+    Rows are reloaded lazily: signals mark users of changed ProficiencyMapping / User rows as dirty in this process and
+    users modified elsewhere (other processes) are picked up through `modified_time` on the next sync. Proficiency
+    writes touch the `modified_time` of their user for this. The sync window starts TALENT_MATRIX_SYNC_LAG_SECONDS
+    before the previous sync so rows committed after it with an earlier `modified_time` are not missed, and the whole
+    matrix is dropped every TALENT_MATRIX_RELOAD_SECONDS to bound anything missed still.
+    """
+    GROWTH = 1024
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        self.user_index = {}
+        self.skill_index = {}
+        self.ratings = np.zeros((0, 0), dtype=np.int16) if np else None
+        self.career_start_dates = np.zeros(0, dtype=np.int64) if np else None
+        self.has_career_start_date = np.zeros(0, dtype=bool) if np else None
+        self.career_break_months = np.zeros(0, dtype=np.int64) if np else None
+        self.dirty_user_ids = set()
+        self.synced_at = None
+        self.loaded_at = None
+
+    def mark_dirty(self, user_id):
+        with self.lock:
+            self.dirty_user_ids.add(user_id)
+
+    def sync(self, user_ids):
+        """
+        Method to make sure the rows of given users are up to date.
+        """
+        with self.lock:
+            synced_at = timezone.now()
+            if self.loaded_at is None or synced_at - self.loaded_at >= timedelta(
+                    seconds=settings.TALENT_MATRIX_RELOAD_SECONDS):
+                self.reset()
+                self.loaded_at = synced_at
+            stale_user_ids = {user_id for user_id in user_ids if user_id not in self.user_index}
+            stale_user_ids |= self.dirty_user_ids
+            if self.synced_at is not None:
+                modified_since = self.synced_at - timedelta(seconds=settings.TALENT_MATRIX_SYNC_LAG_SECONDS)
+                stale_user_ids |= set(User.objects.filter(modified_time__gte=modified_since)
+                                      .values_list('id', flat=True))
+            self.load_users(stale_user_ids)
+            self.dirty_user_ids = set()
+            self.synced_at = synced_at
+
+    def load_users(self, user_ids):
+        if not user_ids:
+            return
+        users = User.objects.filter(id__in=user_ids).values_list('id', 'career_start_date', 'career_break_months')
+        proficiencies = ProficiencyMapping.objects.filter(user_id__in=user_ids) \
+            .values_list('user_id', 'skill_id', 'rating')
+
+        for user_id, career_start_date, career_break_months in users:
+            row = self.row(user_id)
+            self.ratings[row] = 0
+            self.has_career_start_date[row] = career_start_date is not None
+            self.career_start_dates[row] = career_start_date.toordinal() if career_start_date else 0
+            self.career_break_months[row] = career_break_months or 0
+        for user_id, skill_id, rating in proficiencies:
+            row, column = self.row(user_id), self.column(skill_id)
+            self.ratings[row, column] = rating
+
+    def row(self, user_id):
+        if user_id not in self.user_index:
+            self.user_index[user_id] = len(self.user_index)
+            if len(self.user_index) > self.ratings.shape[0]:
+                self.resize(self.ratings.shape[0] + self.GROWTH, self.ratings.shape[1])
+        return self.user_index[user_id]
+
+    def column(self, skill_id):
+        if skill_id not in self.skill_index:
+            self.skill_index[skill_id] = len(self.skill_index)
+            if len(self.skill_index) > self.ratings.shape[1]:
+                self.resize(self.ratings.shape[0], self.ratings.shape[1] + self.GROWTH)
+        return self.skill_index[skill_id]
+
+    def resize(self, users, skills):
+        ratings = np.zeros((users, skills), dtype=np.int16)
+        ratings[:self.ratings.shape[0], :self.ratings.shape[1]] = self.ratings
+        self.ratings = ratings
+        self.career_start_dates = self.grow(self.career_start_dates, users)
+        self.has_career_start_date = self.grow(self.has_career_start_date, users)
+        self.career_break_months = self.grow(self.career_break_months, users)
+
+    def grow(self, vector, size):
+        return np.concatenate([vector, np.zeros(size - vector.shape[0], dtype=vector.dtype)])
+
+    def score(self, user_ids, skill_ids, experience_start, experience_end, today):
+        """
+        Method to compute skill, proficiency and experience scores of given users, mirroring the SQL scorer in
+        SearchTalentService.
+        """
+        with self.lock:
+            # users created or reactivated after the last sync are loaded now, ones gone since score as empty rows
+            self.load_users([user_id for user_id in user_ids if user_id not in self.user_index])
+            rows = np.array([self.row(user_id) for user_id in user_ids], dtype=np.int64)
+            columns = [self.skill_index[skill_id] for skill_id in set(skill_ids) if skill_id in self.skill_index]
+            ratings = self.ratings[np.ix_(rows, columns)] if columns else np.zeros((len(rows), 0), dtype=np.int16)
+            skill_score = (ratings > 0).sum(axis=1) / float(len(skill_ids))
+            proficiency_score = np.minimum(ratings, 4).sum(axis=1) / (len(skill_ids) * 4.0)
+
+            experience_score = None
+            if experience_start and experience_end:
+                start_range = experience_start * 365
+                end_range = experience_end * 365
+                buffer1 = 1 * 365
+                buffer2 = 3 * 365
+                experience_days = np.where(
+                    self.has_career_start_date[rows],
+                    today.toordinal() - self.career_start_dates[rows]
+                    - self.career_break_months[rows] * 30,
+                    0
+                )
+                experience_score = np.select(
+                    [(experience_days >= start_range) & (experience_days <= end_range),
+                     (experience_days >= start_range - buffer1) & (experience_days <= end_range + buffer1),
+                     (experience_days >= start_range - buffer2) & (experience_days <= end_range + buffer2)],
+                    [1.0, 0.75, 0.5],
+                    default=0.25
+                )
+        return skill_score, proficiency_score, experience_score
+
+
+class ScoredTalents:
+    """
+    Talents ordered by score, only the sliced rows are fetched from the database.
+    """
+
+    def __init__(self, user_ids, scores):
+        self.user_ids = user_ids
+        self.scores = scores
+
+    def __len__(self):
+        return len(self.user_ids)
+
+    def count(self):
+        return len(self.user_ids)
+
+    def page_after(self, cursor, size):
+        """
+        Keyset page of the talents ranked after the (score, user id) cursor of the previous page, None for the first
+        page. Returns the page and the cursor of the next one, raises ValueError if the cursor is malformed.
+        """
+        start = 0
+        if cursor is not None:
+            if len(cursor) != 2 or not all(isinstance(value, int) for value in cursor):
+                raise ValueError('Invalid cursor')
+            score, user_id = cursor
+            # the ranking is ordered by score descending and then by user id
+            start = bisect_right(range(len(self.user_ids)), (-score, user_id),
+                                 key=lambda index: (-self.scores[index], self.user_ids[index]))
+        end = start + size
+        next_cursor = encode_cursor(self.scores[end - 1], self.user_ids[end - 1]) if end < len(self.user_ids) else None
+        return self[start:end], next_cursor
+
+    def __getitem__(self, index):
+        if not isinstance(index, slice):
+            return self[index:index + 1][0]
+        user_ids = self.user_ids[index]
+        users = User.objects.select_related('role').in_bulk(user_ids)
+        talents = []
+        for user_id, score in zip(user_ids, self.scores[index]):
+            # users deleted since the ordering was cached are skipped
+            talent = users.get(user_id)
+            if talent is None:
+                continue
+            talent.score = score
+            talents.append(talent)
+        return talents
+
+
+talent_matrix = TalentMatrix()
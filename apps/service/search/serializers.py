@@ -1,13 +1,13 @@
 import datetime
-from itertools import chain
 
-from django.db.models import Q
 from rest_framework import serializers
 
 from common.models import Skill
 from common.serializers import SkillSerializer
-from project.models import ProjectPosition, ProjectAllocation, Project, ProjectAllocationRequest
-from search.constants import DEFAULT_PAGE_NUMBER, DEFAULT_PAGE_SIZE, SerializerKeys
+from helpers.pagination import CursorField
+from project.models import ProjectPosition, ProjectAllocation, Project
+from search.constants import DEFAULT_PAGE_NUMBER, DEFAULT_PAGE_SIZE, SerializerKeys, ErrorMessages, \
+    RequestKeys
 from user.models import User, LeavePlans, ProficiencyMapping, Role
 from utils.utils import camel_to_snake
 from user.serializers import TalentAllocationResponseSerializer, RoleSerializer
@@ -20,6 +20,7 @@ class SearchTalentRequestSerializer(serializers.Serializer):
     relatedSuggestions = serializers.BooleanField(default=False)
     page = serializers.IntegerField(default=DEFAULT_PAGE_NUMBER)
     size = serializers.IntegerField(default=DEFAULT_PAGE_SIZE)
+    cursor = CursorField()
     responseDateStart = serializers.DateField(required=False)
     responseDateEnd = serializers.DateField(required=False)
     locations = serializers.ListField(child=serializers.CharField(max_length=50),
@@ -59,6 +60,7 @@ class QuickSearchTalentCriteriaSerializer(serializers.Serializer):
     page = serializers.IntegerField(
         default=DEFAULT_PAGE_NUMBER, allow_null=True)
     size = serializers.IntegerField(default=DEFAULT_PAGE_SIZE, allow_null=True)
+    cursor = CursorField(write_only=True)
     response_date_start = serializers.DateField(
         required=False, allow_null=True)
     response_date_end = serializers.DateField(required=False, allow_null=True)
@@ -78,7 +80,7 @@ class TalentProficiencySerializer(serializers.ModelSerializer):
     skill_id = serializers.SerializerMethodField()
 
     def get_skill_id(self, instance):
-        return instance.skill.id
+        return instance.skill_id
 
     class Meta:
         model = ProficiencyMapping
@@ -99,7 +101,7 @@ class TalentAllocationSerializer(serializers.ModelSerializer):
         return False
 
     def get_position_id(self, instance):
-        return instance.position.id
+        return instance.position_id
 
     def get_position_role(self, instance):
         role = instance.position.project_role.role
@@ -149,64 +151,30 @@ class SearchTalentResponseSerializer(serializers.ModelSerializer):
     def get_match_percent(self, instance):
         return f'{instance.score}%'
 
-    def get_skills(self, instance):
-        skills = self.context.get(SerializerKeys.SKILLS)
-        proficiency = ProficiencyMapping.objects.filter(user=instance, skill__in=skills).order_by('-rating').exclude(
-            rating=0)
-        proficiency = chain(proficiency, ProficiencyMapping.objects.filter(user=instance).order_by('-rating')
-                            .exclude(Q(skill__in=skills) | Q(rating=0)))
+    def get_talent_details(self, instance, key):
+        # details of the whole page are batch loaded by the view, see SearchTalentService.load_talent_details
+        return self.context[SerializerKeys.TALENT_DETAILS][key].get(instance.id, [])
 
+    def get_skills(self, instance):
+        proficiency = self.get_talent_details(instance, SerializerKeys.PROFICIENCY)
         return TalentProficiencySerializer(proficiency, many=True).data
 
     def get_allocation(self, instance):
-        response_date_start = self.context.get(
-            SerializerKeys.RESPONSE_DATE_START)
-        response_date_end = self.context.get(SerializerKeys.RESPONSE_DATE_END)
         projects = self.context.get(SerializerKeys.PROJECTS)
-
-        allocations = ProjectAllocation.objects.filter(user=instance) \
-            .select_related('position__project_role__project')
-        if response_date_start:
-            allocations = allocations.filter(
-                Q(end_date__gte=response_date_start) | Q(end_date__isnull=True))
-        if response_date_end:
-            allocations = allocations.filter(start_date__lte=response_date_end)
-
+        allocations = self.get_talent_details(instance, SerializerKeys.ALLOCATIONS)
         return TalentAllocationSerializer(allocations, many=True,
                                           context={SerializerKeys.PROJECTS: projects}).data
 
     def get_leaves(self, instance):
-        response_date_start = self.context.get(
-            SerializerKeys.RESPONSE_DATE_START)
-        response_date_end = self.context.get(SerializerKeys.RESPONSE_DATE_END)
-
-        leaves = LeavePlans.objects.filter(
-            user=instance, approval_status='Approved')
-        if response_date_start:
-            leaves = leaves.filter(to_date__gte=response_date_start)
-        if response_date_end:
-            leaves = leaves.filter(from_date__lte=response_date_end)
-
+        leaves = self.get_talent_details(instance, SerializerKeys.LEAVES)
         return TalentLeavesSerializer(leaves, many=True).data
 
     def get_kt_period_detail(self, instance):
-        response_date_start = self.context.get(
-            SerializerKeys.RESPONSE_DATE_START)
-        response_date_end = self.context.get(SerializerKeys.RESPONSE_DATE_END)
-
-        allocations = ProjectAllocation.objects.filter(user=instance) \
-            .select_related('position__project_role__project')
-        if response_date_start:
-            allocations = allocations.filter(
-                Q(end_date__gte=response_date_start) | Q(end_date__isnull=True))
-        if response_date_end:
-            allocations = allocations.filter(start_date__lte=response_date_end)
+        allocations = self.get_talent_details(instance, SerializerKeys.ALLOCATIONS)
         return TalentKTDetailSerializer(allocations, many=True).data
 
     def get_requests(self, instance):
-        project_allocation_request = ProjectAllocationRequest.objects.filter(
-            Q(status=ProjectAllocationRequest.Status.PENDING),
-            Q(user=instance))
+        project_allocation_request = self.get_talent_details(instance, SerializerKeys.REQUESTS)
         return TalentAllocationResponseSerializer(project_allocation_request, many=True).data
 
     class Meta:
@@ -218,10 +186,7 @@ class SearchTalentResponseSerializer(serializers.ModelSerializer):
 
 
 class UniversalSearchUserResponseSerializer(serializers.ModelSerializer):
-    name = serializers.SerializerMethodField()
-
-    def get_name(self, instance):
-        return instance.name
+    name = serializers.CharField()
 
     class Meta:
         model = User
@@ -229,10 +194,7 @@ class UniversalSearchUserResponseSerializer(serializers.ModelSerializer):
 
 
 class UniversalSearchClientResponseSerializer(serializers.ModelSerializer):
-    name = serializers.SerializerMethodField()
-
-    def get_name(self, instance):
-        return instance.name
+    name = serializers.CharField()
 
     class Meta:
         model = User
@@ -240,10 +202,7 @@ class UniversalSearchClientResponseSerializer(serializers.ModelSerializer):
 
 
 class UniversalSearchProjectResponseSerializer(serializers.ModelSerializer):
-    name = serializers.SerializerMethodField()
-
-    def get_name(self, instance):
-        return instance.name
+    name = serializers.CharField()
 
     class Meta:
         model = User
@@ -252,3 +211,36 @@ class UniversalSearchProjectResponseSerializer(serializers.ModelSerializer):
 
 class QuickSearchRequestSerializer(serializers.Serializer):
     search = serializers.CharField(required=True)
+
+
+class StaffingPlanRequestSerializer(serializers.Serializer):
+    project = serializers.PrimaryKeyRelatedField(queryset=Project.objects.all(), required=False, allow_null=True)
+    positions = serializers.PrimaryKeyRelatedField(queryset=ProjectPosition.objects.all(), many=True,
+                                                   required=False, allow_null=True)
+
+    def validate(self, attrs):
+        if not attrs.get(RequestKeys.PROJECT) and not attrs.get(RequestKeys.POSITIONS):
+            raise serializers.ValidationError(ErrorMessages.EITHER_PROJECT_OR_POSITIONS_IS_REQUIRED)
+        return attrs
+
+
+class StaffingPlanTalentSerializer(serializers.ModelSerializer):
+    role = serializers.CharField(source='role.name', allow_null=True)
+    match_percent = serializers.SerializerMethodField()
+
+    def get_match_percent(self, instance):
+        return f'{instance.score}%'
+
+    class Meta:
+        model = User
+        fields = ('id', 'full_name_with_exp_band', 'role', 'match_percent')
+
+
+class StaffingPlanPositionSerializer(serializers.Serializer):
+    position_id = serializers.IntegerField(source='position.id')
+    project_name = serializers.CharField(source='position.project_role.project.name')
+    role = serializers.CharField(source='position.project_role.role.name')
+    utilization = serializers.IntegerField(source='position.utilization')
+    start_date = serializers.DateField(source='position.start_date')
+    end_date = serializers.DateField(source='position.end_date')
+    talent = StaffingPlanTalentSerializer(allow_null=True)
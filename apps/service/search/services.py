@@ -1,13 +1,23 @@
+from collections import defaultdict
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.cache import cache
 from django.db.models import IntegerField, Count, FloatField
 from django.db.models import Sum, Q
 from django.db.models.expressions import RawSQL, F, Subquery, OuterRef, Case, When, Value
-from django.db.models.functions import Coalesce, ExtractDay, Cast, Concat
+from django.contrib.postgres.search import TrigramSimilarity
+from django.db.models.functions import Coalesce, ExtractDay, Cast
 from django.utils import timezone
 
 from client.models import Client
-from project.models import Project
-from search.constants import Weights
-from user.models import User
+from project.models import Project, ProjectAllocation, ProjectAllocationRequest, ProjectPosition
+from search.cache import get_ranking_key
+from search.constants import Weights, SerializerKeys, ResponseKeys, UNIVERSAL_SEARCH_LIMIT, DEFAULT_POSITION_DAYS
+from search.scoring import is_in_memory_scoring_enabled, talent_matrix, ScoredTalents, np
+from user.constants import ValueConstants, LeaveStatusKeys
+from user.models import User, ProficiencyMapping, LeavePlans, FullName, UserAvailability
+from utils.assignment import solve_assignment
 
 
 class SearchTalentService:
@@ -28,14 +38,16 @@ class SearchTalentService:
 
         # filter based on search criteria
         if search:
-            users = users.annotate(name=Concat('first_name', Value(' '), 'last_name')).filter(name__icontains=search)
+            users = users.annotate(name=FullName()).filter(name__icontains=search)
 
         # filter based on required skills
-        users = users.filter(proficiency_mapping__skill__in=skill_ids).distinct()
+        # (subqueries instead of joins keep users unique without a DISTINCT over the scored columns)
+        users = users.filter(id__in=ProficiencyMapping.objects.filter(skill__in=skill_ids).values('user_id'))
 
         # filter based on projects
         if projects:
-            users = users.filter(allocation__position__project_role__project__in=projects)
+            users = users.filter(id__in=ProjectAllocation.objects.filter(
+                position__project_role__project__in=projects).values('user_id'))
 
         # filter based on locations
         if locations:
@@ -46,11 +58,34 @@ class SearchTalentService:
 
         return users
 
+    def rank_talents(self, criteria, users, start_date, end_date, utilization, skill_ids, experience_start,
+                     experience_end):
+        """
+        Method to score talents, the resulting ordering is cached per search criteria until talent data changes
+        so that subsequent pages are served without rescoring.
+        """
+        cache_key = get_ranking_key(criteria)
+        ranking = cache.get(cache_key)
+        if ranking is None:
+            talents = self.score_talents(users, start_date, end_date, utilization, skill_ids, experience_start,
+                                         experience_end)
+            if isinstance(talents, ScoredTalents):
+                ranking = (talents.user_ids, talents.scores)
+            else:
+                scores = list(talents.values_list('id', 'score'))
+                ranking = ([user_id for user_id, _ in scores], [score for _, score in scores])
+            cache.set(cache_key, ranking, settings.SEARCH_CACHE_TIMEOUT)
+        return ScoredTalents(*ranking)
+
     def score_talents(self, users, start_date, end_date, utilization, skill_ids, experience_start,
                       experience_end):
         """
         Method to score talents based on given criteria.
         """
+        if is_in_memory_scoring_enabled():
+            return self.score_talents_in_memory(users, start_date, end_date, utilization, skill_ids,
+                                                experience_start, experience_end)
+
         # score talents based on different parameters
         weight_availability = Weights.AVAILABILITY
         availability_score = 0
@@ -79,9 +114,48 @@ class SearchTalentService:
         weighted_score = availability_score + skill_score + proficiency_score + experience_score
         total_weight = weight_availability + Weights.SKILL + Weights.PROFICIENCY + weight_experience
         users = users.annotate(score=Cast(weighted_score / total_weight * 100, IntegerField()))
-        users = users.order_by('-score')
+        users = users.order_by('-score', 'id').select_related('role')
         return users
 
+    def score_talents_in_memory(self, users, start_date, end_date, utilization, skill_ids, experience_start,
+                                experience_end):
+        """
+        Method to score talents with the in memory skill matrix, same scores as `score_talents` in SQL.
+        Only availability is computed in the database, the page of talents is fetched once sliced.
+        """
+        weight_availability = Weights.AVAILABILITY
+        if start_date and end_date and utilization:
+            users = self.score_on_availability(users, start_date, end_date, utilization)
+            availability = list(users.values_list('id', 'availability_score'))
+            user_ids = tuple(user_id for user_id, _ in availability)
+            availability_score = np.array([score for _, score in availability], dtype=float) * weight_availability
+        else:
+            user_ids = tuple(users.values_list('id', flat=True))
+            availability_score = 0
+            weight_availability = 0
+
+        if not user_ids:
+            return ScoredTalents([], [])
+
+        talent_matrix.sync(user_ids)
+        skill_score, proficiency_score, experience_score = talent_matrix.score(
+            user_ids, skill_ids, experience_start, experience_end, timezone.now().date())
+        weight_experience = Weights.EXPERIENCE
+        if experience_score is not None:
+            experience_score = experience_score * weight_experience
+        else:
+            experience_score = 0
+            weight_experience = 0
+
+        weighted_score = availability_score + skill_score * Weights.SKILL + \
+            proficiency_score * Weights.PROFICIENCY + experience_score
+        total_weight = weight_availability + Weights.SKILL + Weights.PROFICIENCY + weight_experience
+        # rint rounds half to even same as the cast to integer in Postgres
+        scores = np.rint(weighted_score / total_weight * 100).astype(int)
+        user_ids = np.array(user_ids)
+        order = np.lexsort((user_ids, -scores))
+        return ScoredTalents(user_ids[order].tolist(), scores[order].tolist())
+
     def score_on_availability(self, users, start_date, end_date, utilization):
         # logic -
         # score = number of days available / number of days required
@@ -91,66 +165,31 @@ class SearchTalentService:
         # in given start_date - end date range
         # for at least given utilization percentage i.e. availability >= utilization requirement
 
-        # 'day_wise_allocation' CTE splits the user allocation data into individual days
-        #   and calculates total utilization of each user per day
-        # this is joined with the required date range in 'project_based_availability' CTE
-        # 'available' column denotes whether user is available on that day for given utilization requirement
-        # (value: 1 or 0)
-        # same logic is applied for leave plan
-        # if user is available as per both conditions and current day is not beyond LWD -
-        # user is considered available for that day
+        # the precomputed 'user_availability' calendar stores non overlapping intervals in which a user is
+        # utilized or on leave, open ended intervals (null end date) are capped to the requested end date
+        # days in range (capped to the day before LWD) minus days of intervals where the user
+        # is on leave or does not have the required bandwidth gives the available days
 
         total_days = (end_date - start_date).days + 1
         query = """
-            with
-            day_wise_allocation as (
-                select
-                    user_id,
-                    generate_series(start_date, coalesce(end_date, date %s), '1 day')::date as day,
-                    sum(utilization) as util
-                from project_allocation
-                where tentative = false
-                group by user_id, day
-            ),
-            day_wise_leaves as (
-                select
-                    user_id,
-                    generate_series(from_date, to_date, '1 day'):: date as day
-                from leave_plans
-                where approval_status != 'Cancelled' and approval_status != 'Rejected'
-                group by user_id, day
-            ),
-            project_based_availability as (
-                select
-                    u.id as uid,
-                    s.day as day,
-                    case when 100 - coalesce(a.util, 0) >= %s then 1 else 0 end as available
-                from users u
-                    left join (select id, generate_series(date %s, date %s, '1 day')::date as day from users) as s on
-                    u.id=s.id
-                    left join day_wise_allocation a on u.id=a.user_id and s.day=a.day
-            ),
-            leave_based_availability as (
-                select
-                    u.id as uid,
-                    s.day as day,
-                    case when l.day is null then 1 else 0 end as available
-                from users u
-                    left join (select id, generate_series(date %s, date %s, '1 day')::date as day from users) as s on
-                    u.id=s.id
-                    left join day_wise_leaves l on u.id=l.user_id and s.day=l.day
-            )
-            select
-                sum((pba.available = 1 and lba.available = 1
-                    and (users.last_working_day is null or pba.day < users.last_working_day))::int) as available_days
-            from project_based_availability pba join leave_based_availability lba on pba.uid=lba.uid and pba.day=lba.day
-            where pba.uid=users.id
-            group by pba.uid
+            select greatest(
+                least(date %s, coalesce(users.last_working_day - 1, date %s)) - date %s + 1
+                - coalesce(sum(greatest(
+                    least(coalesce(ua.end_date, date %s), date %s, coalesce(users.last_working_day - 1, date %s))
+                    - greatest(ua.start_date, date %s) + 1, 0)), 0),
+                0) as available_days
+            from user_availability ua
+            where ua.user_id = users.id
+                and (ua.on_leave or ua.utilization > %s)
+                and ua.start_date <= date %s
+                and (ua.end_date is null or ua.end_date >= date %s)
             """
 
         users = users.annotate(available_days=RawSQL(query,
-                                                     params=[end_date, utilization, start_date, end_date, start_date,
-                                                             end_date],
+                                                     params=[end_date, end_date, start_date, end_date, end_date,
+                                                             end_date, start_date,
+                                                             ValueConstants.MAXIMUM_UTILIZATION - utilization,
+                                                             end_date, start_date],
                                                      output_field=IntegerField()))
         users = users.annotate(availability_score=F('available_days') / float(total_days))
         return users
@@ -215,8 +254,72 @@ class SearchTalentService:
         ))
         return users
 
+    def load_talent_details(self, talents, skills, response_date_start, response_date_end):
+        """
+        Method to fetch proficiencies, allocations, leaves and pending requests of a page of talents
+        with one query each, grouped by user id.
+        """
+        user_ids = [talent.id for talent in talents]
+        skill_ids = {skill.id for skill in skills}
+        details = {key: defaultdict(list) for key in (SerializerKeys.PROFICIENCY, SerializerKeys.ALLOCATIONS,
+                                                      SerializerKeys.LEAVES, SerializerKeys.REQUESTS)}
+
+        # required skills are listed first followed by the other skills, each ordered by rating
+        proficiencies = ProficiencyMapping.objects.filter(user_id__in=user_ids).exclude(rating=0) \
+            .select_related('skill').order_by('-rating', 'id')
+        other_proficiencies = defaultdict(list)
+        for proficiency in proficiencies:
+            if proficiency.skill_id in skill_ids:
+                details[SerializerKeys.PROFICIENCY][proficiency.user_id].append(proficiency)
+            else:
+                other_proficiencies[proficiency.user_id].append(proficiency)
+        for user_id, proficiency in other_proficiencies.items():
+            details[SerializerKeys.PROFICIENCY][user_id].extend(proficiency)
+
+        allocations = ProjectAllocation.objects.filter(user_id__in=user_ids) \
+            .select_related('position__project_role__project', 'position__project_role__role').order_by('id')
+        leaves = LeavePlans.objects.filter(user_id__in=user_ids, approval_status=LeaveStatusKeys.APPROVED) \
+            .order_by('id')
+        if response_date_start:
+            allocations = allocations.filter(Q(end_date__gte=response_date_start) | Q(end_date__isnull=True))
+            leaves = leaves.filter(to_date__gte=response_date_start)
+        if response_date_end:
+            allocations = allocations.filter(start_date__lte=response_date_end)
+            leaves = leaves.filter(from_date__lte=response_date_end)
+        for allocation in allocations:
+            details[SerializerKeys.ALLOCATIONS][allocation.user_id].append(allocation)
+        for leave in leaves:
+            details[SerializerKeys.LEAVES][leave.user_id].append(leave)
+
+        allocation_requests = ProjectAllocationRequest.objects.filter(
+            user_id__in=user_ids, status=ProjectAllocationRequest.Status.PENDING
+        ).select_related('position__project_role__project').order_by('id')
+        for allocation_request in allocation_requests:
+            details[SerializerKeys.REQUESTS][allocation_request.user_id].append(allocation_request)
+
+        return details
+
+    def query_universal(self, search, limit=UNIVERSAL_SEARCH_LIMIT):
+        """
+        Method to find the users, clients and projects matching the search in a single query. Matches are served by
+        the trigram indexes, ranked by similarity and capped at `limit` per entity type.
+        """
+        matches = [self.rank_matches(self.query_users(search), ResponseKeys.USERS, search, limit),
+                   self.rank_matches(self.query_client(search), ResponseKeys.CLIENTS, search, limit),
+                   self.rank_matches(self.query_project(search), ResponseKeys.PROJECTS, search, limit)]
+        rows = matches[0].union(*matches[1:], all=True)
+
+        results = {ResponseKeys.USERS: [], ResponseKeys.CLIENTS: [], ResponseKeys.PROJECTS: []}
+        for row in sorted(rows, key=lambda row: (-row['rank'], row['id'])):
+            results[row['kind']].append(row)
+        return results
+
+    def rank_matches(self, matches, kind, search, limit):
+        return matches.annotate(kind=Value(kind), rank=TrigramSimilarity('name', search)) \
+                   .order_by('-rank', 'id').values('id', 'name', 'kind', 'rank')[:limit]
+
     def query_users(self, search):
-        users = User.objects.annotate(name=Concat('first_name', Value(' '), 'last_name')).filter(name__icontains=search)
+        users = User.objects.annotate(name=FullName()).filter(name__icontains=search)
 
         return users
 
@@ -228,3 +331,154 @@ class SearchTalentService:
         projects = Project.objects.filter(name__icontains=search)
 
         return projects
+
+
+class StaffingPlanService:
+    """
+    Suggests talents for several positions at once.
+
+    Candidates of all positions are scored in one pass with the weights of `SearchTalentService.score_talents` and
+    the positions are then filled through an optimal assignment that maximizes the total score. A talent is
+    suggested for one position at most and only where they have the bandwidth for the position's utilization.
+    """
+
+    def get_open_positions(self, project):
+        """
+        Method to get the positions of a project that are not over and have no current or upcoming allocation.
+        """
+        running = Q(end_date__isnull=True) | Q(end_date__gte=timezone.now().date())
+        allocated_positions = ProjectAllocation.objects.filter(running).values('position_id')
+        return ProjectPosition.objects.filter(running, project_role__project=project) \
+            .exclude(id__in=allocated_positions)
+
+    def plan(self, positions):
+        """
+        Method to suggest a talent for each of the given positions, positions without a suitable talent are
+        suggested none.
+        """
+        positions = list(positions.select_related('project_role__role', 'project_role__project')
+                         .prefetch_related('skills').order_by('start_date', 'id'))
+        for position in positions:
+            position.skill_ids = {skill.id for skill in position.skills.all()}
+            position.period_end_date = position.end_date or \
+                position.start_date + timedelta(days=DEFAULT_POSITION_DAYS - 1)
+
+        # positions without skills cannot be scored, same as in talent search
+        staffable_positions = [position for position in positions if position.skill_ids]
+        talents = self.query_candidates(staffable_positions)
+        scores = self.score_candidates(staffable_positions, talents)
+
+        # one zero cost column per position stands for leaving it unfilled
+        cost = [[-scores.get((position.id, talent.id), 0) for talent in talents] + [0] * len(staffable_positions)
+                for position in staffable_positions]
+        suggestions = {}
+        for position, column in zip(staffable_positions, solve_assignment(cost)):
+            if column < len(talents) and (position.id, talents[column].id) in scores:
+                talent = talents[column]
+                talent.score = scores[(position.id, talent.id)]
+                suggestions[position.id] = talent
+
+        return [{SerializerKeys.POSITION: position, SerializerKeys.TALENT: suggestions.get(position.id)}
+                for position in positions]
+
+    def query_candidates(self, positions):
+        """
+        Method to query active talents of the role of any given position that have at least one of its skills.
+        """
+        if not positions:
+            return []
+        conditions = Q()
+        for position in positions:
+            conditions |= Q(role_id=position.project_role.role_id,
+                            id__in=ProficiencyMapping.objects.filter(skill__in=position.skill_ids).values('user_id'))
+        return list(User.objects.filter_active().filter(conditions).select_related('role').order_by('id'))
+
+    def score_candidates(self, positions, talents):
+        """
+        Method to score every eligible talent - position pair, returns the scores keyed by (position id, user id).
+        """
+        if not talents:
+            return {}
+        user_ids = [talent.id for talent in talents]
+        skill_ids = set().union(*(position.skill_ids for position in positions))
+        ratings = {(user_id, skill_id): rating for user_id, skill_id, rating in ProficiencyMapping.objects.filter(
+            user_id__in=user_ids, skill_id__in=skill_ids).values_list('user_id', 'skill_id', 'rating')}
+
+        intervals = defaultdict(list)
+        availability = UserAvailability.objects.filter(
+            user_id__in=user_ids, start_date__lte=max(position.period_end_date for position in positions)
+        ).filter(Q(end_date__isnull=True) | Q(end_date__gte=min(position.start_date for position in positions)))
+        for user_id, start_date, end_date, utilization, on_leave in availability.values_list(
+                'user_id', 'start_date', 'end_date', 'utilization', 'on_leave'):
+            intervals[user_id].append((start_date, end_date, utilization, on_leave))
+
+        today = timezone.now().date()
+        scores = {}
+        for position in positions:
+            for talent in talents:
+                skill_ratings = [ratings[(talent.id, skill_id)] for skill_id in position.skill_ids
+                                 if (talent.id, skill_id) in ratings]
+                if talent.role_id != position.project_role.role_id or not skill_ratings:
+                    continue
+                score = self.score_candidate(position, talent, skill_ratings, intervals[talent.id], today)
+                if score is not None:
+                    scores[(position.id, talent.id)] = score
+        return scores
+
+    def score_candidate(self, position, talent, skill_ratings, intervals, today):
+        # mirrors the SQL scorer of SearchTalentService (same operations in the same order so that scores round
+        # alike), returns none if the talent has no bandwidth for the position's utilization on any day of it
+        weight_availability = Weights.AVAILABILITY
+        availability_score = 0
+        if position.utilization:
+            available_days = self.get_available_days(talent, intervals, position.start_date,
+                                                     position.period_end_date, position.utilization)
+            if not available_days:
+                return None
+            total_days = (position.period_end_date - position.start_date).days + 1
+            availability_score = available_days / float(total_days) * weight_availability
+        else:
+            weight_availability = 0
+
+        skill_score = len([rating for rating in skill_ratings if rating > 0]) / float(len(position.skill_ids))
+        proficiency_score = sum(min(rating, 4) for rating in skill_ratings) / (len(position.skill_ids) * 4.0)
+
+        weight_experience = Weights.EXPERIENCE
+        experience_score = 0
+        if position.experience_range_start and position.experience_range_end:
+            experience_days = (today - talent.career_start_date).days - talent.career_break_months * 30 \
+                if talent.career_start_date else 0
+            start_range = position.experience_range_start * 365
+            end_range = position.experience_range_end * 365
+            buffer1 = 1 * 365
+            buffer2 = 3 * 365
+            if start_range <= experience_days <= end_range:
+                experience_score = 1
+            elif start_range - buffer1 <= experience_days <= end_range + buffer1:
+                experience_score = 0.75
+            elif start_range - buffer2 <= experience_days <= end_range + buffer2:
+                experience_score = 0.5
+            else:
+                experience_score = 0.25
+            experience_score = experience_score * weight_experience
+        else:
+            weight_experience = 0
+
+        weighted_score = availability_score + skill_score * Weights.SKILL + \
+            proficiency_score * Weights.PROFICIENCY + experience_score
+        total_weight = weight_availability + Weights.SKILL + Weights.PROFICIENCY + weight_experience
+        # round half to even same as the cast to integer in Postgres
+        return round(weighted_score / total_weight * 100)
+
+    def get_available_days(self, talent, intervals, start_date, end_date, utilization):
+        # days in range (capped to the day before LWD) minus days of intervals where the user is on leave or does
+        # not have the required bandwidth, same as SearchTalentService.score_on_availability
+        if talent.last_working_day:
+            end_date = min(end_date, talent.last_working_day - timedelta(days=1))
+        unavailable_days = 0
+        for interval_start, interval_end, interval_utilization, on_leave in intervals:
+            if not on_leave and interval_utilization <= ValueConstants.MAXIMUM_UTILIZATION - utilization:
+                continue
+            interval_end = min(interval_end or end_date, end_date)
+            unavailable_days += max((interval_end - max(interval_start, start_date)).days + 1, 0)
+        return max((end_date - start_date).days + 1 - unavailable_days, 0)
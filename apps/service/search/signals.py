@@ -0,0 +1,62 @@
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+from django.utils import timezone
+
+from project.models import ProjectAllocation, ProjectAllocationRequest
+from search.cache import bump_data_version
+from search.constants import SCORED_USER_FIELDS, VERSIONED_USER_FIELDS
+from search.scoring import is_in_memory_scoring_enabled, talent_matrix
+from user.models import ProficiencyMapping, User, LeavePlans
+
+
+@receiver(post_save, sender=ProficiencyMapping)
+@receiver(post_delete, sender=ProficiencyMapping)
+def refresh_talent_matrix_proficiency(sender, instance, **kwargs):
+    """
+    Reload the skill matrix row of the user on their next search, other processes see the change through the
+    `modified_time` of the user.
+    """
+    if is_in_memory_scoring_enabled():
+        talent_matrix.mark_dirty(instance.user_id)
+        User.objects.filter(id=instance.user_id).update(modified_time=timezone.now())
+
+
+def is_user_save_of(update_fields, fields):
+    """
+    Return whether a user save may change any of given fields, such as not for the last_login save on login.
+    """
+    return update_fields is None or not fields.isdisjoint(update_fields)
+
+
+@receiver(post_save, sender=User)
+def refresh_talent_matrix_user(sender, instance, update_fields=None, **kwargs):
+    """
+    Reload the experience of the user on their next search.
+    """
+    if is_in_memory_scoring_enabled() and is_user_save_of(update_fields, SCORED_USER_FIELDS):
+        talent_matrix.mark_dirty(instance.id)
+
+
+@receiver(post_save, sender=ProjectAllocation)
+@receiver(post_delete, sender=ProjectAllocation)
+@receiver(post_save, sender=ProjectAllocationRequest)
+@receiver(post_delete, sender=ProjectAllocationRequest)
+@receiver(post_save, sender=LeavePlans)
+@receiver(post_delete, sender=LeavePlans)
+@receiver(post_save, sender=ProficiencyMapping)
+@receiver(post_delete, sender=ProficiencyMapping)
+@receiver(post_delete, sender=User)
+def invalidate_search_rankings(sender, **kwargs):
+    """
+    Cached talent orderings are computed from these rows, any change makes them stale.
+    """
+    bump_data_version()
+
+
+@receiver(post_save, sender=User)
+def invalidate_search_rankings_user(sender, update_fields=None, **kwargs):
+    """
+    Invalidate cached talent orderings and project ETags unless the save only touched fields neither reads.
+    """
+    if is_user_save_of(update_fields, VERSIONED_USER_FIELDS):
+        bump_data_version()
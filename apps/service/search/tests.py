@@ -1,15 +1,23 @@
 import logging
-from datetime import datetime
+from datetime import datetime, timedelta
+from unittest import skipIf
 from unittest.mock import patch
 
+from django.core.cache import cache
+from django.test import override_settings
 from django.urls import reverse
+from django.utils import timezone
 from rest_framework import status
 from rest_framework.test import APITestCase
 
+from authapp.cache import get_user_permission_names
 from client.models import Client
 from common.models import Skill
-from project.models import Project, ProjectRole, ProjectPosition, ProjectAllocation, ProjectPositionSkills
-from search.constants import PermissionKeys, ResponseKeys, Weights
+from project.models import Project, ProjectRole, ProjectPosition, ProjectAllocation, ProjectPositionSkills, \
+    ProjectAllocationRequest
+from search.constants import PermissionKeys, ResponseKeys, Weights, ScoringBackends, UNIVERSAL_SEARCH_LIMIT
+from search.scoring import np, talent_matrix
+from search.services import SearchTalentService
 from user.models import User, Role, ProficiencyMapping, LeavePlans
 from utils.permissions import get_permission_object
 
@@ -26,6 +34,9 @@ class BaseTestCase(APITestCase):
     def setUpTestData(cls):
         cls.user = User.objects.create_user(employee_id=1, email='user@company.io', first_name='Foo', last_name='Bar')
 
+    def setUp(self):
+        cache.clear()
+
 
 class SearchTalentTests(BaseTestCase):
 
@@ -118,6 +129,210 @@ class SearchTalentTests(BaseTestCase):
         self.assertEqual(len(response.data[ResponseKeys.TALENTS][1]['allocation']), 0)
         self.assertEqual(len(response.data[ResponseKeys.TALENTS][1]['leaves']), 0)
 
+    @patch('search.services.timezone')
+    def test_quick_search_talent_pagination(self, mock):
+        mock.now.return_value = datetime.strptime('2023-01-01', '%Y-%m-%d')
+
+        self.client.force_authenticate(user=self.user)
+        url = reverse('v1:search:quick-search')
+        data = {
+            'relatedSuggestions': True,
+            "skills": [self.skill1.id],
+            "experienceRangeStart": 2,
+            "experienceRangeEnd": 5,
+            "startDate": "2023-01-15",
+            "endDate": "2023-02-14",
+            "utilization": 70,
+            "page": 2,
+            "size": 1
+        }
+        response = self.client.post(url, data, format='json')
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data[ResponseKeys.COUNT], 2)
+        self.assertEqual(len(response.data[ResponseKeys.TALENTS]), 1)
+        self.assertEqual(response.data[ResponseKeys.TALENTS][0]['id'], self.user2.id)
+
+    @patch('search.services.timezone')
+    def test_quick_search_talent_keyset_pagination(self, mock):
+        mock.now.return_value = datetime.strptime('2023-01-01', '%Y-%m-%d')
+
+        self.client.force_authenticate(user=self.user)
+        url = reverse('v1:search:quick-search')
+        data = {
+            'relatedSuggestions': True,
+            "skills": [self.skill1.id],
+            "experienceRangeStart": 2,
+            "experienceRangeEnd": 5,
+            "startDate": "2023-01-15",
+            "endDate": "2023-02-14",
+            "utilization": 70,
+            "size": 1
+        }
+        talents = []
+        cursor = ''
+        while cursor is not None:
+            response = self.client.post(url, {**data, 'cursor': cursor}, format='json')
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            self.assertEqual(response.data[ResponseKeys.COUNT], 2)
+            talents += [talent['id'] for talent in response.data[ResponseKeys.TALENTS]]
+            cursor = response.data[ResponseKeys.NEXT_CURSOR]
+        self.assertEqual(talents, [self.user1.id, self.user2.id])
+
+    @patch('search.services.timezone')
+    def test_quick_search_talent_cached_ranking(self, mock):
+        mock.now.return_value = datetime.strptime('2023-01-01', '%Y-%m-%d')
+
+        self.client.force_authenticate(user=self.user)
+        url = reverse('v1:search:quick-search')
+        data = {
+            "skills": [self.skill1.id],
+            "experienceRangeStart": 2,
+            "experienceRangeEnd": 5,
+            "startDate": "2023-01-15",
+            "endDate": "2023-02-14",
+            "utilization": 70,
+            "size": 1
+        }
+
+        with patch.object(SearchTalentService, 'score_talents', wraps=SearchTalentService().score_talents) as scorer:
+            response = self.client.post(url, data, format='json')
+            self.assertEqual(response.data[ResponseKeys.TALENTS][0]['id'], self.user1.id)
+
+            # subsequent pages are served from the cached ordering
+            response = self.client.post(url, {**data, 'page': 2}, format='json')
+            self.assertEqual(response.data[ResponseKeys.COUNT], 2)
+            self.assertEqual(response.data[ResponseKeys.TALENTS][0]['id'], self.user2.id)
+            self.assertEqual(scorer.call_count, 1)
+
+            # changes to talent data invalidate the cached ordering
+            ProficiencyMapping.objects.filter(user=self.user2, skill=self.skill1).update(rating=5)
+            ProficiencyMapping.objects.create(user=self.user1, skill=self.skill2, rating=1)
+            self.client.post(url, data, format='json')
+            self.assertEqual(scorer.call_count, 2)
+
+            # the last_login save on login does not change anything the ordering is computed from
+            self.user1.last_login = timezone.now()
+            self.user1.save(update_fields=['last_login'])
+            self.client.post(url, data, format='json')
+            self.assertEqual(scorer.call_count, 2)
+
+            self.user1.work_location = 'Pune'
+            self.user1.save(update_fields=['work_location'])
+            self.client.post(url, data, format='json')
+            self.assertEqual(scorer.call_count, 3)
+
+    @override_settings(TALENT_SCORING_BACKEND=ScoringBackends.SQL)
+    @patch('search.services.timezone')
+    def test_search_talent_query_budget(self, mock):
+        mock.now.return_value = datetime.strptime('2023-01-01', '%Y-%m-%d')
+
+        for index in range(5):
+            user = User.objects.create(employee_id=100 + index, email=f'talent{index}@company.io', first_name='Foo',
+                                       last_name=f'Talent{index}', career_start_date='2019-07-15')
+            ProficiencyMapping.objects.create(user=user, skill=self.skill1, rating=3)
+            ProficiencyMapping.objects.create(user=user, skill=self.skill2, rating=2)
+            ProjectAllocation.objects.create(user=user, position=self.position1, utilization=50,
+                                             start_date='2023-01-01', end_date='2023-01-31')
+            LeavePlans.objects.create(record_id=f'budget{index}', user=user, from_date='2023-02-06',
+                                      to_date='2023-02-10', duration=5, leave_type='junk', approval_status='Approved')
+            ProjectAllocationRequest.objects.create(user=user, position=self.position2, utilization=50,
+                                                    start_date='2023-06-01', end_date='2023-06-30')
+
+        self.client.force_authenticate(user=self.user)
+        url = reverse('v1:search:quick-search')
+        data = {
+            'relatedSuggestions': True,
+            'responseDateStart': '2023-01-15',
+            'responseDateEnd': '2023-02-15',
+            "skills": [self.skill1.id],
+            "experienceRangeStart": 2,
+            "experienceRangeEnd": 5,
+            "startDate": "2023-01-15",
+            "endDate": "2023-02-14",
+            "utilization": 70,
+            "size": 10
+        }
+
+        # queries are independent of the number of talents on the page, permissions come from the cache
+        get_user_permission_names(self.user)
+        with self.assertNumQueries(7):
+            response = self.client.post(url, data, format='json')
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(response.data[ResponseKeys.TALENTS]), 7)
+        talent = next(talent for talent in response.data[ResponseKeys.TALENTS]
+                      if talent['full_name_with_exp_band'] == 'Foo Talent0')
+        self.assertEqual([skill['skill'] for skill in talent['skills']], ['Python', 'Java'])
+        self.assertEqual(len(talent['allocation']), 1)
+        self.assertEqual(talent['allocation'][0]['position_role']['name'], 'Role')
+        self.assertEqual(len(talent['kt_period_detail']), 1)
+        self.assertEqual(len(talent['leaves']), 1)
+        self.assertEqual(len(talent['requests']), 1)
+
+    @skipIf(np is None, 'numpy is not installed')
+    @patch('search.services.timezone')
+    def test_in_memory_scoring_matches_sql(self, mock):
+        mock.now.return_value = datetime.strptime('2023-01-01', '%Y-%m-%d')
+        talent_matrix.__init__()
+        service = SearchTalentService()
+        skill_ids = [self.skill1.id, self.skill2.id]
+        criteria = [
+            dict(start_date=datetime(2023, 1, 15).date(), end_date=datetime(2023, 2, 14).date(), utilization=70,
+                 experience_start=2, experience_end=5),
+            dict(start_date=None, end_date=None, utilization=None, experience_start=None, experience_end=None),
+        ]
+
+        for criterion in criteria:
+            talents = service.query_talents(None, skill_ids, None, None)
+            scored_talents = service.score_talents(talents, skill_ids=skill_ids, **criterion)
+            expected = [(talent.id, talent.score) for talent in scored_talents]
+            with override_settings(TALENT_SCORING_BACKEND=ScoringBackends.IN_MEMORY):
+                scored_talents = service.score_talents(talents, skill_ids=skill_ids, **criterion)
+            self.assertEqual(len(scored_talents), len(expected))
+            self.assertEqual([(talent.id, talent.score) for talent in scored_talents[0:len(expected)]], expected)
+
+    @skipIf(np is None, 'numpy is not installed')
+    @override_settings(TALENT_SCORING_BACKEND=ScoringBackends.IN_MEMORY)
+    def test_talent_matrix_sync(self):
+        talent_matrix.__init__()
+        proficiency = ProficiencyMapping.objects.get(user=self.user1, skill=self.skill1)
+
+        def rating():
+            return talent_matrix.ratings[talent_matrix.user_index[self.user1.id], talent_matrix.skill_index[
+                self.skill1.id]]
+
+        talent_matrix.sync([self.user1.id])
+        self.assertEqual(rating(), proficiency.rating)
+
+        # a write of another process committed after the sync with an earlier modified time
+        ProficiencyMapping.objects.filter(id=proficiency.id).update(rating=1)
+        User.objects.filter(id=self.user1.id).update(modified_time=talent_matrix.synced_at - timedelta(seconds=60))
+        talent_matrix.sync([self.user1.id])
+        self.assertEqual(rating(), 1)
+
+        # proficiency deletes of another process are seen through the modified time of the user
+        proficiency.delete()
+        talent_matrix.dirty_user_ids = set()
+        talent_matrix.sync([self.user1.id])
+        self.assertEqual(rating(), 0)
+
+        # the matrix is reloaded as a whole periodically
+        ProficiencyMapping.objects.create(user=self.user1, skill=self.skill1, rating=2)
+        talent_matrix.dirty_user_ids = set()
+        User.objects.filter(id=self.user1.id).update(modified_time=talent_matrix.synced_at - timedelta(days=1))
+        with override_settings(TALENT_MATRIX_RELOAD_SECONDS=0):
+            talent_matrix.sync([self.user1.id])
+        self.assertEqual(rating(), 2)
+
+        # users the candidate query finds after the sync are loaded when scored, missing ones score nothing
+        user = User.objects.create(employee_id=100, email='late@company.io', first_name='Foo', last_name='Late')
+        ProficiencyMapping.objects.create(user=user, skill=self.skill1, rating=4)
+        talent_matrix.dirty_user_ids = set()
+        skill_score, proficiency_score, _ = talent_matrix.score([user.id, 0], [self.skill1.id], None, None,
+                                                                datetime(2023, 1, 1).date())
+        self.assertEqual((list(skill_score), list(proficiency_score)), ([1.0, 0.0], [1.0, 0.0]))
+
     @patch('search.services.timezone')
     def test_quick_search_talent(self, mock):
         mock.now.return_value = datetime.strptime('2023-01-01', '%Y-%m-%d')
@@ -211,3 +426,78 @@ class SearchTalentTests(BaseTestCase):
         self.assertEqual(response.data[ResponseKeys.COUNT], 2)
         self.assertEqual(response.data[ResponseKeys.TALENTS][0]['work_location'], 'Bangalore')
         self.assertEqual(response.data[ResponseKeys.TALENTS][1]['work_location'], 'Bangalore')
+
+    def test_universal_search(self):
+        for index in range(UNIVERSAL_SEARCH_LIMIT + 2):
+            User.objects.create(employee_id=200 + index, email=f'junker{index}@company.io', first_name='Junker',
+                                last_name=f'Number{index}')
+        junk = User.objects.create(employee_id=300, email='junk@company.io', first_name='Junk', last_name='Bar')
+
+        self.client.force_authenticate(user=self.user)
+        url = reverse('v1:search:universal-search')
+        # permissions come from the cache, a single query for users, clients and projects
+        get_user_permission_names(self.user)
+        with self.assertNumQueries(1):
+            response = self.client.get(url, {'search': 'junk'})
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(response.data[ResponseKeys.USERS]), UNIVERSAL_SEARCH_LIMIT)
+        self.assertEqual(response.data[ResponseKeys.USERS][0], {'id': junk.id, 'name': 'Junk Bar'})
+        self.assertEqual(response.data[ResponseKeys.PROJECTS][0]['name'], 'Junk')
+        self.assertEqual(response.data[ResponseKeys.CLIENTS], [])
+
+    @override_settings(TALENT_SCORING_BACKEND=ScoringBackends.SQL)
+    @patch('search.services.timezone')
+    def test_staffing_plan(self, mock):
+        mock.now.return_value = datetime.strptime('2023-01-01', '%Y-%m-%d')
+
+        role, _ = Role.objects.get_or_create(name='Developer')
+        project = Project.objects.create(name='Staffed', status=Project.Status.SIGNED, city='Bangalore',
+                                         country='India', client=self.client_, start_date='2023-01-01')
+        project_role = ProjectRole.objects.create(project=project, role=role)
+        positions = []
+        for skills in ([self.skill1], [self.skill1, self.skill2], [self.skill2]):
+            position = ProjectPosition.objects.create(project_role=project_role, utilization=100,
+                                                      experience_range_start=2, experience_range_end=5,
+                                                      start_date='2023-02-01', end_date='2023-02-28')
+            for priority, skill in enumerate(skills):
+                ProjectPositionSkills.objects.create(position=position, skill=skill, priority=priority)
+            positions.append(position)
+
+        python_developer = User.objects.create(employee_id=21, email='dev1@company.io', first_name='Dev',
+                                               last_name='One', role=role, career_start_date='2019-07-15')
+        ProficiencyMapping.objects.create(user=python_developer, skill=self.skill1, rating=3)
+        full_stack_developer = User.objects.create(employee_id=22, email='dev2@company.io', first_name='Dev',
+                                                   last_name='Two', role=role, career_start_date='2019-07-15')
+        ProficiencyMapping.objects.create(user=full_stack_developer, skill=self.skill1, rating=4)
+        ProficiencyMapping.objects.create(user=full_stack_developer, skill=self.skill2, rating=4)
+        # fully allocated for the whole period, has no bandwidth left for the third position
+        java_developer = User.objects.create(employee_id=23, email='dev3@company.io', first_name='Dev',
+                                             last_name='Three', role=role, career_start_date='2019-07-15')
+        ProficiencyMapping.objects.create(user=java_developer, skill=self.skill2, rating=4)
+        ProjectAllocation.objects.create(user=java_developer, position=self.position1, utilization=100,
+                                         start_date='2023-01-01', end_date='2023-03-31')
+
+        self.client.force_authenticate(user=self.user)
+        url = reverse('v1:search:staffing-plan')
+        response = self.client.post(url, {'project': project.id}, format='json')
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        plan = {suggestion['position_id']: suggestion['talent'] for suggestion in response.data[ResponseKeys.POSITIONS]}
+        # the full stack developer is the better match for both positions, the plan still maximizes the total
+        self.assertEqual(plan[positions[0].id]['id'], python_developer.id)
+        self.assertEqual(plan[positions[1].id]['id'], full_stack_developer.id)
+        self.assertIsNone(plan[positions[2].id])
+
+        # suggested talents are scored the same as in talent search
+        service = SearchTalentService()
+        for position, talent in ((positions[0], python_developer), (positions[1], full_stack_developer)):
+            position.refresh_from_db()
+            skill_ids = list(position.skills.values_list('id', flat=True))
+            talents = service.score_talents(User.objects.filter(id=talent.id), position.start_date,
+                                            position.end_date, position.utilization, skill_ids,
+                                            position.experience_range_start, position.experience_range_end)
+            self.assertEqual(plan[position.id]['match_percent'], f'{talents[0].score}%')
+
+        response = self.client.post(url, {}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
@@ -1,11 +1,13 @@
 from django.urls import path
 
-from search.views import SearchTalentAPIView, QuickSearchTalentAPIView, UniversalSearchAPIView
+from search.views import SearchTalentAPIView, QuickSearchTalentAPIView, UniversalSearchAPIView, \
+    StaffingPlanAPIView
 
 urlpatterns = [
     path('talents/', SearchTalentAPIView.as_view(), name='search-talent'),
     path('quick-search/', QuickSearchTalentAPIView.as_view(), name='quick-search'),
-    path('universal-search/', UniversalSearchAPIView.as_view(), name='universal-search')
+    path('universal-search/', UniversalSearchAPIView.as_view(), name='universal-search'),
+    path('staffing-plan/', StaffingPlanAPIView.as_view(), name='staffing-plan')
 
 
 ]
@@ -6,12 +6,16 @@ from rest_framework.response import Response
 from rest_framework.views import APIView
 
 from authapp.permissions import APIPermission
+from project.models import ProjectPosition
+from helpers.exceptions import InvalidRequest
 from helpers.pagination import paginate
-from search.constants import ResponseKeys, PermissionKeys, RequestKeys, SerializerKeys
+from search.constants import ResponseKeys, PermissionKeys, RequestKeys, SerializerKeys, ErrorMessages, \
+    DEFAULT_POSITION_DAYS
 from search.serializers import SearchTalentRequestSerializer, SearchTalentResponseSerializer, \
     SearchTalentCriteriaSerializer, QuickSearchTalentCriteriaSerializer, UniversalSearchUserResponseSerializer, \
-    UniversalSearchClientResponseSerializer, UniversalSearchProjectResponseSerializer, QuickSearchRequestSerializer
-from search.services import SearchTalentService
+    UniversalSearchClientResponseSerializer, UniversalSearchProjectResponseSerializer, QuickSearchRequestSerializer, \
+    StaffingPlanRequestSerializer, StaffingPlanPositionSerializer
+from search.services import SearchTalentService, StaffingPlanService
 
 
 class SearchTalentAPIView(APIView):
@@ -38,26 +42,48 @@ class SearchTalentAPIView(APIView):
         locations = request_serializer.validated_data.get(RequestKeys.LOCATIONS)
 
         start_date = position.start_date
-        end_date = position.end_date or start_date + timedelta(days=89)
+        end_date = position.end_date or start_date + timedelta(days=DEFAULT_POSITION_DAYS - 1)
         skills = position.skills.all()
         skill_ids = list(skills.values_list('id', flat=True))
 
-        talents = service.query_talents(position.project_role.role, skill_ids, search, locations, related_suggestions)
-        talents = service.score_talents(
-            talents,
+        role = position.project_role.role
+        criteria = {RequestKeys.ROLE: role.id, RequestKeys.SKILLS: sorted(skill_ids), RequestKeys.SEARCH: search,
+                    RequestKeys.LOCATIONS: sorted(location.lower() for location in locations or []),
+                    RequestKeys.RELATED_SUGGESTIONS: related_suggestions, RequestKeys.START_DATE: start_date,
+                    RequestKeys.END_DATE: end_date, RequestKeys.UTILIZATION: position.utilization,
+                    RequestKeys.EXPERIENCE_RANGE_START: position.experience_range_start,
+                    RequestKeys.EXPERIENCE_RANGE_END: position.experience_range_end}
+
+        talents = service.query_talents(role, skill_ids, search, locations, related_suggestions)
+        talents = service.rank_talents(
+            criteria, talents,
             start_date=start_date, end_date=end_date, utilization=position.utilization, skill_ids=skill_ids,
             experience_start=position.experience_range_start, experience_end=position.experience_range_end
         )
-        paginated_talents = paginate(talents, page, size)
+        count = len(talents)
+        # a cursor, even a blank one, asks for keyset pages of the ranking
+        if RequestKeys.CURSOR in request_serializer.validated_data:
+            try:
+                paginated_talents, next_cursor = talents.page_after(
+                    request_serializer.validated_data[RequestKeys.CURSOR], size)
+            except ValueError:
+                raise InvalidRequest(ErrorMessages.INVALID_CURSOR)
+        else:
+            paginated_talents = paginate(talents, page, size, count)
+            next_cursor = None
+        talent_details = service.load_talent_details(paginated_talents, skills, response_date_start,
+                                                     response_date_end)
 
         criteria_response_serializer = SearchTalentCriteriaSerializer(position)
         talent_response_serializer = SearchTalentResponseSerializer(
             paginated_talents, many=True, context={SerializerKeys.SKILLS: skills,
                                                    SerializerKeys.RESPONSE_DATE_START: response_date_start,
-                                                   SerializerKeys.RESPONSE_DATE_END: response_date_end}
+                                                   SerializerKeys.RESPONSE_DATE_END: response_date_end,
+                                                   SerializerKeys.TALENT_DETAILS: talent_details}
         )
         response = {ResponseKeys.CRITERIA: criteria_response_serializer.data,
-                    ResponseKeys.TALENTS: talent_response_serializer.data, ResponseKeys.COUNT: len(talents)}
+                    ResponseKeys.TALENTS: talent_response_serializer.data, ResponseKeys.COUNT: count,
+                    ResponseKeys.NEXT_CURSOR: next_cursor}
 
         return Response(response, status=status.HTTP_200_OK)
 
@@ -90,17 +116,37 @@ class QuickSearchTalentAPIView(APIView):
         skill_ids = [skill.id for skill in skills]
         role = request_serializer.validated_data.get(RequestKeys.ROLE)
         role_id = role.id if role else None
+        utilization = request_serializer.validated_data.get(RequestKeys.UTILIZATION)
+        experience_start = request_serializer.validated_data.get(RequestKeys.EXPERIENCE_RANGE_START)
+        experience_end = request_serializer.validated_data.get(RequestKeys.EXPERIENCE_RANGE_END)
+        criteria = {RequestKeys.ROLE: role_id, RequestKeys.SKILLS: sorted(skill_ids), RequestKeys.SEARCH: search,
+                    RequestKeys.LOCATIONS: sorted(location.lower() for location in locations or []),
+                    RequestKeys.PROJECTS: sorted(project.id for project in projects or []),
+                    RequestKeys.RELATED_SUGGESTIONS: related_suggestions, RequestKeys.START_DATE: start_date,
+                    RequestKeys.END_DATE: end_date, RequestKeys.UTILIZATION: utilization,
+                    RequestKeys.EXPERIENCE_RANGE_START: experience_start,
+                    RequestKeys.EXPERIENCE_RANGE_END: experience_end}
+
         talents = service.query_talents(role_id, skill_ids, search, locations, related_suggestions, projects)
-        talents = service.score_talents(
-            talents,
-            start_date=start_date, end_date=end_date,
-            utilization=request_serializer.validated_data.get(RequestKeys.UTILIZATION),
-            skill_ids=skill_ids,
-            experience_start=request_serializer.validated_data.get(RequestKeys.EXPERIENCE_RANGE_START),
-            experience_end=request_serializer.validated_data.get(RequestKeys.EXPERIENCE_RANGE_END)
+        talents = service.rank_talents(
+            criteria, talents,
+            start_date=start_date, end_date=end_date, utilization=utilization, skill_ids=skill_ids,
+            experience_start=experience_start, experience_end=experience_end
         )
-
-        paginated_talents = paginate(talents, page, size)
+        count = len(talents)
+
+        # a cursor, even a blank one, asks for keyset pages of the ranking
+        if RequestKeys.CURSOR in request_serializer.validated_data:
+            try:
+                paginated_talents, next_cursor = talents.page_after(
+                    request_serializer.validated_data[RequestKeys.CURSOR], size)
+            except ValueError:
+                raise InvalidRequest(ErrorMessages.INVALID_CURSOR)
+        else:
+            paginated_talents = paginate(talents, page, size, count)
+            next_cursor = None
+        talent_details = service.load_talent_details(paginated_talents, skills, response_date_start,
+                                                     response_date_end)
 
         criteria_response_serializer = QuickSearchTalentCriteriaSerializer(request_serializer.validated_data)
         talent_response_serializer = SearchTalentResponseSerializer(
@@ -109,10 +155,12 @@ class QuickSearchTalentAPIView(APIView):
             context={SerializerKeys.SKILLS: skills,
                      SerializerKeys.RESPONSE_DATE_START: response_date_start,
                      SerializerKeys.RESPONSE_DATE_END: response_date_end,
-                     SerializerKeys.PROJECTS: projects}
+                     SerializerKeys.PROJECTS: projects,
+                     SerializerKeys.TALENT_DETAILS: talent_details}
         )
         response = {ResponseKeys.CRITERIA: criteria_response_serializer.data,
-                    ResponseKeys.TALENTS: talent_response_serializer.data, ResponseKeys.COUNT: len(talents)}
+                    ResponseKeys.TALENTS: talent_response_serializer.data, ResponseKeys.COUNT: count,
+                    ResponseKeys.NEXT_CURSOR: next_cursor}
         return Response(response, status=status.HTTP_200_OK)
 
 
@@ -131,15 +179,39 @@ class UniversalSearchAPIView(APIView):
         request_serializer.is_valid(raise_exception=True)
 
         search = request_serializer.validated_data.get(RequestKeys.SEARCH)
-        user_date = service.query_users(search)
-        client_date = service.query_client(search)
-        project_date = service.query_project(search)
+        results = service.query_universal(search)
 
-        user_response = UniversalSearchUserResponseSerializer(user_date, many=True)
-        client_response = UniversalSearchClientResponseSerializer(client_date, many=True)
-        project_response = UniversalSearchProjectResponseSerializer(project_date, many=True)
+        user_response = UniversalSearchUserResponseSerializer(results[ResponseKeys.USERS], many=True)
+        client_response = UniversalSearchClientResponseSerializer(results[ResponseKeys.CLIENTS], many=True)
+        project_response = UniversalSearchProjectResponseSerializer(results[ResponseKeys.PROJECTS], many=True)
         response = {ResponseKeys.USERS: user_response.data,
                     ResponseKeys.CLIENTS: client_response.data,
                     ResponseKeys.PROJECTS: project_response.data}
 
         return Response(response, status=status.HTTP_200_OK)
+
+
+class StaffingPlanAPIView(APIView):
+    permission_classes = [APIPermission]
+    permissions = PermissionKeys.SEARCH_TALENT_PERMISSIONS
+
+    @swagger_auto_schema(request_body=StaffingPlanRequestSerializer(),
+                         responses={status.HTTP_200_OK: StaffingPlanPositionSerializer(many=True)})
+    def post(self, request):
+        """
+        API to suggest talents for all open positions of a project, or for the given positions, in one go.
+        """
+        service = StaffingPlanService()
+        request_serializer = StaffingPlanRequestSerializer(data=request.data)
+        request_serializer.is_valid(raise_exception=True)
+
+        project = request_serializer.validated_data.get(RequestKeys.PROJECT)
+        positions = request_serializer.validated_data.get(RequestKeys.POSITIONS)
+        if positions:
+            positions = ProjectPosition.objects.filter(id__in=[position.id for position in positions])
+        else:
+            positions = service.get_open_positions(project)
+
+        plan = service.plan(positions)
+        response = {ResponseKeys.POSITIONS: StaffingPlanPositionSerializer(plan, many=True).data}
+        return Response(response, status=status.HTTP_200_OK)
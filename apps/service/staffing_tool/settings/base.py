@@ -23,6 +23,11 @@ GOOGLE_CLIENT_ID = os.getenv('GOOGLE_CLIENT_ID')
 GOOGLE_CLIENT_SECRET = os.getenv('GOOGLE_CLIENT_SECRET')
 JWT_SIGNING_KEY = os.getenv('JWT_SIGNING_KEY')
 ASSET_MODULE_FEATURE_FLAG = os.environ.get('ASSET_MODULE_FEATURE_FLAG')
+# 'sql' or 'in_memory' (needs numpy)
+TALENT_SCORING_BACKEND = os.environ.get('TALENT_SCORING_BACKEND', 'sql')
+# users modified this long before the last in memory matrix sync are reloaded too, for transactions committing late
+TALENT_MATRIX_SYNC_LAG_SECONDS = int(os.environ.get('TALENT_MATRIX_SYNC_LAG_SECONDS', 300))
+TALENT_MATRIX_RELOAD_SECONDS = int(os.environ.get('TALENT_MATRIX_RELOAD_SECONDS', 3600))
 
 # Application definition
 
@@ -32,6 +37,7 @@ INSTALLED_APPS = [
     'django.contrib.sessions',
     'django.contrib.messages',
     'django.contrib.staticfiles',
+    'django.contrib.postgres',
     'django_extensions',
     'rest_framework',
     'rest_framework_simplejwt',
@@ -91,6 +97,32 @@ DATABASES = {
     }
 }
 
+# Cache
+# https://docs.djangoproject.com/en/4.1/topics/cache/
+# cached values are invalidated on writes, which only reaches every worker through a cache they all share. The
+# database cache (table created by `createcachetable`) is the default, Redis or memcached can be configured instead.
+
+CACHE_BACKEND = os.environ.get('CACHE_BACKEND', 'django.core.cache.backends.db.DatabaseCache')
+CACHES = {
+    'default': {
+        'BACKEND': CACHE_BACKEND,
+        'LOCATION': os.environ.get('CACHE_LOCATION', 'cache_table'),
+    }
+}
+
+# a process local cache keeps serving values other workers invalidated, nothing is cached with one
+SHARED_CACHE = CACHE_BACKEND not in ('django.core.cache.backends.locmem.LocMemCache',
+                                     'django.core.cache.backends.dummy.DummyCache')
+
+# seconds a scored talent search ordering is reused for, as long as no talent data changes
+SEARCH_CACHE_TIMEOUT = int(os.environ.get('SEARCH_CACHE_TIMEOUT', 60)) if SHARED_CACHE else 0
+
+# seconds permissions of users are cached for, assigning or revoking permissions invalidates them right away
+PERMISSION_CACHE_TIMEOUT = int(os.environ.get('PERMISSION_CACHE_TIMEOUT', 3600)) if SHARED_CACHE else 0
+
+# notification streams a worker process serves at once, each holds one of its threads for the length of the stream
+NOTIFICATION_MAX_STREAMS = int(os.environ.get('NOTIFICATION_MAX_STREAMS', 4))
+
 # Internationalization
 # https://docs.djangoproject.com/en/4.1/topics/i18n/
 
@@ -118,6 +150,10 @@ DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
 AUTH_USER_MODEL = 'user.User'
 
+AUTHENTICATION_BACKENDS = ['authapp.backends.CachedPermissionBackend']
+
+TEST_RUNNER = 'helpers.test_runner.TestRunner'
+
 # Rest framework settings
 # https://www.django-rest-framework.org/api-guide/settings/
 
@@ -29,6 +29,10 @@ class PermissionKeys:
         GET: ['user.view_proficiencymapping', 'user.view_industry_mapping']
     }
 
+    BULK_PROFICIENCY_PERMISSION = {
+        PUT: ['user.add_proficiencymapping', 'user.change_proficiencymapping']
+    }
+
     USER_FORM_RELATED_PERMISSION = {
         POST: ['edit_form.can_change_form_related_permissions']
     }
@@ -52,6 +56,7 @@ class ResponseKeys:
     USER = 'user'
     GROUPS = 'groups'
     COUNT = 'count'
+    NEXT_CURSOR = 'next_cursor'
     PROJECTS = 'projects'
     PROJECT_NAME = 'project_name'
     FULL_NAME = 'full_name'
@@ -72,6 +77,7 @@ class ResponseKeys:
 class RequestKeys:
     PAGE = 'page'
     SIZE = 'size'
+    CURSOR = 'cursor'
     SEARCH = 'search'
     RESPONSE_DATE_START = 'response_date_start'
     RESPONSE_DATE_END = 'response_date_end'
@@ -113,6 +119,7 @@ class StatusKeys:
 
 
 class CurrentStatusKeys:
+    CLOSED = 'Closed'
     SERVING_NP = 'Serving NP'
     FULLY_ALLOCATED = 'Fully_Allocated'
     CAFE = 'Cafe'
@@ -122,6 +129,28 @@ class CurrentStatusKeys:
     PATERNITY_BREAK = 'Paternity Break'
 
 
+class LeaveTypeKeys:
+    MATERNITY_LEAVE = 'Maternity Leave'
+    ADOPTION_LEAVE = 'Adoption Leave'
+    SABBATICAL_LEAVE = 'Sabbatical Leave'
+    PATERNITY_LEAVE = 'Paternity Leave'
+
+
+# users on these leaves are on a break instead of being in cafe
+LEAVE_BREAK_STATUSES = {
+    LeaveTypeKeys.MATERNITY_LEAVE: CurrentStatusKeys.MATERNITY_BREAK,
+    LeaveTypeKeys.ADOPTION_LEAVE: CurrentStatusKeys.ADOPTION_LEAVE,
+    LeaveTypeKeys.SABBATICAL_LEAVE: CurrentStatusKeys.SABBATICAL,
+    LeaveTypeKeys.PATERNITY_LEAVE: CurrentStatusKeys.PATERNITY_BREAK,
+}
+
+
+class LeaveStatusKeys:
+    APPROVED = 'Approved'
+    CANCELLED = 'Cancelled'
+    REJECTED = 'Rejected'
+
+
 class FunctionKeys:
     DELIVERY = 'Delivery'
     SUPPORT = 'Support'
@@ -133,6 +162,7 @@ class ErrorMessages:
     USER_DOES_NOT_EXIST = 'User does not exist'
     INVALID_PARAMETER = "Invalid Parameter value for show management"
     INVALID_GROUP_ID = "Invalid Group ID"
+    INVALID_CURSOR = 'Invalid cursor'
 
 
 class SuccessMessages:
@@ -142,6 +172,11 @@ class SuccessMessages:
 class ValueConstants:
     MINIMUM_CAFE_UTILIZATION = 0
     MAXIMUM_CAFE_UTILIZATION = 30
+    MAXIMUM_UTILIZATION = 100
+    # days written per statement when taking utilization snapshots
+    SNAPSHOT_BATCH_DAYS = 31
+    # users summarized per batch by the daily utilization summary rollover
+    SUMMARY_BATCH_SIZE = 1000
 
 
 class EmployeeTypeValues:
@@ -0,0 +1,23 @@
+import datetime
+
+from django.core.management.base import BaseCommand, CommandError
+
+from user.services import UserUtilizationSnapshotService
+
+
+class Command(BaseCommand):
+    help = 'Write the daily utilization facts of all users for a past period, days written before are replaced'
+
+    def add_arguments(self, parser):
+        parser.add_argument('start_date', type=datetime.date.fromisoformat)
+        parser.add_argument('end_date', type=datetime.date.fromisoformat, nargs='?',
+                            help='Defaults to yesterday')
+
+    def handle(self, *args, **options):
+        start_date = options['start_date']
+        end_date = options['end_date'] or datetime.date.today() - datetime.timedelta(days=1)
+        if start_date > end_date:
+            raise CommandError('Start date is after end date')
+        print(f'backfilling user utilization from {start_date} to {end_date}')
+        count = UserUtilizationSnapshotService().snapshot(start_date, end_date)
+        print(f'done, wrote {count} rows')
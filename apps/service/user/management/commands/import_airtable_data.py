@@ -2,9 +2,12 @@ import os
 
 import requests
 from django.core.management.base import BaseCommand
+from django.utils import timezone
 
-from common.models import Industry, Skill
-from user.models import User, ProficiencyMapping, Role
+from common.models import Industry
+from search.cache import bump_data_version
+from user.models import User, Role
+from user.services import UserService
 
 
 class Command(BaseCommand):
@@ -106,18 +109,22 @@ class Command(BaseCommand):
 
     def set_proficiency(self, view):
         view = None
-        proficiencies_data = self.get_data(self.PROFICIENCY_MAPPING_URL, view)
-        for proficiency_data in proficiencies_data:
-            proficiency_data = proficiency_data['fields']
-            employee_id = proficiency_data.pop('Employee ID (from Status)', None)
-            if not employee_id:
-                continue
-            user = User.objects.filter(employee_id=employee_id[0]).first()
-            if not user:
+        proficiencies_data = [proficiency_data['fields']
+                              for proficiency_data in self.get_data(self.PROFICIENCY_MAPPING_URL, view)]
+        # the employee ID is a linked record, a list holding the ID
+        employee_ids = [proficiency_data.pop('Employee ID (from Status)', None)
+                        for proficiency_data in proficiencies_data]
+        employee_ids = [str(employee_id[0]) if employee_id else None for employee_id in employee_ids]
+        user_ids = dict(User.objects.filter(employee_id__in=list(filter(None, employee_ids)))
+                        .values_list('employee_id', 'id'))
+        skills_by_user = {}
+        for employee_id, proficiency_data in zip(employee_ids, proficiencies_data):
+            if employee_id not in user_ids:
                 continue
-            for skill_name, rating in proficiency_data.items():
-                skill = Skill.objects.filter(name=skill_name.strip()).first()
-                if not skill:
-                    continue
-                ProficiencyMapping.objects.update_or_create(user=user, skill=skill,
-                                                            defaults={'rating': int(float((rating.strip())))})
+            skills_by_user[user_ids[employee_id]] = [
+                {'skill_name': skill_name, 'rating': int(float((rating.strip())))}
+                for skill_name, rating in proficiency_data.items()]
+        # ratings of skills missing from the sheet are kept
+        UserService().set_proficiencies(skills_by_user, replace=False)
+        User.objects.filter(id__in=skills_by_user).update(modified_time=timezone.now())
+        bump_data_version()
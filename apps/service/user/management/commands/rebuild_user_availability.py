@@ -0,0 +1,15 @@
+from django.core.management.base import BaseCommand
+
+from user.services import UserAvailabilityService
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the availability calendar of all users from their allocations and leaves'
+
+    def __init__(self):
+        super().__init__()
+
+    def handle(self, *args, **kwargs):
+        print('rebuilding user availability')
+        count = UserAvailabilityService().rebuild()
+        print(f'done, refreshed {count} users')
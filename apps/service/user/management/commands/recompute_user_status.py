@@ -0,0 +1,18 @@
+from django.core.management.base import BaseCommand
+
+from user.services import recompute_user_status, UserUtilizationSummaryService
+
+
+class Command(BaseCommand):
+    help = 'Recompute the current status of all users from their allocations, leaves and last working day and bring ' \
+           'their utilization summaries to today'
+
+    def __init__(self):
+        super().__init__()
+
+    def handle(self, *args, **kwargs):
+        print('recomputing user status')
+        user_ids = recompute_user_status()
+        # the summaries depend on the day, this is the daily job bringing them to today
+        UserUtilizationSummaryService().rollover()
+        print(f'done, updated {len(user_ids)} users')
@@ -0,0 +1,15 @@
+from django.core.management.base import BaseCommand
+
+from user.services import UserUtilizationSummaryService
+
+
+class Command(BaseCommand):
+    help = 'Bring the utilization summaries of all users to today, run daily as they depend on the day'
+
+    def __init__(self):
+        super().__init__()
+
+    def handle(self, *args, **kwargs):
+        print('rolling over user utilization summaries')
+        count = UserUtilizationSummaryService().rollover()
+        print(f'done, summarized {count} users')
@@ -0,0 +1,15 @@
+from django.core.management.base import BaseCommand
+
+from user.services import UserUtilizationSnapshotService
+
+
+class Command(BaseCommand):
+    help = 'Write the daily utilization facts of all users for the days since the last run up to today'
+
+    def __init__(self):
+        super().__init__()
+
+    def handle(self, *args, **kwargs):
+        print('taking user utilization snapshots')
+        count = UserUtilizationSnapshotService().snapshot_since_last()
+        print(f'done, wrote {count} rows')
@@ -0,0 +1,33 @@
+# Generated by Django 4.1.3 on 2026-10-18 17:10
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('user', '0015_alter_user_options'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='UserAvailability',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('start_date', models.DateField()),
+                ('end_date', models.DateField(null=True)),
+                ('utilization', models.IntegerField(default=0)),
+                ('on_leave', models.BooleanField(default=False)),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='availability', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'db_table': 'user_availability',
+            },
+        ),
+        migrations.AddIndex(
+            model_name='useravailability',
+            index=models.Index(fields=['user', 'start_date'], name='user_availability_user_start'),
+        ),
+    ]
@@ -0,0 +1,19 @@
+# Generated by Django 4.1.3 on 2026-10-18 17:13
+
+import django.contrib.postgres.indexes
+from django.db import migrations, models
+import utils.utilization
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('user', '0016_user_availability'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='leaveplans',
+            index=django.contrib.postgres.indexes.GistIndex(utils.utilization.DateRange('from_date', 'to_date'), condition=models.Q(('to_date__gte', models.F('from_date'))), name='leave_plans_period'),
+        ),
+    ]
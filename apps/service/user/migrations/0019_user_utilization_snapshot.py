@@ -0,0 +1,39 @@
+# Generated by Django 4.1.3 on 2026-10-18 18:02
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('user', '0018_trigram_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='UserUtilizationSnapshot',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField()),
+                ('billable_utilization', models.IntegerField(default=0)),
+                ('non_billable_utilization', models.IntegerField(default=0)),
+                ('tentative_utilization', models.IntegerField(default=0)),
+                ('on_leave', models.BooleanField(default=False)),
+                ('status', models.CharField(max_length=50, null=True)),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='utilization_snapshots', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'db_table': 'user_utilization_snapshot',
+            },
+        ),
+        migrations.AddIndex(
+            model_name='userutilizationsnapshot',
+            index=models.Index(fields=['date', 'user'], name='user_utilization_snapshot_date'),
+        ),
+        migrations.AddConstraint(
+            model_name='userutilizationsnapshot',
+            constraint=models.UniqueConstraint(fields=('user', 'date'), name='user_utilization_snapshot_user_date'),
+        ),
+    ]
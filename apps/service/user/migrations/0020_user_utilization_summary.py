@@ -0,0 +1,37 @@
+# Generated by Django 4.1.3 on 2026-10-18 18:09
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('user', '0019_user_utilization_snapshot'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='UserUtilizationSummary',
+            fields=[
+                ('user', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='utilization_summary', serialize=False, to=settings.AUTH_USER_MODEL)),
+                ('utilization', models.IntegerField(default=0)),
+                ('billable_utilization', models.IntegerField(default=0)),
+                ('next_free_date', models.DateField(null=True)),
+                ('next_allocation_end', models.DateField(null=True)),
+                ('summary_date', models.DateField()),
+            ],
+            options={
+                'db_table': 'user_utilization_summary',
+            },
+        ),
+        migrations.AddIndex(
+            model_name='userutilizationsummary',
+            index=models.Index(fields=['utilization'], name='user_utilization_summary_util'),
+        ),
+        migrations.AddIndex(
+            model_name='userutilizationsummary',
+            index=models.Index(fields=['summary_date'], name='user_utilization_summary_date'),
+        ),
+    ]
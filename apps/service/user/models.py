@@ -1,11 +1,26 @@
 from django.contrib.auth.models import AbstractBaseUser, PermissionsMixin
+from django.contrib.postgres.indexes import GinIndex, GistIndex, OpClass
 from django.db import models
+from django.db.models.functions import Upper
 from django.utils import timezone
 from utils.utils import months_difference
 import re
 from django.utils.functional import cached_property
 from user.managers import UserManager
 from common.models import Industry, Skill
+from utils.utilization import DateRange
+
+
+class FullName(models.Func):
+    """
+    `first_name last_name` of a user, unlike `Concat` the `||` operator is immutable and can back an index.
+    """
+    template = '(%(expressions)s)'
+    arg_joiner = " || ' ' || "
+    output_field = models.CharField()
+
+    def __init__(self, first_name='first_name', last_name='last_name', **extra):
+        super().__init__(first_name, last_name, **extra)
 
 
 class Role(models.Model):
@@ -49,6 +64,7 @@ class User(AbstractBaseUser, PermissionsMixin):
 
     class Meta:
         db_table = 'users'
+        indexes = [GinIndex(OpClass(Upper(FullName()), name='gin_trgm_ops'), name='users_full_name_trgm')]
         permissions = [('login', 'Can login'), ('search_talent', 'Can search talent'),
                        ('view_last_working_day', 'Can view last working day'),
                        ('generate_jwt_token', 'Can generate JWT token')]
@@ -162,6 +178,8 @@ class LeavePlans(models.Model):
 
     class Meta:
         db_table = 'leave_plans'
+        indexes = [GistIndex(DateRange('from_date', 'to_date'), name='leave_plans_period',
+                             condition=models.Q(to_date__gte=models.F('from_date')))]
 
 
 class ProficiencyMapping(models.Model):
@@ -172,3 +190,65 @@ class ProficiencyMapping(models.Model):
     class Meta:
         db_table = 'proficiency_mapping'
         unique_together = ('skill', 'user')
+
+
+class UserAvailability(models.Model):
+    """
+    Precomputed availability calendar of a user.
+
+    Each row is a maximal interval in which the user's committed utilization (non tentative allocations) and
+    leave status stay constant. Only intervals where the user is utilized or on leave are stored, a null end date
+    denotes an interval that is open ended.
+    """
+    user = models.ForeignKey(User, related_name='availability', on_delete=models.CASCADE)
+    start_date = models.DateField()
+    end_date = models.DateField(null=True)
+    utilization = models.IntegerField(default=0)
+    on_leave = models.BooleanField(default=False)
+
+    class Meta:
+        db_table = 'user_availability'
+        indexes = [models.Index(fields=['user', 'start_date'], name='user_availability_user_start')]
+
+
+class UserUtilizationSnapshot(models.Model):
+    """
+    Daily fact of how much a user was allocated, one row per user and day the user was employed.
+
+    Billable and non billable utilization cover all allocations of the day, tentative utilization is the part of
+    them that is tentative. Status is the current status of the user on the day, it is null for days written after
+    the fact as past statuses are not recorded.
+    """
+    user = models.ForeignKey(User, related_name='utilization_snapshots', on_delete=models.CASCADE)
+    date = models.DateField()
+    billable_utilization = models.IntegerField(default=0)
+    non_billable_utilization = models.IntegerField(default=0)
+    tentative_utilization = models.IntegerField(default=0)
+    on_leave = models.BooleanField(default=False)
+    status = models.CharField(max_length=50, null=True)
+
+    class Meta:
+        db_table = 'user_utilization_snapshot'
+        constraints = [models.UniqueConstraint(fields=['user', 'date'], name='user_utilization_snapshot_user_date')]
+        indexes = [models.Index(fields=['date', 'user'], name='user_utilization_snapshot_date')]
+
+
+class UserUtilizationSummary(models.Model):
+    """
+    Utilization of a user on the summary date, kept up to date on allocation writes and rolled over to the next day
+    by a daily job. Utilization covers all allocations of the day, tentative ones included.
+
+    The next free date is the first day from the summary date on without any allocation, it is null when an open
+    ended allocation keeps the user allocated.
+    """
+    user = models.OneToOneField(User, related_name='utilization_summary', on_delete=models.CASCADE, primary_key=True)
+    utilization = models.IntegerField(default=0)
+    billable_utilization = models.IntegerField(default=0)
+    next_free_date = models.DateField(null=True)
+    next_allocation_end = models.DateField(null=True)
+    summary_date = models.DateField()
+
+    class Meta:
+        db_table = 'user_utilization_summary'
+        indexes = [models.Index(fields=['utilization'], name='user_utilization_summary_util'),
+                   models.Index(fields=['summary_date'], name='user_utilization_summary_date')]
@@ -1,5 +1,4 @@
 import datetime
-from itertools import chain
 
 from rest_framework import serializers
 from django.db.models import Q, Sum, Value, IntegerField
@@ -7,6 +6,7 @@ from django.db.models.functions import Coalesce
 
 from common.models import Skill, Industry
 from common.serializers import IndustrySerializer
+from helpers.pagination import CursorField
 from project.models import ProjectAllocation, ProjectAllocationRequest, Project
 from user.constants import DEFAULT_PAGE_NUMBER, DEFAULT_PAGE_SIZE, PermissionKeys, SerializerKeys
 from user.models import User, Role, ProficiencyMapping, LeavePlans
@@ -122,6 +122,7 @@ class ListUserRequestSerializer(serializers.Serializer):
     sort_by = serializers.CharField(required=False, allow_null=False)
     page = serializers.IntegerField(default=DEFAULT_PAGE_NUMBER)
     size = serializers.IntegerField(default=DEFAULT_PAGE_SIZE)
+    cursor = CursorField()
     experience_range_start = serializers.IntegerField(allow_null=True, required=False)
     experience_range_end = serializers.IntegerField(allow_null=True, required=False)
     response_date_start = serializers.DateField(required=False, allow_null=True)
@@ -144,78 +145,21 @@ class ListUserRequestSerializer(serializers.Serializer):
 
 
 class ListUserResponseSerializer(serializers.ModelSerializer):
-    skills = serializers.SerializerMethodField()
+    """
+    Serializes users loaded by UserService.load_list_details, the nested serializers read the skills, allocations,
+    requests and leaves it attached instead of querying them.
+    """
+    skills = ProficiencySerializer(source='list_skills', many=True)
     role = RoleSerializer()
     projects = serializers.SerializerMethodField()
-    leave_plans = serializers.SerializerMethodField()
-    is_over_utilized = serializers.SerializerMethodField()
-    requests = serializers.SerializerMethodField()
-    total_utilized = serializers.SerializerMethodField()
-
-    def get_skills(self, instance):
-        skills = self.context.get(SerializerKeys.SKILLS)
-        proficiency_mapping = ProficiencyMapping.objects.filter(user=instance).order_by('-rating').exclude(rating=0)
-        if skills:
-            proficiency_mapping = ProficiencyMapping.objects.filter(user=instance, skill__in=skills).order_by(
-                '-rating').exclude(rating=0)
-            proficiency_mapping = chain(proficiency_mapping,
-                                        ProficiencyMapping.objects.filter(user=instance).order_by('-rating')
-                                        .exclude(Q(skill__in=skills) | Q(rating=0)))
-        return ProficiencySerializer(proficiency_mapping, many=True).data
+    leave_plans = LeavesSerializer(source='list_leave_plans', many=True)
+    is_over_utilized = serializers.BooleanField()
+    requests = TalentAllocationResponseSerializer(source='list_requests', many=True)
+    total_utilized = serializers.IntegerField()
 
     def get_projects(self, instance):
-        response_date_start = self.context.get(SerializerKeys.RESPONSE_DATE_START)
-        response_date_end = self.context.get(SerializerKeys.RESPONSE_DATE_END)
         projects = self.context.get('projects')
-
-        allocations = ProjectAllocation.objects.filter(user=instance)
-        if response_date_start:
-            allocations = allocations.filter(Q(end_date__gte=response_date_start) | Q(end_date__isnull=True))
-        if response_date_end:
-            allocations = allocations.filter(start_date__lte=response_date_end)
-
-        return UsersProjectSerializer(allocations, many=True, context={'projects': projects}).data
-
-    def get_requests(self, instance):
-        project_allocation_request = ProjectAllocationRequest.objects.filter(
-            Q(status=ProjectAllocationRequest.Status.PENDING),
-            Q(user=instance))
-        return TalentAllocationResponseSerializer(project_allocation_request, many=True).data
-
-    def get_leave_plans(self, instance):
-        response_date_start = self.context.get(SerializerKeys.RESPONSE_DATE_START)
-        response_date_end = self.context.get(SerializerKeys.RESPONSE_DATE_END)
-
-        leaves = LeavePlans.objects.filter(user=instance, approval_status='Approved')
-        if response_date_start:
-            leaves = leaves.filter(to_date__gte=response_date_start)
-        if response_date_end:
-            leaves = leaves.filter(from_date__lte=response_date_end)
-
-        return LeavesSerializer(leaves, many=True).data
-
-    def get_is_over_utilized(self, instance):
-        response_date_start = self.context.get(SerializerKeys.RESPONSE_DATE_START)
-        response_date_end = self.context.get(SerializerKeys.RESPONSE_DATE_END)
-
-        allocations = ProjectAllocation.objects.filter(user=instance,
-                                                       start_date__lte=datetime.date.today(),
-                                                       end_date__gte=datetime.date.today())
-        if response_date_start:
-            allocations = allocations.filter(Q(end_date__gte=response_date_start) | Q(end_date__isnull=True))
-        if response_date_end:
-            allocations = allocations.filter(start_date__lte=response_date_end)
-        utilization = allocations.aggregate(Sum(SerializerKeys.UTILIZATION))[SerializerKeys.UTILIZATION_SUM]
-        if utilization:
-            return utilization > 100
-        return False
-
-    def get_total_utilized(self, instance):
-        allocations = ProjectAllocation.objects.filter(Q(user=instance),
-                                                       Q(start_date__lte=datetime.date.today()),
-                                                       (Q(end_date__gte=datetime.date.today()) | Q(end_date=None)))
-        utilization = allocations.aggregate(Sum(SerializerKeys.UTILIZATION))[SerializerKeys.UTILIZATION_SUM]
-        return utilization if utilization else 0
+        return UsersProjectSerializer(instance.list_projects, many=True, context={'projects': projects}).data
 
     class Meta:
         model = User
@@ -384,6 +328,15 @@ class EditMultipleUserGroupRequestSerializer(serializers.Serializer):
         return {camel_to_snake(attr): value for attr, value in data.items()}
 
 
+class EditMultipleUserProficiencyRequestSerializer(serializers.Serializer):
+    user_id = serializers.IntegerField()
+    skills = UserProficiencySerializer(many=True)
+
+    def to_internal_value(self, data):
+        data = super().to_internal_value(data)
+        return {camel_to_snake(attr): value for attr, value in data.items()}
+
+
 class ListGroupSerializer(serializers.Serializer):
     id = serializers.IntegerField()
     name = serializers.CharField()
@@ -1,11 +1,12 @@
+from collections import defaultdict
 from datetime import datetime, date, timedelta
 
 from django.contrib.auth.models import Group, Permission
 from django.contrib.contenttypes.models import ContentType
-from django.db import transaction
-from django.db.models import Case, When, Value, CharField, BooleanField
-from django.db.models import Sum, F, Q
-from django.db.models.functions import Concat, Lower
+from django.db import transaction, connection
+from django.db.models import Case, When, Value, CharField
+from django.db.models import F, Q, Sum
+from django.db.models.functions import Coalesce, Concat, Lower
 from django.db.models.expressions import RawSQL
 from django.utils import timezone
 
@@ -13,11 +14,15 @@ from authapp.constants import RoleKeys
 from authapp.permissions import assign_permissions, revoke_permissions
 from common.models import Skill
 from helpers.exceptions import InvalidRequest
-from project.constants import SerializerKeys
-from project.models import ProjectAllocation
-from user.constants import RequestKeys, ErrorMessages, ValueConstants
+from project.models import ProjectAllocation, ProjectAllocationRequest, ProjectAllocationHistory
+from search.cache import bump_data_version
+from user.constants import RequestKeys, ErrorMessages, ValueConstants, LeaveStatusKeys, StatusKeys, CurrentStatusKeys, \
+    LEAVE_BREAK_STATUSES
 from user.filter import UserFilter, UserManagementFilter
-from user.models import Role, User, ProficiencyMapping
+from user.models import Role, User, ProficiencyMapping, UserAvailability, UserUtilizationSnapshot, LeavePlans, \
+    UserUtilizationSummary
+from utils.utilization import utilization_segments, covered_days, ALLOCATION_PERIOD, LEAVE_PERIOD, \
+    VALID_ALLOCATION_PERIOD, VALID_LEAVE_PERIOD
 
 
 class UserRoleService:
@@ -38,6 +43,61 @@ class UserService:
         users = UserFilter(filters, users).qs
         return users
 
+    def load_list_details(self, users, skills=None, response_date_start=None, response_date_end=None):
+        """
+        Method to load the skills, allocations, pending requests and leaves of a page of users for
+        ListUserResponseSerializer. They are loaded in bulk and attached to the users, so the number of queries
+        does not depend on the size of the page.
+        """
+        users = {user.id: user for user in users}
+        proficiencies = ProficiencyMapping.objects.filter(user_id__in=users).exclude(rating=0) \
+            .select_related('skill').order_by('user_id', '-rating', 'id')
+        allocations = ProjectAllocation.objects.filter(user_id__in=users) \
+            .select_related('position__project_role__project').order_by('id')
+        allocation_requests = ProjectAllocationRequest.objects.filter(
+            user_id__in=users, status=ProjectAllocationRequest.Status.PENDING) \
+            .select_related('position__project_role__project').order_by('id')
+        leaves = LeavePlans.objects.filter(user_id__in=users, approval_status=LeaveStatusKeys.APPROVED).order_by('id')
+        if response_date_start:
+            leaves = leaves.filter(to_date__gte=response_date_start)
+        if response_date_end:
+            leaves = leaves.filter(from_date__lte=response_date_end)
+
+        for user in users.values():
+            user.list_skills = []
+            user.list_projects = []
+            user.list_requests = []
+            user.list_leave_plans = []
+            user.total_utilized = 0
+            user.is_over_utilized = False
+
+        # skills asked for come first, each group ordered by rating
+        skill_ids = {skill.id for skill in skills or []}
+        for proficiency in sorted(proficiencies, key=lambda proficiency: proficiency.skill_id not in skill_ids):
+            users[proficiency.user_id].list_skills.append(proficiency)
+
+        today = date.today()
+        current_utilization = defaultdict(int)
+        for allocation in allocations:
+            user = users[allocation.user_id]
+            if allocation.start_date <= today and (allocation.end_date is None or allocation.end_date >= today):
+                user.total_utilized += allocation.utilization
+            if response_date_start and allocation.end_date and allocation.end_date < response_date_start:
+                continue
+            if response_date_end and allocation.start_date > response_date_end:
+                continue
+            user.list_projects.append(allocation)
+            # open ended allocations are not counted towards over utilization
+            if allocation.end_date and allocation.start_date <= today <= allocation.end_date:
+                current_utilization[user.id] += allocation.utilization
+        for allocation_request in allocation_requests:
+            users[allocation_request.user_id].list_requests.append(allocation_request)
+        for leave in leaves:
+            users[leave.user_id].list_leave_plans.append(leave)
+        for user in users.values():
+            user.is_over_utilized = current_utilization[user.id] > ValueConstants.MAXIMUM_UTILIZATION
+        return list(users.values())
+
     def user_details(self, user_id):
         user = User.objects.filter(id=user_id).first()
         if not user:
@@ -51,15 +111,7 @@ class UserService:
         industries = data.get(RequestKeys.INDUSTRIES)
         skills = data.get(RequestKeys.SKILLS)
         user.industries.set(industries)
-        ProficiencyMapping.objects.filter(user=user).update(rating=0)
-        for proficiency_obj in skills:
-            skill_name = proficiency_obj['skill_name']
-            rating = proficiency_obj['rating']
-            skill = Skill.objects.filter(name=skill_name.strip()).first()
-            if not skill:
-                continue
-            ProficiencyMapping.objects.update_or_create(
-                user=user, skill=skill, defaults={'rating': rating})
+        self.set_proficiencies({user.id: skills})
         user.skill_updated_time = timezone.now()
         user.save()
         return user
@@ -76,16 +128,49 @@ class UserService:
         return user
 
     def patch_proficiency(self, skills, user):
-        ProficiencyMapping.objects.filter(user=user).update(rating=0)
-        for proficiency_obj in skills:
-            skill_name = proficiency_obj['skill_name']
-            rating = proficiency_obj['rating']
-            skill = Skill.objects.filter(name=skill_name.strip()).first()
-            if skill:
-                ProficiencyMapping.objects.update_or_create(
-                    user=user, skill=skill, defaults={'rating': rating})
-
-    def patch_user(self, user_id, data):
+        self.set_proficiencies({user.id: skills})
+
+    def set_proficiencies(self, skills_by_user, replace=True):
+        """
+        Method to write the skill ratings of many users at once, `skills_by_user` maps user ids to their skills as
+        dicts of `skill_name` and `rating`. Unknown skill names are ignored and with `replace` the skills a user
+        is not given for are rated 0. The skills are resolved in one query and the ratings written with one upsert
+        however many are given.
+
+        Bulk writes send no signals, callers save the users or update their `modified_time` and invalidate the
+        cached search rankings.
+        """
+        skill_names = {proficiency['skill_name'].strip()
+                       for skills in skills_by_user.values() for proficiency in skills}
+        skill_ids = dict(Skill.objects.filter(name__in=skill_names).values_list('name', 'id'))
+        if replace:
+            ProficiencyMapping.objects.filter(user_id__in=skills_by_user).update(rating=0)
+
+        # keyed by the unique key, a skill listed twice is rated as per its last entry
+        proficiencies = {}
+        for user_id, skills in skills_by_user.items():
+            for proficiency in skills:
+                skill_id = skill_ids.get(proficiency['skill_name'].strip())
+                if skill_id is not None:
+                    proficiencies[skill_id, user_id] = ProficiencyMapping(user_id=user_id, skill_id=skill_id,
+                                                                          rating=proficiency['rating'])
+        ProficiencyMapping.objects.bulk_create(proficiencies.values(), update_conflicts=True,
+                                               unique_fields=['skill_id', 'user_id'], update_fields=['rating'])
+
+    @transaction.atomic
+    def bulk_edit_proficiencies(self, items):
+        """
+        Method to replace the skill ratings of many users, e.g. from an uploaded skill matrix.
+        """
+        skills_by_user = {item['user_id']: item['skills'] for item in items}
+        if User.objects.filter(id__in=skills_by_user).count() != len(skills_by_user):
+            raise InvalidRequest(ErrorMessages.USER_DOES_NOT_EXIST)
+        self.set_proficiencies(skills_by_user)
+        now = timezone.now()
+        User.objects.filter(id__in=skills_by_user).update(skill_updated_time=now, modified_time=now)
+        bump_data_version()
+
+    def patch_user(self, user_id, data, request_user=None):
         user = User.objects.filter(id=user_id).first()
         if not user:
             raise InvalidRequest(ErrorMessages.USER_DOES_NOT_EXIST)
@@ -100,10 +185,15 @@ class UserService:
 
         # make the project end date as same as LWD
         if lwd:
-            ProjectAllocation.objects.filter(
-                user_id=user_id, end_date__gte=lwd).update(end_date=lwd)
+            allocations = ProjectAllocation.objects.filter(user_id=user_id, end_date__gte=lwd)
+            allocation_ids = list(allocations.values_list('id', flat=True))
+            allocations.update(end_date=lwd, modified_time=timezone.now())
+            ProjectAllocationHistory.objects.record(ProjectAllocation.objects.filter(id__in=allocation_ids),
+                                                    request_user)
+            # queryset update does not fire signals, refresh the availability calendar and summary explicitly
+            UserAvailabilityService().refresh_users([user_id])
+            UserUtilizationSummaryService().refresh_users([user_id])
             user.last_working_day = lwd
-            update_user_status(user)
 
         # this logic checks that if skill key present, we have to make all the skill's rating zero
         # we write like this because there will be zero count of skills
@@ -127,6 +217,10 @@ class UserService:
             user.is_active = False
             user.current_status = 'Closed'
         user.save()
+        # a status given along with the last working day takes precedence over the derived one
+        if lwd and not status:
+            recompute_user_status([user.id])
+            user.refresh_from_db(fields=['current_status', 'status', 'is_active'])
         return user
 
     def remove_lwd(self, user_id):
@@ -135,8 +229,8 @@ class UserService:
             raise InvalidRequest(ErrorMessages.USER_DOES_NOT_EXIST)
 
         user.last_working_day = None
-        update_user_status(user)
         user.save()
+        recompute_user_status([user.id])
 
 
 class UserEditPermissionService:
@@ -350,32 +444,73 @@ class UserEditPermissionService:
         return has_permission
 
 
-def update_user_status(user, utilization=0):
-    allocations = ProjectAllocation.objects.filter(user=user,
-                                                   start_date__lte=datetime.today().date(),
-                                                   end_date__gte=datetime.today().date())
-
-    total_utilization = allocations.aggregate(Sum(SerializerKeys.UTILIZATION))[
-        SerializerKeys.UTILIZATION_SUM]
-
-    if not total_utilization:
-        total_utilization = 0
-
-    total_utilization = total_utilization - utilization
-    current_status = user.current_status
-
-    if user.last_working_day is not None:
-        current_status = 'Serving NP'
-
-    elif user.status == 'Active' and user.current_status != 'Closed':
-        if total_utilization >= ValueConstants.MAXIMUM_CAFE_UTILIZATION:
-            current_status = 'Fully_Allocated'
-
-        elif ValueConstants.MAXIMUM_CAFE_UTILIZATION > total_utilization >= ValueConstants.MINIMUM_CAFE_UTILIZATION:
-            current_status = 'Cafe'
-
-    user.current_status = current_status
-    user.save()
+def recompute_user_status(user_ids=None):
+    """
+    Method to recompute the current status of given users, or of all users, from today's allocations, leaves and
+    last working day with one statement. Changed users get a new modified time. Returns the ids of users whose
+    status changed.
+    """
+    if user_ids is not None:
+        user_ids = list(set(user_ids))
+        if not user_ids:
+            return []
+
+    # users whose notice period is over are closed, users serving it keep that status whatever their allocations,
+    # otherwise active users on a break leave are on a break and the others are fully allocated or in cafe. a break
+    # without a leave behind it, e.g. set by hand, is only left once the user is allocated again
+    query = f"""
+        update users u
+        set current_status = s.current_status, status = s.status, is_active = s.is_active,
+            modified_time = statement_timestamp()
+        from (
+            select u.id,
+                case
+                    when u.last_working_day < %(today)s then %(closed)s
+                    when u.last_working_day is not null then %(serving_np)s
+                    when u.status is distinct from %(active)s or u.current_status = %(closed)s then u.current_status
+                    when l.leave_type is not null
+                        then (%(break_statuses)s::text[])[array_position(%(leave_types)s::text[], l.leave_type)]
+                    when coalesce(a.utilization, 0) >= %(cafe_utilization)s then %(fully_allocated)s
+                    when u.current_status = any(%(break_statuses)s) then u.current_status
+                    else %(cafe)s
+                end as current_status,
+                case when u.last_working_day < %(today)s then %(closed_status)s else u.status end as status,
+                u.is_active and coalesce(u.last_working_day >= %(today)s, true) as is_active
+            from users u
+            left join (
+                select user_id, sum(utilization) as utilization
+                from project_allocation
+                where start_date <= %(today)s and end_date >= %(today)s
+                group by user_id
+            ) a on a.user_id = u.id
+            left join (
+                select distinct on (user_id) user_id, leave_type
+                from leave_plans
+                where from_date <= %(today)s and to_date >= %(today)s and leave_type = any(%(leave_types)s)
+                    and approval_status not in (%(cancelled)s, %(rejected)s)
+                order by user_id, id desc
+            ) l on l.user_id = u.id
+            {'where u.id = any(%(user_ids)s)' if user_ids is not None else ''}
+        ) s
+        where u.id = s.id and (u.current_status is distinct from s.current_status
+            or u.status is distinct from s.status or u.is_active <> s.is_active)
+        returning u.id
+    """
+    params = {
+        'today': date.today(), 'user_ids': user_ids, 'active': StatusKeys.ACTIVE, 'closed_status': StatusKeys.CLOSED,
+        'closed': CurrentStatusKeys.CLOSED,
+        'serving_np': CurrentStatusKeys.SERVING_NP, 'fully_allocated': CurrentStatusKeys.FULLY_ALLOCATED,
+        'cafe': CurrentStatusKeys.CAFE, 'cafe_utilization': ValueConstants.MAXIMUM_CAFE_UTILIZATION,
+        'leave_types': list(LEAVE_BREAK_STATUSES), 'break_statuses': list(LEAVE_BREAK_STATUSES.values()),
+        'cancelled': LeaveStatusKeys.CANCELLED, 'rejected': LeaveStatusKeys.REJECTED,
+    }
+    with connection.cursor() as cursor:
+        cursor.execute(query, params)
+        user_ids = [row[0] for row in cursor.fetchall()]
+    # the update sends no signals, status and is_active are read by talent search
+    if user_ids:
+        bump_data_version()
+    return user_ids
 
 
 def list_cafe_users(start_date=None, end_date=None):
@@ -388,39 +523,203 @@ def list_cafe_users(start_date=None, end_date=None):
     if end_date is not None:
         for_period_end_date = end_date
 
-    query = """
-        with
-        day_wise_allocation as (
-            select
-                user_id,
-                generate_series(start_date, coalesce(end_date, date %s), '1 day')::date as day,
-                sum(utilization) as util
-            from project_allocation
-            group by user_id, day
-        ),
-        project_based_availability as (
-            select
-                u.id as uid,
-                s.day as day,
-                coalesce(a.util, 0) < %s as is_cafe
-            from users u
-                left join (select id, generate_series(date %s, date %s, '1 day')::date as day from users) as s on
-                u.id=s.id
-                left join day_wise_allocation a on u.id=a.user_id and s.day=a.day
-        )
-        select exists(select pba.uid from project_based_availability pba
-        where pba.uid=users.id and pba.is_cafe = true
-        group by pba.uid) as is_potential_cafe
+    # a user is a potential cafe if utilization drops below the cafe limit on any day of the period
+    # i.e. the user is not covered with at least the cafe limit throughout the period
+    windows = """
+        select id as key, daterange(%s, %s, '[]') as period, %s as threshold from users where status = 'Active'
     """
-    users = User.objects.annotate(is_potential_cafe=RawSQL(query, params=[for_period_end_date,
-                                                                          ValueConstants.MAXIMUM_CAFE_UTILIZATION,
-                                                                          for_period_start_date, for_period_end_date],
-                                                           output_field=BooleanField())) \
-        .filter(is_potential_cafe=True, status='Active')
+    intervals = f"""
+        select user_id as key, {ALLOCATION_PERIOD} as period, utilization, 0 as leaves
+        from project_allocation
+        where {VALID_ALLOCATION_PERIOD} and {ALLOCATION_PERIOD} && daterange(%s, %s, '[]')
+    """
+    query = f"select key from ({covered_days(intervals, windows)}) d where covered_days = window_days"
+    params = [for_period_start_date, for_period_end_date, ValueConstants.MAXIMUM_CAFE_UTILIZATION,
+              for_period_start_date, for_period_end_date]
+    users = User.objects.filter(status='Active').exclude(id__in=RawSQL(query, params=params))
 
     return users
 
 
+class UserAvailabilityService:
+    query = """
+        insert into user_availability (user_id, start_date, end_date, utilization, on_leave)
+        select key, lower(period), upper(period) - 1, utilization, leaves > 0
+        from ({segments}) s
+        where utilization <> 0 or leaves <> 0
+    """
+    intervals = f"""
+        select user_id as key, {ALLOCATION_PERIOD} as period, utilization, 0 as leaves
+        from project_allocation
+        where tentative = false and {VALID_ALLOCATION_PERIOD} {{user_filter}}
+        union all
+        select user_id, {LEAVE_PERIOD}, 0, 1
+        from leave_plans
+        where approval_status not in (%s, %s) and {VALID_LEAVE_PERIOD} {{user_filter}}
+    """
+
+    def refresh_users(self, user_ids):
+        """
+        Method to recompute the availability calendar of given users.
+        """
+        user_ids = list(set(user_ids))
+        if not user_ids:
+            return
+
+        intervals = self.intervals.format(user_filter='and user_id = any(%s)')
+        params = [user_ids, LeaveStatusKeys.CANCELLED, LeaveStatusKeys.REJECTED, user_ids]
+        with transaction.atomic():
+            UserAvailability.objects.filter(user_id__in=user_ids).delete()
+            with connection.cursor() as cursor:
+                cursor.execute(self.query.format(segments=utilization_segments(intervals)), params)
+
+    def rebuild(self):
+        """
+        Method to rebuild the availability calendar of all users from scratch.
+        """
+        intervals = self.intervals.format(user_filter='')
+        params = [LeaveStatusKeys.CANCELLED, LeaveStatusKeys.REJECTED]
+        with transaction.atomic():
+            UserAvailability.objects.all().delete()
+            with connection.cursor() as cursor:
+                cursor.execute(self.query.format(segments=utilization_segments(intervals)), params)
+        return User.objects.count()
+
+
+class UserUtilizationSnapshotService:
+    query = f"""
+        insert into user_utilization_snapshot
+            (user_id, date, billable_utilization, non_billable_utilization, tentative_utilization, on_leave, status)
+        select
+            u.id,
+            d.day,
+            coalesce(sum(a.utilization) filter (where p.is_billable), 0),
+            coalesce(sum(a.utilization) filter (where not p.is_billable), 0),
+            coalesce(sum(a.utilization) filter (where a.tentative), 0),
+            exists(
+                select 1 from leave_plans l
+                where l.user_id = u.id and {LEAVE_PERIOD} @> d.day and {VALID_LEAVE_PERIOD}
+                    and l.approval_status not in (%(cancelled)s, %(rejected)s)
+            ),
+            case when d.day = %(today)s then u.current_status end
+        from (select generate_series(%(start_date)s::date, %(end_date)s::date, interval '1 day')::date as day) d
+            join users u on (u.date_of_joining is null or u.date_of_joining <= d.day)
+                and (u.last_working_day is null or u.last_working_day >= d.day)
+            left join project_allocation a on a.user_id = u.id
+                and daterange(a.start_date, a.end_date, '[]') @> d.day
+                and (a.end_date is null or a.end_date >= a.start_date)
+            left join project_position p on p.id = a.position_id
+        group by u.id, d.day
+        on conflict (user_id, date) do update set
+            billable_utilization = excluded.billable_utilization,
+            non_billable_utilization = excluded.non_billable_utilization,
+            tentative_utilization = excluded.tentative_utilization,
+            on_leave = excluded.on_leave,
+            status = coalesce(excluded.status, user_utilization_snapshot.status)
+    """
+
+    def snapshot(self, start_date, end_date=None):
+        """
+        Method to write the utilization facts of every day from start date to end date (both inclusive), facts
+        written before for these days are replaced. The status of a user is only known for today, past days keep
+        the status written on the day or none. Returns the number of rows written.
+        """
+        end_date = end_date or start_date
+        count = 0
+        while start_date <= end_date:
+            batch_end_date = min(start_date + timedelta(days=ValueConstants.SNAPSHOT_BATCH_DAYS - 1), end_date)
+            params = {'start_date': start_date, 'end_date': batch_end_date, 'today': date.today(),
+                      'cancelled': LeaveStatusKeys.CANCELLED, 'rejected': LeaveStatusKeys.REJECTED}
+            with transaction.atomic(), connection.cursor() as cursor:
+                cursor.execute(self.query, params)
+                count += cursor.rowcount
+            start_date = batch_end_date + timedelta(days=1)
+        return count
+
+    def snapshot_since_last(self, end_date=None):
+        """
+        Method to bring the facts up to date, the last day already written is taken again as it may have been
+        written before the day was over.
+        """
+        end_date = end_date or date.today()
+        last_date = UserUtilizationSnapshot.objects.filter(date__lte=end_date).order_by('-date') \
+            .values_list('date', flat=True).first()
+        return self.snapshot(last_date or end_date, end_date)
+
+    def day_facts(self, day):
+        """
+        Method to get the utilization facts of a day as rows with `user_id`, `billable_utilization` and
+        `non_billable_utilization`. These are the snapshots written by the job, or if it did not write the day they
+        are computed from the allocations without writing anything, only the job writes snapshots.
+        """
+        snapshots = UserUtilizationSnapshot.objects.filter(date=day)
+        if snapshots.exists():
+            return snapshots
+
+        running = Q(allocation__start_date__lte=day) & (
+            Q(allocation__end_date__gte=day) | Q(allocation__end_date__isnull=True))
+        return User.objects.filter(Q(date_of_joining__isnull=True) | Q(date_of_joining__lte=day),
+                                   Q(last_working_day__isnull=True) | Q(last_working_day__gte=day)).annotate(
+            user_id=F('id'),
+            billable_utilization=Coalesce(Sum('allocation__utilization', filter=running & Q(
+                allocation__position__is_billable=True)), 0),
+            non_billable_utilization=Coalesce(Sum('allocation__utilization', filter=running & Q(
+                allocation__position__is_billable=False)), 0))
+
+
+class UserUtilizationSummaryService:
+    fields = ['utilization', 'billable_utilization', 'next_free_date', 'next_allocation_end', 'summary_date']
+
+    def summarize(self, user_ids, day):
+        """
+        Method to compute the utilization summaries of given users on a day, the summaries are not saved.
+        """
+        summaries = {user_id: UserUtilizationSummary(user_id=user_id, next_free_date=day, summary_date=day)
+                     for user_id in user_ids}
+        allocations = ProjectAllocation.objects.filter(Q(end_date__gte=day) | Q(end_date__isnull=True),
+                                                       user_id__in=summaries) \
+            .values_list('user_id', 'start_date', 'end_date', 'utilization', 'position__is_billable') \
+            .order_by('user_id', 'start_date')
+        for user_id, start_date, end_date, utilization, is_billable in allocations:
+            summary = summaries[user_id]
+            if start_date <= day:
+                summary.utilization += utilization
+                if is_billable:
+                    summary.billable_utilization += utilization
+            if end_date is not None and (summary.next_allocation_end is None or end_date < summary.next_allocation_end):
+                summary.next_allocation_end = end_date
+            # allocations come by start date, the free date moves on while they overlap or touch it
+            if summary.next_free_date is not None and start_date <= summary.next_free_date:
+                if end_date is None:
+                    summary.next_free_date = None
+                elif end_date >= summary.next_free_date:
+                    summary.next_free_date = end_date + timedelta(days=1)
+        return list(summaries.values())
+
+    def refresh_users(self, user_ids, day=None):
+        """
+        Method to recompute and save the utilization summaries of given users.
+        """
+        user_ids = set(user_ids)
+        if not user_ids:
+            return
+        summaries = self.summarize(user_ids, day or date.today())
+        UserUtilizationSummary.objects.bulk_create(summaries, update_conflicts=True, unique_fields=['user_id'],
+                                                   update_fields=self.fields)
+
+    def rollover(self, day=None):
+        """
+        Method to bring the summaries of all users to the day, only users without a summary of the day are
+        summarized. Returns the number of users summarized.
+        """
+        day = day or date.today()
+        user_ids = list(User.objects.exclude(utilization_summary__summary_date=day).values_list('id', flat=True)
+                        .order_by('id'))
+        for index in range(0, len(user_ids), ValueConstants.SUMMARY_BATCH_SIZE):
+            self.refresh_users(user_ids[index:index + ValueConstants.SUMMARY_BATCH_SIZE], day)
+        return len(user_ids)
+
+
 class UserManagementService:
 
     def list_management_users(self, filters):
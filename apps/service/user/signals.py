@@ -0,0 +1,33 @@
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+
+from project.models import ProjectAllocation
+from user.models import LeavePlans, User
+from user.services import UserAvailabilityService, UserUtilizationSummaryService
+
+
+@receiver(post_save, sender=ProjectAllocation)
+@receiver(post_delete, sender=ProjectAllocation)
+@receiver(post_save, sender=LeavePlans)
+@receiver(post_delete, sender=LeavePlans)
+def refresh_user_availability(sender, instance, **kwargs):
+    """
+    Keep the availability calendar of the user in sync with their allocations and leaves.
+    """
+    if kwargs.get('raw'):
+        return
+    # rows removed as part of deleting the user itself go away along with the calendar
+    if isinstance(kwargs.get('origin'), User):
+        return
+    UserAvailabilityService().refresh_users([instance.user_id])
+
+
+@receiver(post_save, sender=ProjectAllocation)
+@receiver(post_delete, sender=ProjectAllocation)
+def refresh_user_utilization_summary(sender, instance, **kwargs):
+    """
+    Keep the utilization summary of the user in sync with their allocations.
+    """
+    if kwargs.get('raw') or isinstance(kwargs.get('origin'), User):
+        return
+    UserUtilizationSummaryService().refresh_users([instance.user_id])
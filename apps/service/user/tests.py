@@ -1,17 +1,28 @@
 import logging
-from datetime import datetime
+from datetime import datetime, date, timedelta
+from unittest.mock import patch
 
 from django.contrib.auth.models import Group
 from django.contrib.contenttypes.models import ContentType
+from django.core.management import call_command
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
+from django.utils import timezone
 from rest_framework import status
 from rest_framework.test import APITestCase
 
+from authapp.cache import get_user_permission_names
 from client.models import Client
 from common.models import Skill, Industry
-from project.models import Project, ProjectRole, ProjectPosition, ProjectAllocation
-from user.constants import PermissionKeys, ResponseKeys, ErrorMessages
-from user.models import Role, ProficiencyMapping
+from helpers.pagination import encode_cursor
+from project.models import Project, ProjectRole, ProjectPosition, ProjectAllocation, ProjectAllocationRequest
+from search.cache import get_data_version
+from user.constants import PermissionKeys, ResponseKeys, ErrorMessages, CurrentStatusKeys
+from user.models import Role, ProficiencyMapping, LeavePlans, UserAvailability, UserUtilizationSnapshot, \
+    UserUtilizationSummary
+from user.services import list_cafe_users, recompute_user_status, UserUtilizationSnapshotService, \
+    UserUtilizationSummaryService, UserService
 from user.models import User  # Import your User model here
 from utils.permissions import get_permission_object
 
@@ -159,6 +170,30 @@ class UserTimelineTest(BaseTestCase):
         self.assertEqual(response.status_code, status.HTTP_200_OK)
         self.assertEqual(response.data[ResponseKeys.COUNT], 4)
 
+    @patch('user.views.timezone')
+    def test_search_by_availability_without_rollover(self, mock):
+        now = timezone.now()
+        mock.now.return_value = now
+        user = User.objects.create(employee_id=20, email='user20@company.io', first_name='Foo20', last_name='Bar20',
+                                   career_start_date='2019-07-15')
+        ProjectAllocation.objects.create(user=user, position=self.position1, utilization=100,
+                                         start_date=now.date() - timedelta(days=10), end_date=now.date())
+        self.client.force_authenticate(user=self.user)
+        url = reverse('v1:user:list_users')
+
+        def available_user_ids():
+            response = self.client.post(url, {"availability": 100}, format='json')
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            return [talent['id'] for talent in response.data[ResponseKeys.USERS]]
+
+        self.assertNotIn(user.id, available_user_ids())
+
+        # the next day the allocation has ended, whether or not the summaries were rolled over
+        mock.now.return_value = now + timedelta(days=1)
+        self.assertIn(user.id, available_user_ids())
+        UserUtilizationSummaryService().rollover(now.date() + timedelta(days=1))
+        self.assertIn(user.id, available_user_ids())
+
     def test_search_by_locations(self):
         self.client.force_authenticate(user=self.user)
         url = reverse('v1:user:list_users')
@@ -250,6 +285,59 @@ class UserTimelineTest(BaseTestCase):
         self.assertEqual(response.status_code, status.HTTP_200_OK)
         self.assertEqual(response.data[ResponseKeys.USERS][0]['full_name_with_exp_band'], 'Foo2 Bar2 - L1')
 
+    def test_talent_timeline_query_count(self):
+        self.client.force_authenticate(user=self.user)
+        url = reverse('v1:user:list_users')
+        data = {'skills': [self.skill2.id], 'response_date_start': '2023-01-01', 'response_date_end': '2023-12-31'}
+        get_user_permission_names(self.user)
+        with CaptureQueriesContext(connection) as queries:
+            self.client.post(url, data, format='json')
+
+        for index in range(3):
+            user = User.objects.create(employee_id=100 + index, email=f'talent{index}@company.io', first_name='Tal',
+                                       last_name=f'Ent{index}', career_start_date='2019-07-15')
+            ProficiencyMapping.objects.create(user=user, skill=self.skill1, rating=3)
+            ProficiencyMapping.objects.create(user=user, skill=self.skill2, rating=2)
+            ProjectAllocation.objects.create(user=user, position=self.position1, utilization=50,
+                                             start_date='2023-01-01', end_date='2023-03-31')
+            ProjectAllocationRequest.objects.create(user=user, position=self.position2, utilization=50,
+                                                    start_date='2023-06-01', end_date='2023-06-30', status='PENDING')
+            LeavePlans.objects.create(record_id=f'talent{index}', user=user, from_date='2023-02-01',
+                                      to_date='2023-02-02', duration=2, leave_type='junk', approval_status='Approved')
+
+        # the details of the page are loaded in bulk, more users do not add queries
+        with self.assertNumQueries(len(queries)):
+            response = self.client.post(url, data, format='json')
+        user = next(user for user in response.data[ResponseKeys.USERS] if user['employee_id'] == '100')
+        # the skills asked for come first
+        self.assertEqual([skill['skill'] for skill in user['skills']], ['Java', 'Python'])
+        self.assertEqual(len(user['projects']), 1)
+        self.assertEqual(len(user['requests']), 1)
+        self.assertEqual(len(user['leave_plans']), 1)
+
+    def test_talent_timeline_keyset_pagination(self):
+        self.client.force_authenticate(user=self.user)
+        url = reverse('v1:user:list_users')
+        User.objects.filter(id=self.user2.id).update(last_working_day='2030-01-01')
+        for sort_by in [None, 'experience_desc', 'availability_asc', 'employee_id_desc', 'lwd_asc', 'lwd_desc']:
+            data = {'size': 1} if sort_by is None else {'size': 1, 'sort_by': sort_by}
+            response = self.client.post(url, {**data, 'size': 10}, format='json')
+            expected = [user['id'] for user in response.data[ResponseKeys.USERS]]
+
+            users, cursor = [], ''
+            while cursor is not None:
+                response = self.client.post(url, {**data, 'cursor': cursor}, format='json')
+                self.assertEqual(response.status_code, status.HTTP_200_OK)
+                self.assertEqual(response.data[ResponseKeys.COUNT], len(expected) if cursor == '' else None)
+                users += [user['id'] for user in response.data[ResponseKeys.USERS]]
+                cursor = response.data[ResponseKeys.NEXT_CURSOR]
+            # the same order as the pages, every user listed once
+            self.assertEqual(users, expected)
+
+        response = self.client.post(url, {'sort_by': 'lwd_asc', 'cursor': encode_cursor('junk', 1, 2)},
+                                    format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
 
 class UserDetailsTest(BaseTestCase):
     @classmethod
@@ -479,6 +567,42 @@ class AddUserSkillIndustryDetailsTest(BaseTestCase):
 
         self.assertEqual(response.status_code, status.HTTP_200_OK)
 
+    def test_set_proficiencies_query_count(self):
+        skills = [Skill.objects.create(name=f'Skill {index}') for index in range(40)]
+        data = {self.user1.id: [{'skill_name': skill.name, 'rating': 3} for skill in skills],
+                self.user2.id: [{'skill_name': 'Java', 'rating': 5}]}
+        # skills resolved in one query, ratings reset and upserted in one query each
+        with self.assertNumQueries(3):
+            UserService().set_proficiencies(data)
+        self.assertEqual(ProficiencyMapping.objects.filter(user=self.user1, rating=3).count(), 40)
+        self.assertEqual(ProficiencyMapping.objects.get(user=self.user1, skill=self.skill1).rating, 0)
+        self.assertEqual(ProficiencyMapping.objects.get(user=self.user2, skill=self.skill2).rating, 5)
+
+    def test_bulk_edit_proficiencies(self):
+        for codename in PermissionKeys.BULK_PROFICIENCY_PERMISSION[PermissionKeys.PUT]:
+            self.user.user_permissions.add(get_permission_object(codename))
+        self.client.force_authenticate(user=self.user)
+        url = reverse('v1:user:edit-user-proficiency')
+        data = [
+            {'userId': self.user1.id, 'skills': [{'skillName': 'Java', 'rating': 3}]},
+            {'userId': self.user2.id, 'skills': [{'skillName': ' Python ', 'rating': 1},
+                                                 {'skillName': 'Python', 'rating': 5},
+                                                 {'skillName': 'Javaas', 'rating': 2}]},
+        ]
+        response = self.client.put(url, data, format='json')
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        ratings = {(mapping.user_id, mapping.skill_id): mapping.rating for mapping in ProficiencyMapping.objects.all()}
+        self.assertEqual(ratings, {(self.user1.id, self.skill1.id): 0, (self.user1.id, self.skill2.id): 3,
+                                   (self.user2.id, self.skill1.id): 5, (self.user2.id, self.skill2.id): 0})
+        self.user1.refresh_from_db()
+        self.assertIsNotNone(self.user1.skill_updated_time)
+
+        data = [{'userId': 1145, 'skills': [{'skillName': 'Java', 'rating': 3}]}]
+        response = self.client.put(url, data, format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(response.data['detail'], ErrorMessages.USER_DOES_NOT_EXIST)
+
 
 class PermissionsTestCase(BaseTestCase):
     @classmethod
@@ -874,3 +998,283 @@ class LocationServiceTest(BaseTestCase):
         response = self.client.get(url, data, format="json")
         self.assertEqual(response.status_code, status.HTTP_200_OK)
         self.assertEqual(response.data[ResponseKeys.COUNT], 2)
+
+
+class UserAvailabilityTest(BaseTestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+
+        client = Client.objects.create(name='Test', city='Bangalore', country='India', start_date='2020-01-10',
+                                       account_manager=cls.user)
+        project = Project.objects.create(name='Junk', status=Project.Status.ACTIVE, city='Bangalore',
+                                         country='India', client=client, start_date='2020-01-01')
+        role, _ = Role.objects.get_or_create(name='Role')
+        project_role = ProjectRole.objects.create(project=project, role=role)
+        cls.position = ProjectPosition.objects.create(
+            project_role=project_role, utilization=50, experience_range_start=2, experience_range_end=4,
+            start_date='2023-01-01', end_date='2023-12-31'
+        )
+
+    def availability(self):
+        return list(UserAvailability.objects.filter(user=self.user).order_by('start_date')
+                    .values_list('start_date', 'end_date', 'utilization', 'on_leave'))
+
+    def test_availability_follows_allocations_and_leaves(self):
+        allocation = ProjectAllocation.objects.create(user=self.user, position=self.position, utilization=50,
+                                                      start_date='2023-01-01', end_date='2023-01-31')
+        ProjectAllocation.objects.create(user=self.user, position=self.position, utilization=30,
+                                         start_date='2023-01-21', end_date=None)
+        ProjectAllocation.objects.create(user=self.user, position=self.position, utilization=20,
+                                         start_date='2023-01-01', end_date='2023-12-31', tentative=True)
+        LeavePlans.objects.create(record_id='1', user=self.user, from_date='2023-02-06', to_date='2023-02-10',
+                                  duration=5, leave_type='junk', approval_status='Approved')
+        LeavePlans.objects.create(record_id='2', user=self.user, from_date='2023-03-01', to_date='2023-03-03',
+                                  duration=3, leave_type='junk', approval_status='Cancelled')
+
+        self.assertEqual(self.availability(), [
+            (date(2023, 1, 1), date(2023, 1, 20), 50, False),
+            (date(2023, 1, 21), date(2023, 1, 31), 80, False),
+            (date(2023, 2, 1), date(2023, 2, 5), 30, False),
+            (date(2023, 2, 6), date(2023, 2, 10), 30, True),
+            (date(2023, 2, 11), None, 30, False),
+        ])
+
+        allocation.delete()
+        self.assertEqual(self.availability()[0], (date(2023, 1, 21), date(2023, 2, 5), 30, False))
+
+    def test_rebuild_user_availability_command(self):
+        ProjectAllocation.objects.create(user=self.user, position=self.position, utilization=50,
+                                         start_date='2023-01-01', end_date='2023-01-31')
+        UserAvailability.objects.all().delete()
+
+        call_command('rebuild_user_availability')
+
+        self.assertEqual(self.availability(), [(date(2023, 1, 1), date(2023, 1, 31), 50, False)])
+
+    def test_list_cafe_users(self):
+        user1 = User.objects.create(employee_id=11, email='user1@company.io', first_name='Foo1', last_name='Bar1',
+                                    status='Active')
+        ProjectAllocation.objects.create(user=self.user, position=self.position, utilization=20,
+                                         start_date='2023-01-01', end_date='2023-01-31')
+        ProjectAllocation.objects.create(user=self.user, position=self.position, utilization=10,
+                                         start_date='2023-01-01', end_date='2023-01-20')
+        ProjectAllocation.objects.create(user=user1, position=self.position, utilization=30,
+                                         start_date='2023-01-01', end_date=None)
+
+        cafe_users = list_cafe_users(date(2023, 1, 1), date(2023, 1, 20))
+        self.assertEqual(list(cafe_users), [])
+
+        cafe_users = list_cafe_users(date(2023, 1, 1), date(2023, 1, 21))
+        self.assertEqual(list(cafe_users), [self.user])
+
+
+class RecomputeUserStatusTest(BaseTestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+
+        client = Client.objects.create(name='Test', city='Bangalore', country='India', start_date='2020-01-10',
+                                       account_manager=cls.user)
+        project = Project.objects.create(name='Junk', status=Project.Status.ACTIVE, city='Bangalore',
+                                         country='India', client=client, start_date='2020-01-01')
+        role, _ = Role.objects.get_or_create(name='Role')
+        project_role = ProjectRole.objects.create(project=project, role=role)
+        cls.position = ProjectPosition.objects.create(
+            project_role=project_role, utilization=50, experience_range_start=2, experience_range_end=4,
+            start_date='2020-01-01'
+        )
+
+    def create_user(self, employee_id, **kwargs):
+        data = {'status': 'Active', 'current_status': 'Cafe', **kwargs}
+        return User.objects.create(employee_id=employee_id, email=f'user{employee_id}@company.io', first_name='Foo',
+                                   last_name='Bar', **data)
+
+    def test_recompute_user_status_command(self):
+        today = date.today()
+        allocated = self.create_user(11)
+        ProjectAllocation.objects.create(user=allocated, position=self.position, utilization=20,
+                                         start_date=today, end_date=today)
+        ProjectAllocation.objects.create(user=allocated, position=self.position, utilization=10,
+                                         start_date=today - timedelta(days=10), end_date=today + timedelta(days=10))
+        unallocated = self.create_user(12, current_status='Fully_Allocated')
+        ProjectAllocation.objects.create(user=unallocated, position=self.position, utilization=100,
+                                         start_date=today - timedelta(days=10), end_date=today - timedelta(days=1))
+        serving_np = self.create_user(13, last_working_day=today + timedelta(days=10))
+        left = self.create_user(14, last_working_day=today - timedelta(days=1))
+        on_break = self.create_user(15)
+        LeavePlans.objects.create(record_id='1', user=on_break, from_date=today, to_date=today + timedelta(days=90),
+                                  duration=90, leave_type='Maternity Leave', approval_status='Approved')
+        cancelled_break = self.create_user(16)
+        LeavePlans.objects.create(record_id='2', user=cancelled_break, from_date=today, to_date=today,
+                                  duration=1, leave_type='Sabbatical Leave', approval_status='Cancelled')
+        inactive = self.create_user(17, status='Closed', current_status='Closed')
+
+        data_version = get_data_version()
+        left_modified_time = left.modified_time
+
+        # the statuses of all users are recomputed with one statement
+        with CaptureQueriesContext(connection) as queries:
+            call_command('recompute_user_status')
+        self.assertEqual(len([query for query in queries if 'update users' in query['sql']]), 1)
+
+        statuses = dict(User.objects.values_list('id', 'current_status'))
+        self.assertEqual(statuses[allocated.id], 'Fully_Allocated')
+        self.assertEqual(statuses[unallocated.id], 'Cafe')
+        self.assertEqual(statuses[serving_np.id], 'Serving NP')
+        self.assertEqual(statuses[left.id], 'Closed')
+        self.assertEqual(statuses[on_break.id], 'Maternity Break')
+        self.assertEqual(statuses[cancelled_break.id], 'Cafe')
+        self.assertEqual(statuses[inactive.id], 'Closed')
+        left.refresh_from_db()
+        self.assertEqual((left.status, left.is_active), ('Closed', False))
+        # changed users are seen by talent search, in this process and others
+        self.assertGreater(left.modified_time, left_modified_time)
+        self.assertNotEqual(get_data_version(), data_version)
+
+        # nothing changed since, so the next run leaves every row alone
+        data_version = get_data_version()
+        self.assertEqual(recompute_user_status(), [])
+        self.assertEqual(get_data_version(), data_version)
+
+        # the daily run also brings the utilization summaries to today
+        summarized = UserUtilizationSummary.objects.filter(summary_date=today).values_list('user_id', flat=True)
+        self.assertEqual(set(summarized), set(User.objects.values_list('id', flat=True)))
+
+    def test_recompute_user_status_of_given_users(self):
+        today = date.today()
+        user1 = self.create_user(11)
+        user2 = self.create_user(12)
+        for user in (user1, user2):
+            ProjectAllocation.objects.create(user=user, position=self.position, utilization=50,
+                                             start_date=today, end_date=today)
+
+        self.assertEqual(recompute_user_status([user1.id, user1.id]), [user1.id])
+        self.assertEqual(recompute_user_status([]), [])
+        user2.refresh_from_db()
+        self.assertEqual(user2.current_status, 'Cafe')
+
+
+class UserUtilizationSnapshotTest(BaseTestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+
+        client = Client.objects.create(name='Test', city='Bangalore', country='India', start_date='2020-01-10',
+                                       account_manager=cls.user)
+        project = Project.objects.create(name='Junk', status=Project.Status.ACTIVE, city='Bangalore',
+                                         country='India', client=client, start_date='2020-01-01')
+        role, _ = Role.objects.get_or_create(name='Role')
+        project_role = ProjectRole.objects.create(project=project, role=role)
+        billable = ProjectPosition.objects.create(project_role=project_role, utilization=50, experience_range_start=2,
+                                                  experience_range_end=4, start_date='2023-01-01', is_billable=True)
+        non_billable = ProjectPosition.objects.create(project_role=project_role, utilization=50,
+                                                      experience_range_start=2, experience_range_end=4,
+                                                      start_date='2023-01-01', is_billable=False)
+        ProjectAllocation.objects.create(user=cls.user, position=billable, utilization=50,
+                                         start_date='2023-01-01', end_date='2023-01-02')
+        ProjectAllocation.objects.create(user=cls.user, position=billable, utilization=20,
+                                         start_date='2023-01-02', end_date=None, tentative=True)
+        ProjectAllocation.objects.create(user=cls.user, position=non_billable, utilization=10,
+                                         start_date='2023-01-01', end_date='2023-01-01')
+        LeavePlans.objects.create(record_id='1', user=cls.user, from_date='2023-01-03', to_date='2023-01-03',
+                                  duration=1, leave_type='junk', approval_status='Approved')
+        User.objects.create(employee_id=11, email='user1@company.io', first_name='Foo1', last_name='Bar1',
+                            status='Active', date_of_joining='2023-01-03')
+
+    def snapshots(self):
+        return list(UserUtilizationSnapshot.objects.order_by('date', 'user_id').values_list(
+            'user_id', 'date', 'billable_utilization', 'non_billable_utilization', 'tentative_utilization',
+            'on_leave'))
+
+    def test_snapshot_is_idempotent(self):
+        service = UserUtilizationSnapshotService()
+        self.assertEqual(service.snapshot(date(2023, 1, 1), date(2023, 1, 3)), 4)
+        self.assertEqual(service.snapshot(date(2023, 1, 2)), 1)
+
+        user1 = User.objects.get(employee_id=11)
+        self.assertEqual(self.snapshots(), [
+            (self.user.id, date(2023, 1, 1), 50, 10, 0, False),
+            (self.user.id, date(2023, 1, 2), 70, 0, 20, False),
+            (self.user.id, date(2023, 1, 3), 20, 0, 20, True),
+            (user1.id, date(2023, 1, 3), 0, 0, 0, False),
+        ])
+
+    def test_snapshot_commands(self):
+        call_command('backfill_user_utilization', '2023-01-01', '2023-01-02')
+        self.assertEqual(UserUtilizationSnapshot.objects.count(), 2)
+
+        # picks up from the last day written
+        UserUtilizationSnapshotService().snapshot_since_last(date(2023, 1, 4))
+        self.assertEqual(list(UserUtilizationSnapshot.objects.filter(user=self.user).values_list('date', flat=True)
+                              .order_by('date')), [date(2023, 1, day) for day in range(1, 5)])
+
+        User.objects.filter(id=self.user.id).update(current_status=CurrentStatusKeys.CAFE)
+        call_command('snapshot_user_utilization')
+        self.assertTrue(UserUtilizationSnapshot.objects.filter(date=date.today()).exists())
+
+        # the status is the one of the day, unknown for days written after the fact
+        self.assertEqual(UserUtilizationSnapshot.objects.get(user=self.user, date=date.today()).status,
+                         CurrentStatusKeys.CAFE)
+        past_statuses = UserUtilizationSnapshot.objects.exclude(date=date.today()).values_list('status', flat=True)
+        self.assertEqual(set(past_statuses), {None})
+
+
+class UserUtilizationSummaryTest(BaseTestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+
+        client = Client.objects.create(name='Test', city='Bangalore', country='India', start_date='2020-01-10',
+                                       account_manager=cls.user)
+        project = Project.objects.create(name='Junk', status=Project.Status.ACTIVE, city='Bangalore',
+                                         country='India', client=client, start_date='2020-01-01')
+        role, _ = Role.objects.get_or_create(name='Role')
+        project_role = ProjectRole.objects.create(project=project, role=role)
+        cls.billable = ProjectPosition.objects.create(
+            project_role=project_role, utilization=50, experience_range_start=2, experience_range_end=4,
+            start_date='2023-01-01', is_billable=True)
+        cls.non_billable = ProjectPosition.objects.create(
+            project_role=project_role, utilization=50, experience_range_start=2, experience_range_end=4,
+            start_date='2023-01-01', is_billable=False)
+
+    def summary(self):
+        return UserUtilizationSummary.objects.filter(user=self.user).values_list(
+            'utilization', 'billable_utilization', 'next_free_date', 'next_allocation_end').first()
+
+    def test_summary_follows_allocations(self):
+        today = date.today()
+        ProjectAllocation.objects.create(user=self.user, position=self.billable, utilization=50,
+                                         start_date=today - timedelta(days=10), end_date=today + timedelta(days=5))
+        self.assertEqual(self.summary(), (50, 50, today + timedelta(days=6), today + timedelta(days=5)))
+
+        # an allocation starting right after the first one moves the free date on, a later one does not
+        ProjectAllocation.objects.create(user=self.user, position=self.non_billable, utilization=30,
+                                         start_date=today + timedelta(days=6), end_date=today + timedelta(days=9))
+        later = ProjectAllocation.objects.create(user=self.user, position=self.billable, utilization=20,
+                                                 start_date=today + timedelta(days=20), end_date=None)
+        self.assertEqual(self.summary(), (50, 50, today + timedelta(days=10), today + timedelta(days=5)))
+
+        later.start_date = today
+        later.save()
+        self.assertEqual(self.summary(), (70, 70, None, today + timedelta(days=5)))
+
+        later.delete()
+        self.assertEqual(self.summary()[0], 50)
+
+    def test_rollover_user_utilization_summary_command(self):
+        tomorrow = date.today() + timedelta(days=1)
+        ProjectAllocation.objects.create(user=self.user, position=self.non_billable, utilization=40,
+                                         start_date=tomorrow, end_date=tomorrow)
+        self.assertEqual(self.summary(), (0, 0, date.today(), tomorrow))
+
+        self.assertEqual(UserUtilizationSummaryService().rollover(tomorrow), 1)
+        self.assertEqual(self.summary(), (40, 0, tomorrow + timedelta(days=1), tomorrow))
+        self.assertEqual(UserUtilizationSummaryService().rollover(tomorrow), 0)
+
+        call_command('rollover_user_utilization_summary')
+        self.assertEqual(UserUtilizationSummary.objects.get(user=self.user).summary_date, date.today())
@@ -2,7 +2,8 @@ from django.urls import path
 
 from user.views import UserRoleAPIView, UserAPIView, UserDetailsAPIView, UserEditPermissionAPIView, \
     GroupHasPermissionAPIView, UserSkillIndustryAPIView, EditUserExperienceAPIView, UserRemoveLastWorkingDayAPIView, \
-    ListUserAndRolesAPIView, EditUserGroupsAPIView, GetUserGroupsAPIView, UserCountriesAPIView, UserCitiesAPIView
+    ListUserAndRolesAPIView, EditUserGroupsAPIView, GetUserGroupsAPIView, UserCountriesAPIView, UserCitiesAPIView, \
+    EditUsersProficiencyAPIView
 
 urlpatterns = [
     path('create_role/', UserRoleAPIView.as_view(), name='create_role'),
@@ -16,6 +17,7 @@ urlpatterns = [
     path('remove_lwd/<int:user_id>/', UserRemoveLastWorkingDayAPIView.as_view(), name='user_remove_LWD'),
     path('user-management-view/', ListUserAndRolesAPIView.as_view(), name='user-management-view'),
     path('edit-user-group/', EditUserGroupsAPIView.as_view(), name='edit-user-group'),
+    path('edit-user-proficiency/', EditUsersProficiencyAPIView.as_view(), name='edit-user-proficiency'),
     path('get-user-groups/', GetUserGroupsAPIView.as_view(), name='get-user-groups'),
     path('get-user-countries/', UserCountriesAPIView.as_view(), name='get-user-countries'),
     path('get-user-cities/', UserCitiesAPIView.as_view(), name='get-user-cities')
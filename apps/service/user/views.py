@@ -1,6 +1,5 @@
-import datetime
 
-from django.db.models import Q, F, IntegerField, ExpressionWrapper, Sum, Value
+from django.db.models import Q, F, IntegerField, ExpressionWrapper, Value, Case, When, Subquery, OuterRef, Sum
 from django.db.models.functions import Extract, Floor, Coalesce, Concat, Cast
 from django.utils import timezone
 from drf_yasg.utils import swagger_auto_schema
@@ -10,15 +9,17 @@ from rest_framework.views import APIView
 
 from authapp.permissions import APIPermission
 from helpers.exceptions import InvalidRequest
-from helpers.pagination import paginate
+from helpers.pagination import paginate, paginate_keyset, keyset_ordering
+from project.models import ProjectAllocation
 from user.constants import PermissionKeys, ResponseKeys, RequestKeys, SuccessMessages
 from user.constants import SerializerKeys, ErrorMessages
+from user.models import ProficiencyMapping
 from user.serializers import RoleRequestSerializer, RoleSerializer, ListUserRequestSerializer, \
     ListUserResponseSerializer, UserDetailsResponseSerializer, UserSkillIndustryResponseSerializer, \
     UserSkillIndustryRequestSerializer, EditUserRequestSerializer, EditUserExperienceRequestSerializer, \
     EditUserExperienceResponseSerializer, ListUserManagemenetRequestSerializer, ListUserManagementResponseSerializer, \
     EditMultipleUserGroupRequestSerializer, ListCitiesResponseSerializer, ListCountriesResponseSerializer, \
-    ListCitiesRequestSerializer, ListGroupSerializer
+    ListCitiesRequestSerializer, ListGroupSerializer, EditMultipleUserProficiencyRequestSerializer
 from user.services import UserRoleService, UserService, UserEditPermissionService, UserManagementService, \
     GroupService, LocationService
 
@@ -42,38 +43,32 @@ class UserAPIView(APIView):
     permission_classes = [APIPermission]
     permissions = PermissionKeys.USER_DETAIL_PERMISSIONS
 
+    # (field, descending) sort keys of every sort_by, users are listed by name if none is given
+    SORT_KEYS = {
+        'experience_desc': [('user_experience', True), ('user_name', False)],
+        'experience_asc': [('user_experience', False), ('user_name', False)],
+        'availability_desc': [('utilization_sum', False), ('user_name', False)],
+        'availability_asc': [('utilization_sum', True), ('user_name', False)],
+        'employee_id_asc': [('employee_id_int', False)],
+        'employee_id_desc': [('employee_id_int', True)],
+        'lwd_asc': [('last_working_day', False), ('user_name', False)],
+        'lwd_desc': [('last_working_day', True), ('user_name', False)],
+    }
+    DEFAULT_SORT_KEYS = [('user_name', False)]
+
     def get_sorted_users(self, sort_by, users):
-        if sort_by == 'experience_desc':
-            users = users.order_by('-user_experience', 'user_name')
-        if sort_by == 'experience_asc':
-            users = users.order_by('user_experience', 'user_name')
-        if sort_by == 'availability_desc':
-            users = users.order_by('utilization_sum', 'user_name')
-        if sort_by == 'availability_asc':
-            users = users.order_by('-utilization_sum', 'user_name')
-        if sort_by == 'employee_id_asc':
-            users = users.exclude(
-                Q(employee_id='') | Q(employee_id__isnull=True) | Q(
-                    employee_id__regex=r'[^\d]+')
-            ).annotate(
-                employee_id_int=ExpressionWrapper(
-                    Cast('employee_id', IntegerField()), output_field=IntegerField())
-            ).order_by('employee_id_int')
-        if sort_by == 'employee_id_desc':
+        """
+        Returns the users sorted as per sort_by along with the sort keys, which are also the keys of the cursor.
+        """
+        if sort_by in ('employee_id_asc', 'employee_id_desc'):
             users = users.exclude(
                 Q(employee_id='') | Q(employee_id__isnull=True) | Q(
                     employee_id__regex=r'[^\d]+')
             ).annotate(
                 employee_id_int=ExpressionWrapper(
-                    Cast('employee_id', IntegerField()), output_field=IntegerField())
-            ).order_by('-employee_id_int')
-        if sort_by == 'lwd_asc':
-            users = users.order_by('last_working_day', 'user_name')
-        if sort_by == 'lwd_desc':
-            users = users.order_by('-last_working_day', 'user_name')
-        if not sort_by:
-            users = users.order_by('user_name')
-        return users
+                    Cast('employee_id', IntegerField()), output_field=IntegerField()))
+        sort_keys = self.SORT_KEYS.get(sort_by, self.DEFAULT_SORT_KEYS)
+        return users.order_by(*keyset_ordering(sort_keys)), sort_keys
 
     @swagger_auto_schema(request_body=ListUserRequestSerializer(),
                          responses={status.HTTP_200_OK: ListUserResponseSerializer(many=True)})
@@ -107,29 +102,34 @@ class UserAPIView(APIView):
             raise InvalidRequest(
                 ErrorMessages.EXP_START_RANGE_GREATER_THAN_EXP_END_RANGE)
 
+        today = timezone.now().date()
         users = service.list_users(request_serializer.validated_data)
         users = users.annotate(
             career_break_month=Coalesce('career_break_months', 0),
             user_name=Concat('first_name', Value(' '), 'last_name'),
             user_experience=Coalesce(ExpressionWrapper(
-                Floor((Extract(timezone.now().date() - F('career_start_date'), 'day')) / 30) - F(
+                Floor((Extract(today - F('career_start_date'), 'day')) / 30) - F(
                     'career_break_month'),
                 output_field=IntegerField(),
             ), 0))
 
-        users = users.annotate(
-            utilization_sum=Coalesce(
-                Sum('allocation__utilization',
-                    filter=(Q(allocation__start_date__lte=datetime.date.today()) &
-                            (Q(allocation__end_date__gte=datetime.date.today()) | Q(allocation__end_date=None)))), 0)
-        )
+        # the maintained summary instead of an aggregate over allocations, summaries the daily rollover did not bring
+        # to today yet, or missing ones, fall back to the aggregate
+        live_utilization = ProjectAllocation.objects.filter(
+            Q(end_date__gte=today) | Q(end_date__isnull=True), user_id=OuterRef('id'), start_date__lte=today) \
+            .values('user_id').annotate(utilization=Sum('utilization')).values('utilization')
+        users = users.annotate(utilization_sum=Case(
+            When(utilization_summary__summary_date=today, then='utilization_summary__utilization'),
+            default=Coalesce(Subquery(live_utilization), 0)))
 
+        # subqueries instead of joins, a user with several matching rows is listed once
         if project:
-            users = users.filter(
-                allocation__position__project_role__project__in=project)
+            users = users.filter(id__in=ProjectAllocation.objects.filter(
+                position__project_role__project__in=project).values('user_id'))
 
         if skills:
-            users = users.filter(proficiency_mapping__skill__in=skills, proficiency_mapping__rating__gt=0)
+            users = users.filter(id__in=ProficiencyMapping.objects.filter(
+                skill__in=skills, rating__gt=0).values('user_id'))
 
         if user_function:
             users = users.filter(function=user_function)
@@ -147,20 +147,29 @@ class UserAPIView(APIView):
         if availability is not None and availability <= 100:
             users = users.filter(utilization_sum__lte=100 - availability)
 
-        users = self.get_sorted_users(sort_by, users)
-
-        paginated_users = paginate(users, page, size)
+        users, sort_keys = self.get_sorted_users(sort_by, users)
+        users = users.select_related('role')
+
+        # a cursor, even a blank one, asks for keyset pages
+        if RequestKeys.CURSOR in request_serializer.validated_data:
+            cursor = request_serializer.validated_data[RequestKeys.CURSOR]
+            try:
+                paginated_users, next_cursor = paginate_keyset(users, sort_keys, cursor, size)
+            except ValueError:
+                raise InvalidRequest(ErrorMessages.INVALID_CURSOR)
+            # counted once on the first page, following pages are not slowed down by it
+            count = users.count() if cursor is None else None
+        else:
+            paginated_users = paginate(users, page, size)
+            next_cursor = None
+            count = paginated_users.paginator.count
+        paginated_users = service.load_list_details(paginated_users, skills, response_date_start, response_date_end)
 
         response_serializer = ListUserResponseSerializer(paginated_users,
                                                          many=True,
-                                                         context={
-                                                             SerializerKeys.RESPONSE_DATE_START: response_date_start,
-                                                             SerializerKeys.RESPONSE_DATE_END: response_date_end,
-                                                             SerializerKeys.SKILLS: skills,
-                                                             'projects': project}
-                                                         )
+                                                         context={'projects': project})
         response = {ResponseKeys.USERS: response_serializer.data,
-                    ResponseKeys.COUNT: len(users)}
+                    ResponseKeys.COUNT: count, ResponseKeys.NEXT_CURSOR: next_cursor}
         return Response(response, status=status.HTTP_200_OK)
 
 
@@ -182,7 +191,7 @@ class UserDetailsAPIView(APIView):
         service = UserService()
         request_serializer = EditUserRequestSerializer(data=request.data)
         request_serializer.is_valid(raise_exception=True)
-        service.patch_user(user_id, request_serializer.validated_data)
+        service.patch_user(user_id, request_serializer.validated_data, request.user)
         return Response(status=status.HTTP_200_OK)
 
 
@@ -329,6 +338,23 @@ class EditUserGroupsAPIView(APIView):
         return Response(response, status=status.HTTP_200_OK)
 
 
+class EditUsersProficiencyAPIView(APIView):
+    permission_classes = [APIPermission]
+    permissions = PermissionKeys.BULK_PROFICIENCY_PERMISSION
+
+    @swagger_auto_schema(request_body=EditMultipleUserProficiencyRequestSerializer(many=True))
+    def put(self, request):
+        """
+        API to replace the skill ratings of many users at once.
+        """
+        service = UserService()
+        request_serializer = EditMultipleUserProficiencyRequestSerializer(data=request.data, many=True)
+        request_serializer.is_valid(raise_exception=True)
+        service.bulk_edit_proficiencies(request_serializer.validated_data)
+        response = {ResponseKeys.MESSAGE: SuccessMessages.UPDATE_SUCCESS}
+        return Response(response, status=status.HTTP_200_OK)
+
+
 class GetUserGroupsAPIView(APIView):
     permission_classes = [APIPermission]
     permissions = PermissionKeys.USER_GROUP
@@ -0,0 +1,69 @@
+"""
+Optimal assignment of rows to columns of a cost matrix (Hungarian algorithm with potentials).
+
+The solver runs in O(rows^2 * columns) and needs at least as many columns as rows, callers that allow a row to
+stay unassigned add one zero cost column per row for it.
+"""
+INFINITY = float('inf')
+
+
+def solve_assignment(cost):
+    """
+    Return the column assigned to every row of the `cost` matrix such that the total cost is minimal.
+    """
+    rows = len(cost)
+    if not rows:
+        return []
+    columns = len(cost[0])
+    if columns < rows:
+        raise ValueError('Cost matrix needs at least as many columns as rows')
+
+    # potentials of rows and columns and the row matched to every column, index 0 is a sentinel
+    row_potential = [0] * (rows + 1)
+    column_potential = [0] * (columns + 1)
+    matched_row = [0] * (columns + 1)
+    previous_column = [0] * (columns + 1)
+
+    for row in range(1, rows + 1):
+        # grow an alternating tree from the new row until it reaches a free column
+        matched_row[0] = row
+        column = 0
+        min_slack = [INFINITY] * (columns + 1)
+        visited = [False] * (columns + 1)
+        while True:
+            visited[column] = True
+            current_row = matched_row[column]
+            delta = INFINITY
+            next_column = 0
+            for candidate in range(1, columns + 1):
+                if visited[candidate]:
+                    continue
+                slack = cost[current_row - 1][candidate - 1] - row_potential[current_row] - \
+                    column_potential[candidate]
+                if slack < min_slack[candidate]:
+                    min_slack[candidate] = slack
+                    previous_column[candidate] = column
+                if min_slack[candidate] < delta:
+                    delta = min_slack[candidate]
+                    next_column = candidate
+            for candidate in range(columns + 1):
+                if visited[candidate]:
+                    row_potential[matched_row[candidate]] += delta
+                    column_potential[candidate] -= delta
+                else:
+                    min_slack[candidate] -= delta
+            column = next_column
+            if matched_row[column] == 0:
+                break
+
+        # flip the augmenting path
+        while column:
+            previous = previous_column[column]
+            matched_row[column] = matched_row[previous]
+            column = previous
+
+    assignment = [None] * rows
+    for column in range(1, columns + 1):
+        if matched_row[column]:
+            assignment[matched_row[column] - 1] = column - 1
+    return assignment
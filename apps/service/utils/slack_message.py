@@ -1,18 +1,70 @@
-from slack_sdk.errors import SlackApiError
+from datetime import timedelta
+import random
+
+from django.db import transaction
+from django.utils import timezone
+from slack_sdk.errors import SlackApiError, SlackClientError
 from slack_sdk import WebClient
+from common.constants import SlackOutboxValues
 from common.models import SlackMessageLogs
 import os
 
 SLACK_API_TOKEN = os.environ.get("SLACK_API_TOKEN")
 SLACK_CHANNEL_ID = os.environ.get("SLACK_CHANNEL_ID")
+# points the client to a stub server (see utils.slack_stub) in local setups
+SLACK_API_URL = os.environ.get("SLACK_API_URL", WebClient.BASE_URL)
 
-slack_client = WebClient(token=SLACK_API_TOKEN)
+# retries are left to the outbox worker, it backs off between attempts
+slack_client = WebClient(token=SLACK_API_TOKEN, base_url=SLACK_API_URL, retry_handlers=[])
 
 
 def send_slack_message(message):
-    try:
-        slack_client.chat_postMessage(channel=SLACK_CHANNEL_ID, text=message)
-        SlackMessageLogs.objects.create(message=message, delivered=True)
-    except SlackApiError as e:
-        SlackMessageLogs.objects.create(message=message, delivered=False)
-        print(f"Error: {e.response['error']}")
+    """
+    Queue a Slack message. It is saved in the caller's transaction and posted by the `deliver_slack_messages`
+    worker once committed, so requests never wait for Slack.
+    """
+    SlackMessageLogs.objects.create(message=message)
+
+
+def deliver_slack_messages(batch_size=SlackOutboxValues.BATCH_SIZE):
+    """
+    Post due messages of the outbox. Returns the number of messages handled and the seconds Slack asked to wait
+    before the next call if it rate limited the worker.
+    """
+    with transaction.atomic():
+        # locked rows are skipped so that several workers can share the outbox
+        messages = list(SlackMessageLogs.objects.select_for_update(skip_locked=True)
+                        .filter(delivered=False, next_attempt_time__lte=timezone.now())
+                        .order_by('next_attempt_time', 'id')[:batch_size])
+        for handled, message in enumerate(messages):
+            try:
+                slack_client.chat_postMessage(channel=SLACK_CHANNEL_ID, text=message.message)
+            except SlackApiError as e:
+                if e.response.status_code == SlackOutboxValues.RATE_LIMIT_STATUS_CODE:
+                    # rate limits are not failures of the message, it is retried as soon as Slack allows
+                    retry_after = int(e.response.headers.get('Retry-After', SlackOutboxValues.BACKOFF_SECONDS))
+                    message.next_attempt_time = timezone.now() + timedelta(seconds=retry_after)
+                    message.save(update_fields=['next_attempt_time'])
+                    return handled, retry_after
+                schedule_retry(message, e.response.get('error'))
+            except (SlackClientError, OSError) as e:
+                schedule_retry(message, str(e))
+            else:
+                message.delivered = True
+                message.delivered_time = timezone.now()
+                message.last_error = None
+                message.save(update_fields=['delivered', 'delivered_time', 'last_error'])
+    return len(messages), None
+
+
+def schedule_retry(message, error):
+    message.attempts += 1
+    message.last_error = error
+    if message.attempts >= SlackOutboxValues.MAX_ATTEMPTS:
+        message.next_attempt_time = None
+    else:
+        # exponential backoff with jitter so that failed messages do not retry in lockstep
+        backoff = min(SlackOutboxValues.BACKOFF_SECONDS * 2 ** (message.attempts - 1),
+                      SlackOutboxValues.MAX_BACKOFF_SECONDS)
+        message.next_attempt_time = timezone.now() + timedelta(seconds=backoff * random.uniform(0.5, 1))
+    message.save(update_fields=['attempts', 'last_error', 'next_attempt_time'])
@@ -0,0 +1,76 @@
+"""
+Local stand-in for the Slack Web API, used by tests and local setups instead of the real workspace.
+
+Posted messages are recorded in `messages`, responses can be scripted by appending `(status, body, headers)` tuples
+to `responses`, otherwise every call succeeds. Run `python -m utils.slack_stub` and point `SLACK_API_URL` at it to
+watch the messages of a local setup.
+"""
+import argparse
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+class SlackStubServer:
+
+    def __init__(self, host='127.0.0.1', port=0, verbose=False):
+        self.verbose = verbose
+        self.messages = []
+        self.responses = []
+        self.server = ThreadingHTTPServer((host, port), self.handler_class())
+        self.thread = None
+
+    @property
+    def url(self):
+        host, port = self.server.server_address[:2]
+        return f'http://{host}:{port}/api/'
+
+    def handler_class(self):
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_POST(self):
+                body = self.rfile.read(int(self.headers.get('Content-Length', 0)))
+                status, response, headers = stub.responses.pop(0) if stub.responses else (200, {'ok': True}, {})
+                if status == 200 and response.get('ok'):
+                    stub.messages.append(json.loads(body or '{}'))
+                    if stub.verbose:
+                        print(stub.messages[-1])
+                self.send_response(status)
+                self.send_header('Content-Type', 'application/json')
+                for name, value in headers.items():
+                    self.send_header(name, value)
+                self.end_headers()
+                self.wfile.write(json.dumps(response).encode())
+
+            def log_message(self, format, *args):
+                pass
+
+        return Handler
+
+    def start(self):
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *args):
+        self.stop()
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Stub Slack Web API printing the posted messages')
+    parser.add_argument('--port', type=int, default=8089)
+    port = parser.parse_args().port
+    stub = SlackStubServer(host='0.0.0.0', port=port, verbose=True).start()
+    print(f'stub Slack API listening on port {port}')
+    try:
+        stub.thread.join()
+    except KeyboardInterrupt:
+        stub.stop()
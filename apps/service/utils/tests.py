@@ -1,4 +1,5 @@
 import unittest
+from utils.assignment import solve_assignment
 from utils.utils import months_difference
 import datetime
 
@@ -28,6 +29,20 @@ class UtilsTestCase(unittest.TestCase):
         months = months_difference(start_date, end_date)
         self.assertEqual(months, 12)
 
+    def test_solve_assignment_minimal_cost(self):
+        # picking the cheapest column for the first row would leave the second row with a cost of 0
+        cost = [[-90, -80, 0],
+                [-85, 0, 0]]
+        self.assertEqual(solve_assignment(cost), [1, 0])
+
+        cost = [[-90, -80, 0],
+                [-10, -70, 0]]
+        self.assertEqual(solve_assignment(cost), [0, 1])
+
+    def test_solve_assignment_needs_enough_columns(self):
+        with self.assertRaises(ValueError):
+            solve_assignment([[1], [2]])
+
 
 if __name__ == '__main__':
     unittest.main()
@@ -0,0 +1,109 @@
+"""
+Interval based utilization engine.
+
+Allocations and leaves are handled as `daterange` intervals instead of being expanded into one row per day.
+Every interval contributes a change point at its lower bound and one at its upper bound, a running sum over the
+ordered change points of a key gives the segments in which utilization stays constant. The cost is proportional
+to the number of intervals and not to the number of days they cover.
+
+The builders below return SQL strings that are composed from two caller supplied sources:
+    windows   - `key, period, threshold` rows, the (bounded) date range of interest of every key and the
+                utilization a day needs to be considered covered
+    intervals - `key, period, utilization, leaves` rows, may reference the `windows` CTE to narrow down keys
+Parameters of the windows source come before the ones of the intervals source.
+"""
+from django.contrib.postgres.fields import DateRangeField
+from django.db.models import Func
+
+ALLOCATION_PERIOD = "daterange(start_date, end_date, '[]')"
+LEAVE_PERIOD = "daterange(from_date, to_date, '[]')"
+POSITION_PERIOD = "daterange(start_date, end_date, '[]')"
+
+# rows with an end date before the start date are ignored, they cannot form a range
+# and are excluded from the GiST indexes on the same condition
+VALID_ALLOCATION_PERIOD = "(end_date is null or end_date >= start_date)"
+VALID_LEAVE_PERIOD = "(to_date >= from_date)"
+VALID_POSITION_PERIOD = "(end_date is null or end_date >= start_date)"
+
+
+class DateRange(Func):
+    """
+    Inclusive `daterange` of two date fields, used for the GiST indexes backing the interval lookups.
+    """
+    function = 'daterange'
+    template = "%(function)s(%(expressions)s, '[]')"
+    output_field = DateRangeField()
+
+
+def _sweep(intervals_sql, windows_sql, select_sql):
+    if windows_sql is None:
+        windows_sql = "select null::bigint as key, null::daterange as period, null::integer as threshold where false"
+        clipped_sql = "select key, period, utilization, leaves from intervals where not isempty(period)"
+    else:
+        clipped_sql = """
+            select i.key, i.period * w.period as period, i.utilization, i.leaves
+            from intervals i join windows w on i.key = w.key and i.period && w.period
+        """
+
+    return f"""
+        with
+        windows as ({windows_sql}),
+        intervals as ({intervals_sql}),
+        clipped as ({clipped_sql}),
+        events as (
+            select key, lower(period) as day, utilization, leaves, false as boundary from clipped
+            union all
+            select key, upper(period), -utilization, -leaves, false from clipped where not upper_inf(period)
+            union all
+            select key, lower(period), 0, 0, true from windows
+            union all
+            select key, upper(period), 0, 0, true from windows where not upper_inf(period)
+        ),
+        points as (
+            select key, day, sum(utilization) as utilization, sum(leaves) as leaves
+            from events
+            group by key, day
+            having sum(utilization) <> 0 or sum(leaves) <> 0 or bool_or(boundary)
+        ),
+        segments as (
+            select
+                key,
+                daterange(day, lead(day) over w) as period,
+                sum(utilization) over w as utilization,
+                sum(leaves) over w as leaves
+            from points
+            window w as (partition by key order by day)
+        )
+        {select_sql}
+    """
+
+
+def utilization_segments(intervals_sql, windows_sql=None):
+    """
+    Build SQL returning `key, period, utilization, leaves` segments of constant utilization and leave count.
+
+    With windows, intervals are clipped to the window of their key and the segments cover every window entirely
+    (including days without any interval). Without windows, segments cover the intervals only, the last segment of
+    an open ended interval has an unbounded period.
+    """
+    return _sweep(intervals_sql, windows_sql, """
+        select key, period, utilization, leaves from segments
+        where not (upper_inf(period) and utilization = 0 and leaves = 0)
+    """)
+
+
+def covered_days(intervals_sql, windows_sql):
+    """
+    Build SQL returning `key, window_days, covered_days` where covered days are the days in the window of a key with
+    utilization >= threshold and no leave.
+    """
+    return _sweep(intervals_sql, windows_sql, """
+        select
+            w.key,
+            upper(w.period) - lower(w.period) as window_days,
+            coalesce(sum(upper(s.period) - lower(s.period))
+                     filter (where s.utilization >= w.threshold and s.leaves = 0), 0) as covered_days
+        from windows w
+            left join segments s on s.key = w.key and not upper_inf(s.period)
+        group by w.key, w.period
+    """)
@@ -1,8 +1,16 @@
 #! /bin/sh
 
 python manage.py collectstatic --no-input
+# the cache table is created first, migrations invalidate cached permissions
+python manage.py createcachetable
 python manage.py migrate --no-input
+python manage.py rebuild_user_availability
+python manage.py rollover_user_utilization_summary
 
 CORES=$(getconf _NPROCESSORS_ONLN)
 WORKERS=$((2 * $CORES + 1))
-gunicorn --workers=$WORKERS --bind=0.0.0.0:8000 staffing_tool.wsgi:application
\ No newline at end of file
+# threaded workers so that open notification streams do not hold a whole worker each
+THREADS=${GUNICORN_THREADS:-8}
+# notification streams may take half of the threads, the others are left to the API
+export NOTIFICATION_MAX_STREAMS=${NOTIFICATION_MAX_STREAMS:-$(($THREADS / 2))}
+gunicorn --workers=$WORKERS --threads=$THREADS --bind=0.0.0.0:8000 staffing_tool.wsgi:application
\ No newline at end of file